@@ -1,5 +1,7 @@
 import logging
 import asyncio
+import os
+import time
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -16,11 +18,37 @@ from handlers import (
     pc_control,
     monitoring,
     cleanup,
+    disk_usage,
     screenshots,
     ai_responses,
 )
+from utils.alert_rules import alert_engine
 from utils.decorators import restricted
-from utils.state_manager import load_bot_state, save_bot_state
+from utils.outbound_limiter import OutboundRateLimiter
+from utils.state_manager import (
+    STATE_FLUSH_INTERVAL,
+    STATE_FLUSH_JOB_NAME,
+    flush_bot_state,
+    flush_pending_state,
+    close_state_db,
+    delete_job,
+    load_bot_state,
+    load_jobs,
+    mark_state_dirty,
+)
+from utils.metrics_sampler import (
+    SAMPLE_INTERVAL,
+    SAMPLER_JOB_NAME,
+    prime_cpu_counter,
+    sample_system_metrics,
+)
+from utils.executor import run_blocking, shutdown_executors
+from utils.process_cache import (
+    PROCESS_JOB_NAME,
+    PROCESS_REFRESH_INTERVAL,
+    process_table,
+    refresh_process_table,
+)
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -31,61 +59,89 @@ ANIMATION_FILE_ID = (
     "CgACAgIAAxkBAAIHzWiEpBDgtAJsQDpT6lPIN4lJVF6QAAI1dgACmrkpSF3sGXuJUNm4NgQ"
 )
 
+# Адрес Bot API; переопределяется, например, для нагрузочной проверки на локальном
+# поддельном сервере.
+TELEGRAM_BASE_URL = os.environ.get("TELEGRAM_BASE_URL", "https://api.telegram.org")
+
+# Задачи JobQueue, которые восстанавливаются из базы состояния после перезапуска.
+RESTORABLE_JOB_CALLBACKS = {
+    pc_control.SHUTDOWN_TIMER_JOB: pc_control.shutdown_pc,
+    cleanup.AUTO_CLEANUP_JOB: cleanup.auto_cleanup_tick,
+}
+# Разовые задачи, просроченные дольше этого времени (в секундах), не восстанавливаются.
+OVERDUE_JOB_GRACE = 60
+
 
 @restricted
 async def toggle_battery_monitoring(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    """Включает/выключает автоматический мониторинг батареи."""
-    chat_id = update.effective_chat.id
-    job_name = f"battery_check_{chat_id}"
-
-    if "battery_monitoring_enabled" not in context.bot_data:
-        context.bot_data["battery_monitoring_enabled"] = False
-
-    if "battery_low_notified" not in context.bot_data:
-        context.bot_data["battery_low_notified"] = False
-    if "battery_full_notified" not in context.bot_data:
-        context.bot_data["battery_full_notified"] = False
-    if "battery_unavailable_notified" not in context.bot_data:
-        context.bot_data["battery_unavailable_notified"] = False
-    if "battery_check_error_notified" not in context.bot_data:
-        context.bot_data["battery_check_error_notified"] = False
-
-    current_jobs = context.job_queue.get_jobs_by_name(job_name)
-
-    if not current_jobs:
-        context.job_queue.run_repeating(
-            monitoring.check_battery_level,
-            interval=300,
-            first=10,
-            chat_id=chat_id,
-            name=job_name,
-            data={"chat_id": chat_id},
-        )
-        context.bot_data["battery_monitoring_enabled"] = True
+    """
+    Включает/выключает правила оповещений о батарее. Они проверяются
+    по снимкам фонового сэмплера вместе с остальными правилами.
+    """
+    enabled = not context.bot_data.get("battery_monitoring_enabled", False)
+    context.bot_data["battery_monitoring_enabled"] = enabled
+    context.bot_data["alert_chat_id"] = update.effective_chat.id
+    alert_engine.reset("battery")
+    context.bot_data["alert_states"] = alert_engine.dump_states()
+    mark_state_dirty()
+
+    if enabled:
         await update.message.reply_text(
-            "✅ Автоматический мониторинг батареи *включен* \\(проверка каждые 5 минут\\)\\.",
+            "✅ Автоматический мониторинг батареи *включен* \\(опрос чаще у порогов заряда и реже на сети\\)\\.",
             parse_mode="MarkdownV2",
         )
-        context.bot_data["battery_low_notified"] = False
-        context.bot_data["battery_full_notified"] = False
-        context.bot_data["battery_unavailable_notified"] = False
-        context.bot_data["battery_check_error_notified"] = False
     else:
-        for job in current_jobs:
-            job.schedule_removal()
-        context.bot_data["battery_monitoring_enabled"] = False
         await update.message.reply_text(
             "❌ Автоматический мониторинг батареи *выключен*\\.",
             parse_mode="MarkdownV2",
         )
-        context.bot_data["battery_low_notified"] = False
-        context.bot_data["battery_full_notified"] = False
-        context.bot_data["battery_unavailable_notified"] = False
-        context.bot_data["battery_check_error_notified"] = False
 
-    save_bot_state(context.bot_data)
+
+async def restore_jobs(application: Application) -> None:
+    """Восстанавливает все сохранённые задачи JobQueue одним запросом к базе."""
+    jobs = await run_blocking(load_jobs)
+    now = time.time()
+    for job in jobs:
+        callback = RESTORABLE_JOB_CALLBACKS.get(job["callback"])
+        if callback is None:
+            logger.warning(
+                f"Неизвестная сохранённая задача {job['name']} ({job['callback']}), удаляю."
+            )
+            await run_blocking(delete_job, job["name"])
+            continue
+
+        if job["kind"] == "repeating":
+            restored = application.job_queue.run_repeating(
+                callback,
+                interval=job["interval"],
+                first=10,
+                chat_id=job["chat_id"],
+                user_id=job["user_id"],
+                name=job["name"],
+                data=job["data"],
+            )
+        else:
+            delay = job["run_at"] - now
+            if delay < -OVERDUE_JOB_GRACE:
+                logger.warning(
+                    f"Задача {job['name']} просрочена на {-delay:.0f} с и не будет восстановлена."
+                )
+                await run_blocking(delete_job, job["name"])
+                continue
+            restored = application.job_queue.run_once(
+                callback,
+                max(delay, 1),
+                chat_id=job["chat_id"],
+                user_id=job["user_id"],
+                name=job["name"],
+                data=job["data"],
+            )
+
+        if job["user_id"] is not None:
+            application.user_data[job["user_id"]][job["name"]] = restored
+        logger.info(f"Задача {job['name']} восстановлена.")
 
 
 async def post_init(application: Application):
@@ -93,31 +149,67 @@ async def post_init(application: Application):
     logger.info("Загрузка состояния бота после инициализации...")
     state = load_bot_state()
     application.bot_data.update(state)
+    alert_engine.load_states(application.bot_data.get("alert_states"))
+    application.job_queue.run_repeating(
+        flush_bot_state,
+        interval=STATE_FLUSH_INTERVAL,
+        first=STATE_FLUSH_INTERVAL,
+        name=STATE_FLUSH_JOB_NAME,
+    )
 
-    if application.bot_data.get("battery_monitoring_enabled"):
-        from config import ALLOWED_CHAT_ID
+    prime_cpu_counter()
+    application.job_queue.run_repeating(
+        sample_system_metrics,
+        interval=SAMPLE_INTERVAL,
+        first=1,
+        name=SAMPLER_JOB_NAME,
+    )
+    logger.info(f"Фоновый сбор метрик запущен (интервал {SAMPLE_INTERVAL} с).")
 
-        job_name = f"battery_check_{ALLOWED_CHAT_ID}"
+    await run_blocking(process_table.refresh)
+    application.job_queue.run_repeating(
+        refresh_process_table,
+        interval=PROCESS_REFRESH_INTERVAL,
+        first=PROCESS_REFRESH_INTERVAL,
+        name=PROCESS_JOB_NAME,
+    )
+    logger.info(
+        f"Кэш процессов заполнен, обновление каждые {PROCESS_REFRESH_INTERVAL} с."
+    )
 
-        if not application.job_queue.get_jobs_by_name(job_name):
-            application.job_queue.run_repeating(
-                monitoring.check_battery_level,
-                interval=300,
-                first=10,
-                chat_id=ALLOWED_CHAT_ID,
-                name=job_name,
-                data={"chat_id": ALLOWED_CHAT_ID},
-            )
-            logger.info(
-                f"Автоматический мониторинг батареи восстановлен для chat_id: {ALLOWED_CHAT_ID}"
-            )
+    await restore_jobs(application)
+
+    # Состояние, перенесённое из старых версий, не знает, куда слать оповещения.
+    if application.bot_data.get("alert_chat_id") is None and application.bot_data.get(
+        "battery_monitoring_enabled"
+    ):
+        from config import ALLOWED_CHAT_ID
+
+        application.bot_data["alert_chat_id"] = ALLOWED_CHAT_ID
+        mark_state_dirty()
 
     logger.info("Состояние бота успешно загружено и JobQueue настроен.")
 
 
+async def post_shutdown(application: Application):
+    """Сохраняет несохранённое состояние и освобождает пулы исполнителей при остановке бота."""
+    flush_pending_state(application.bot_data)
+    close_state_db()
+    shutdown_executors()
+
+
 def main() -> None:
     """Запускает бота."""
-    application = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .base_url(f"{TELEGRAM_BASE_URL}/bot")
+        .base_file_url(f"{TELEGRAM_BASE_URL}/file/bot")
+        .rate_limiter(OutboundRateLimiter())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start_help.start))
     application.add_handler(CommandHandler("help", start_help.help_command))
@@ -128,6 +220,8 @@ def main() -> None:
     application.add_handler(CommandHandler("status", monitoring.system_status))
     application.add_handler(CommandHandler("processes", monitoring.list_processes))
     application.add_handler(CommandHandler("uptime", monitoring.uptime))
+    application.add_handler(CommandHandler("history", monitoring.history))
+    application.add_handler(CommandHandler("apps", monitoring.list_apps))
     application.add_handler(
         CommandHandler("is_running", monitoring.check_process_running)
     )
@@ -135,13 +229,29 @@ def main() -> None:
         CommandHandler("kill_process", monitoring.kill_process_command)
     )
     application.add_handler(CommandHandler("clear_temp", cleanup.clear_all_temp_files))
+    application.add_handler(CommandHandler("auto_cleanup", cleanup.auto_cleanup))
+    # block=False: первый подсчёт большого диска и поиск дубликатов
+    # не задерживают другие команды.
+    application.add_handler(CommandHandler("du", disk_usage.disk_usage, block=False))
+    application.add_handler(
+        CommandHandler("find_duplicates", cleanup.find_duplicates, block=False)
+    )
     application.add_handler(CommandHandler("screenshot", screenshots.screenshot))
+    application.add_handler(CommandHandler("watch_screen", screenshots.watch_screen))
+    application.add_handler(CommandHandler("record", screenshots.record_screen))
+    application.add_handler(CommandHandler("timelapse", screenshots.timelapse))
     application.add_handler(CommandHandler("lock", pc_control.lock_pc))
     application.add_handler(CommandHandler("battery", monitoring.battery_status))
+    application.add_handler(CommandHandler("alerts", monitoring.alerts))
     application.add_handler(
         CommandHandler("toggle_battery_monitoring", toggle_battery_monitoring)
     )
-    application.add_handler(CommandHandler("ask", ai_responses.ask_deepseek))
+    # block=False: генерация ответа ИИ не задерживает обработку других команд.
+    application.add_handler(
+        CommandHandler("ask", ai_responses.ask_deepseek, block=False)
+    )
+    application.add_handler(CommandHandler("ask_stats", ai_responses.ask_cache_stats))
+    application.add_handler(CommandHandler("forget", ai_responses.forget_conversation))
 
     application.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, start_help.button_handler)
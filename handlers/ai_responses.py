@@ -1,17 +1,43 @@
 import logging
+import os
+import time
 from telegram import Update
 from telegram.ext import ContextTypes
-from openai import OpenAI
+from openai import AsyncOpenAI
 from openai import OpenAIError, APIStatusError
 from config import DEEPSEEK_API_KEY
 from utils.decorators import restricted
+from utils.message_editor import ThrottledMessageEditor
+from utils.executor import run_blocking
+from utils.response_cache import make_cache_key, response_cache
+from utils.ai_scheduler import QueueFullError, ai_scheduler
+from utils.conversation_memory import (
+    append_turn,
+    build_messages,
+    estimate_tokens,
+    history_digest,
+    reset_history,
+)
 
 logger = logging.getLogger(__name__)
 
-# Инициализация клиента DeepSeek API через OpenRouter
+# Адрес API можно переопределить переменной окружения, например для локальной
+# заглушки, имитирующей OpenAI chat-completions.
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "https://openrouter.ai/api/v1")
+DEEPSEEK_MODEL = "deepseek/deepseek-chat"
+DEEPSEEK_TEMPERATURE = 0.7
+DEEPSEEK_MAX_TOKENS = 500
+# Флаг в тексте запроса, отключающий кэш ответов (как и форма /ask!).
+FRESH_FLAG = "--fresh"
+SYSTEM_PROMPT = (
+    "Вы умный и полезный помощник. Отвечайте на вопросы четко и по существу."
+)
+
+# Инициализация асинхронного клиента DeepSeek API через OpenRouter
 try:
-    deepseek_client = OpenAI(
-        api_key=DEEPSEEK_API_KEY, base_url="https://openrouter.ai/api/v1"
+    # Повторы выполняет ai_scheduler, встроенные повторы клиента отключены.
+    deepseek_client = AsyncOpenAI(
+        api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0
     )
     logger.info("Клиент DeepSeek AI (через OpenRouter) успешно инициализирован.")
 except Exception as e:
@@ -21,9 +47,47 @@ except Exception as e:
     deepseek_client = None
 
 
+async def _stream_completion(
+    messages: list[dict], editor: ThrottledMessageEditor
+) -> str:
+    """
+    Запрашивает ответ в потоковом режиме и по мере поступления токенов
+    показывает его в сообщении editor. Возвращает полный текст ответа.
+    """
+    started = time.monotonic()
+    stream = await ai_scheduler.call_with_retry(
+        lambda: deepseek_client.chat.completions.create(
+            model=DEEPSEEK_MODEL,
+            messages=messages,
+            temperature=DEEPSEEK_TEMPERATURE,
+            max_tokens=DEEPSEEK_MAX_TOKENS,
+            stream=True,
+        )
+    )
+
+    ai_response = ""
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if not ai_response:
+            logger.info(
+                f"Первый токен от DeepSeek получен через {time.monotonic() - started:.2f} с"
+            )
+        ai_response += delta
+        await editor.update(ai_response)
+
+    logger.info(
+        f"Ответ DeepSeek сгенерирован за {time.monotonic() - started:.2f} с, {len(ai_response)} символов"
+    )
+    return ai_response
+
+
 @restricted
 async def ask_deepseek(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Обрабатывает запросы к DeepSeek AI через OpenRouter."""
+    """Обрабатывает запросы к DeepSeek AI через OpenRouter, показывая ответ по мере генерации."""
     if deepseek_client is None:
         await update.message.reply_text(
             "Извините, сервис DeepSeek AI не настроен или произошла ошибка инициализации. Пожалуйста, сообщите администратору."
@@ -33,52 +97,82 @@ async def ask_deepseek(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         )
         return
 
-    if len(context.args) == 0:
+    fresh = update.message.text.startswith("/ask!") or FRESH_FLAG in context.args
+    query_args = [arg for arg in context.args if arg != FRESH_FLAG]
+
+    if len(query_args) == 0:
         await update.message.reply_text(
             "Пожалуйста, укажите ваш запрос после команды /ask. Например: `/ask Расскажи анекдот.`"
         )
         return
 
-    user_query = " ".join(context.args)
+    user_query = " ".join(query_args)
     logger.info(
         f"Получен запрос к DeepSeek (через OpenRouter) от {update.effective_user.id}: {user_query}"
     )
 
+    placeholder = await update.message.reply_text("💭 Думаю...")
+    editor = ThrottledMessageEditor(placeholder)
+    cache_key = make_cache_key(
+        user_query,
+        DEEPSEEK_MODEL,
+        DEEPSEEK_TEMPERATURE,
+        history_digest(context.chat_data),
+    )
+
     try:
-        await update.message.reply_chat_action("typing")
-
-        response = deepseek_client.chat.completions.create(
-            model="deepseek/deepseek-chat",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Вы умный и полезный помощник. Отвечайте на вопросы четко и по существу.",
-                },
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0.7,
-            max_tokens=500,
+        if not fresh:
+            cached_response = await run_blocking(response_cache.get, cache_key)
+            if cached_response is not None:
+                logger.info("Ответ DeepSeek взят из кэша.")
+                await editor.flush(cached_response)
+                append_turn(context.chat_data, user_query, cached_response)
+                return
+
+        messages = build_messages(context.chat_data, SYSTEM_PROMPT, user_query)
+        logger.info(
+            f"Размер запроса к DeepSeek: {len(messages)} сообщений, "
+            f"~{sum(estimate_tokens(m['content']) for m in messages)} токенов"
         )
 
-        ai_response = response.choices[0].message.content
+        async def report_queue_position(position: int) -> None:
+            await placeholder.edit_text(
+                f"⏳ Вы #{position} в очереди к ИИ. Ответ начнётся автоматически."
+            )
+
+        async with ai_scheduler.slot(report_queue_position):
+            ai_response = await _stream_completion(messages, editor)
+
+        if not ai_response:
+            await editor.flush(
+                "Модель вернула пустой ответ. Попробуйте переформулировать запрос."
+            )
+            return
 
         logger.info(
             f"Получен ответ от DeepSeek AI (через OpenRouter): {ai_response[:100]}..."
         )
-        await update.message.reply_text(ai_response)
+        await editor.flush(ai_response)
+        await run_blocking(response_cache.put, cache_key, ai_response)
+        append_turn(context.chat_data, user_query, ai_response)
 
+    except QueueFullError:
+        logger.warning("Очередь запросов к DeepSeek переполнена, запрос отклонён.")
+        await editor.flush(
+            "Слишком много запросов к ИИ одновременно. Пожалуйста, повторите чуть позже."
+        )
     except APIStatusError as e:
         logger.error(
             f"Ошибка OpenRouter/DeepSeek API (статус {e.status_code}): {e.response} (Request ID: {e.request_id})"
         )
-        await update.message.reply_text(
+        await editor.flush(
             f"Произошла ошибка при обращении к OpenRouter/DeepSeek AI: {e.status_code}. Возможно, проблема с API ключом, лимитами или названием модели."
         )
     except OpenAIError as e:
         logger.error(
             f"Ошибка OpenAI API клиента (через OpenRouter): {e}", exc_info=True
         )
-        await update.message.reply_text(
+        await editor.flush(
             "Произошла ошибка при обращении к OpenRouter/DeepSeek AI. Пожалуйста, попробуйте еще раз. (Ошибка API клиента)"
         )
     except Exception as e:
@@ -86,6 +180,35 @@ async def ask_deepseek(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             f"Неизвестная ошибка при запросе к OpenRouter/DeepSeek AI: {e}",
             exc_info=True,
         )
-        await update.message.reply_text(
+        await editor.flush(
             "Произошла непредвиденная ошибка при обработке вашего запроса к OpenRouter/DeepSeek AI. Пожалуйста, попробуйте еще раз."
         )
+
+
+@restricted
+async def forget_conversation(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """Сбрасывает историю диалога с ИИ в текущем чате."""
+    reset_history(context.chat_data)
+    await update.message.reply_text("🧽 История диалога с ИИ очищена.")
+
+
+@restricted
+async def ask_cache_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Показывает статистику кэша ответов ИИ и очереди запросов."""
+    summary = await run_blocking(response_cache.summary)
+    hits = summary["memory_hits"] + summary["disk_hits"]
+    total = hits + summary["misses"]
+    hit_rate = hits / total * 100 if total else 0.0
+    disk_size = summary["disk_size"] if summary["disk_size"] is not None else "?"
+    await update.message.reply_text(
+        "📦 Кэш ответов ИИ:\n"
+        f"Попаданий: {hits} (память: {summary['memory_hits']}, диск: {summary['disk_hits']})\n"
+        f"Промахов: {summary['misses']}\n"
+        f"Доля попаданий: {hit_rate:.0f}%\n"
+        f"Записей в памяти: {summary['memory_size']}, на диске: {disk_size}\n\n"
+        "🚦 Очередь запросов к ИИ:\n"
+        f"Выполняется: {ai_scheduler.active}, ждут: {ai_scheduler.queued}\n"
+        f"Повторов: {ai_scheduler.stats['retries']}, отклонено: {ai_scheduler.stats['rejected']}"
+    )
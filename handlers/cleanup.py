@@ -1,53 +1,151 @@
+import asyncio
 import logging
 import os
-import shutil
 import platform
-from telegram import Update
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
+from utils.cleanup_policy import incremental_cleaner, make_policy
 from utils.decorators import restricted
+from utils.duplicates import (
+    PARTIAL_HASH_BYTES,
+    collect_size_buckets,
+    delete_duplicates,
+    hash_groups,
+)
+from utils.executor import run_blocking, run_scan
+from utils.file_scan import clean_directory, format_size, new_cleanup_stats, parse_size
+from utils.message_editor import ThrottledMessageEditor
+from utils.metrics_sampler import get_latest_snapshot
+from utils.state_manager import delete_job, save_job
+from utils.time_parsing import format_duration
 
 logger = logging.getLogger(__name__)
 
+# Очистка большой папки может занять минуты.
+CLEANUP_TIMEOUT = 600
+# Как часто обновлять сообщение с прогрессом (в секундах).
+CLEANUP_PROGRESS_INTERVAL = 2
+DRY_RUN_FLAGS = ("--dry-run", "dry-run", "--preview")
 
-async def clear_temp_directory(path: str, chat_id: int, bot) -> tuple[int, int]:
+# Поиск дубликатов: файлы меньше минимального размера не рассматриваются,
+# хэширование раскладывается на пачки для пула сканирования (run_scan).
+DUPLICATES_MIN_SIZE = 1024
+DUPLICATES_BATCHES = 32
+DUPLICATES_TIMEOUT = 1800
+DUPLICATES_PAGE_SIZE = 5
+DUPLICATES_PATHS_SHOWN = 4
+DUPLICATES_KEY = "duplicates"
+TELEGRAM_TEXT_LIMIT = 4096
+
+# Фоновая автоочистка: за один шаг просматривается и удаляется ограниченное
+# число элементов, поэтому папки остаются небольшими без долгих полных очисток.
+AUTO_CLEANUP_JOB = "auto_cleanup"
+AUTO_CLEANUP_INTERVAL = 60
+AUTO_CLEANUP_SCAN_BUDGET = 2000
+AUTO_CLEANUP_DELETE_BUDGET = 200
+# Шаг пропускается, если процессор загружен сильнее (в процентах).
+AUTO_CLEANUP_CPU_LIMIT = 75
+
+
+def get_temp_directories() -> list[str]:
+    """Папки временных файлов, которые очищает бот."""
+    paths = []
+    user_temp_path = os.getenv("TEMP")
+    if user_temp_path:
+        paths.append(user_temp_path)
+    if platform.system() == "Windows":
+        paths.extend(["C:\\Windows\\Temp", "C:\\Windows\\Prefetch"])
+    return paths
+
+
+def get_cleanup_policies() -> list[dict]:
     """
-    Очищает содержимое указанной временной папки.
-    Возвращает кортеж (количество удаленных файлов/папок, количество ошибок).
+    Политики автоочистки. Prefetch сюда не входит: его очистка замедляет
+    запуск приложений, поэтому он чистится только вручную через /clear_temp.
     """
-    deleted_count = 0
-    error_count = 0
-    if not os.path.exists(path):
-        logger.warning(f"Папка не найдена: {path}")
-        return 0, 0
-
-    await bot.send_message(
-        chat_id=chat_id,
-        text=f"🧹 Начинаю очистку папки: `{path}`",
-        parse_mode="Markdown",
-    )
+    policies = []
+    user_temp_path = os.getenv("TEMP")
+    if user_temp_path:
+        policies.append(
+            make_policy(
+                user_temp_path,
+                min_age=2 * 86400,
+                exclude=("*.lock", "*.lck", "~$*"),
+                max_size=2 * 1024**3,
+            )
+        )
+    if platform.system() == "Windows":
+        policies.append(
+            make_policy(
+                "C:\\Windows\\Temp",
+                min_age=7 * 86400,
+                exclude=("*.lock", "*.log"),
+            )
+        )
+    return policies
 
-    for item in os.listdir(path):
-        item_path = os.path.join(path, item)
-        try:
-            if os.path.isfile(item_path):
-                os.remove(item_path)
-                deleted_count += 1
-            elif os.path.isdir(item_path):
-                shutil.rmtree(item_path)
-                deleted_count += 1
-        except Exception as e:
-            logger.error(f"Не удалось удалить {item_path}: {e}")
-            error_count += 1
 
-    return deleted_count, error_count
+def _format_progress(results: list[dict], dry_run: bool) -> str:
+    lines = [
+        (
+            "🔍 Оценка места для очистки (без удаления):"
+            if dry_run
+            else "🧹 Очистка временных файлов:"
+        )
+    ]
+    for stats in results:
+        icon = "✅" if stats["done"] else "⏳"
+        line = (
+            f"{icon} {stats['path']}: {stats['files']} файлов, "
+            f"{stats['dirs']} папок, {format_size(stats['bytes'])}"
+        )
+        if stats["errors"]:
+            line += f", ошибок: {stats['errors']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+async def clean_temp_directories(
+    paths: list[str], editor: ThrottledMessageEditor, dry_run: bool = False
+) -> list[dict]:
+    """
+    Очищает папки параллельно в пуле потоков и показывает прогресс в одном сообщении.
+    Возвращает счётчики по каждой папке.
+    """
+    results = [new_cleanup_stats(path) for path in paths]
+    tasks = [
+        asyncio.ensure_future(
+            run_blocking(
+                clean_directory, stats["path"], dry_run, stats, timeout=CLEANUP_TIMEOUT
+            )
+        )
+        for stats in results
+    ]
+    pending = set(tasks)
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=CLEANUP_PROGRESS_INTERVAL)
+        await editor.update(_format_progress(results, dry_run))
+
+    for stats, task in zip(results, tasks):
+        if task.exception() is not None:
+            logger.error(f"Ошибка очистки папки {stats['path']}: {task.exception()}")
+            stats["errors"] += 1
+        logger.info(
+            f"Очистка {stats['path']}{' (пробный запуск)' if dry_run else ''}: "
+            f"файлов {stats['files']}, папок {stats['dirs']}, "
+            f"{format_size(stats['bytes'])}, ошибок {stats['errors']}"
+        )
+    return results
 
 
 @restricted
 async def clear_all_temp_files(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    """Обработчик для очистки временных файлов."""
+    """Обработчик для очистки временных файлов. /clear_temp --dry-run только оценивает объём."""
     chat_id = update.effective_chat.id
+    dry_run = any(arg.lower() in DRY_RUN_FLAGS for arg in (context.args or []))
     message_to_edit = None
 
     if update.message:
@@ -55,79 +153,441 @@ async def clear_all_temp_files(
     elif update.callback_query and update.callback_query.message:
         message_to_edit = update.callback_query.message
 
+    start_text = (
+        "⏳ Оцениваю, сколько места можно освободить..."
+        if dry_run
+        else "⏳ Запускаю очистку временных файлов..."
+    )
     if message_to_edit:
-        await message_to_edit.reply_text("⏳ Запускаю очистку временных файлов...")
+        status = await message_to_edit.reply_text(start_text)
     else:
         logger.error(
             "Нет объекта сообщения для отправки ответа в clear_all_temp_files. Отправляю обычное сообщение."
         )
-        await context.bot.send_message(
-            chat_id=chat_id, text="⏳ Запускаю очистку временных файлов..."
+        status = await context.bot.send_message(chat_id=chat_id, text=start_text)
+    editor = ThrottledMessageEditor(status)
+
+    paths = [path for path in get_temp_directories() if os.path.isdir(path)]
+    if not paths:
+        await editor.flush(
+            "❌ Папки временных файлов не найдены (переменная окружения %TEMP% не задана)."
         )
+        return
 
-    total_deleted = 0
-    total_errors = 0
+    results = await clean_temp_directories(paths, editor, dry_run)
 
-    user_temp_path = os.getenv("TEMP")
-    if user_temp_path:
-        deleted, errors = await clear_temp_directory(
-            user_temp_path, chat_id, context.bot
-        )
-        total_deleted += deleted
-        total_errors += errors
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=f"✅ Очистка `{user_temp_path}` завершена. Удалено: {deleted}, Ошибок: {errors}",
-            parse_mode="Markdown",
+    total_files = sum(stats["files"] for stats in results)
+    total_bytes = sum(stats["bytes"] for stats in results)
+    total_errors = sum(stats["errors"] for stats in results)
+    if dry_run:
+        summary = (
+            f"\n\n🔍 Можно освободить: {format_size(total_bytes)} "
+            f"({total_files} файлов). Для удаления: /clear_temp"
         )
     else:
-        await context.bot.send_message(
-            chat_id=chat_id, text="❌ Переменная окружения %TEMP% не найдена."
+        summary = (
+            f"\n\n🎉 Очистка завершена! Освобождено: {format_size(total_bytes)}, "
+            f"удалено файлов: {total_files}\n"
+            f"Ошибок (файлы в использовании и т.п.): {total_errors}"
+        )
+    if platform.system() == "Windows" and total_errors:
+        summary += (
+            "\n⚠️ Для очистки C:\\Windows\\Temp и C:\\Windows\\Prefetch бот должен быть "
+            "запущен с правами администратора. Очистка Prefetch может временно "
+            "замедлить запуск приложений."
         )
+    await editor.flush(_format_progress(results, dry_run) + summary)
 
-    if platform.system() == "Windows":
-        system_temp_path = "C:\\Windows\\Temp"
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text="⚠️ Для очистки `C:\\Windows\\Temp` бот должен быть запущен с правами администратора.",
-            parse_mode="Markdown",
-        )
-        deleted, errors = await clear_temp_directory(
-            system_temp_path, chat_id, context.bot
-        )
-        total_deleted += deleted
-        total_errors += errors
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=f"✅ Очистка `{system_temp_path}` завершена. Удалено: {deleted}, Ошибок: {errors}",
-            parse_mode="Markdown",
-        )
-
-        prefetch_path = "C:\\Windows\\Prefetch"
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text="⚠️ Для очистки `C:\\Windows\\Prefetch` бот должен быть запущен с правами администратора. Обратите внимание, что это может временно замедлить запуск приложений после очистки.",
-            parse_mode="Markdown",
-        )
-        deleted, errors = await clear_temp_directory(
-            prefetch_path, chat_id, context.bot
-        )
-        total_deleted += deleted
-        total_errors += errors
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=f"✅ Очистка `{prefetch_path}` завершена. Удалено: {deleted}, Ошибок: {errors}",
-            parse_mode="Markdown",
+
+async def auto_cleanup_tick(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: один небольшой шаг автоочистки по всем политикам."""
+    snapshot = get_latest_snapshot()
+    if snapshot is not None and snapshot["cpu_percent"] > AUTO_CLEANUP_CPU_LIMIT:
+        logger.debug("Автоочистка пропущена: процессор загружен.")
+        return
+    try:
+        result = await run_blocking(
+            incremental_cleaner.tick,
+            get_cleanup_policies(),
+            AUTO_CLEANUP_SCAN_BUDGET,
+            AUTO_CLEANUP_DELETE_BUDGET,
         )
+    except Exception as e:
+        logger.error(f"Ошибка автоочистки: {e}")
+        return
+    if result["deleted"]:
+        logger.info(
+            f"Автоочистка: удалено {result['deleted']}, освобождено "
+            f"{format_size(result['freed'])}, просмотрено {result['scanned']}"
+        )
+
+
+def _format_auto_cleanup_status(enabled: bool) -> str:
+    lines = [
+        f"🧹 Автоочистка: {'включена' if enabled else 'выключена'} "
+        f"(шаг каждые {format_duration(AUTO_CLEANUP_INTERVAL)}, "
+        f"до {AUTO_CLEANUP_DELETE_BUDGET} удалений за шаг)"
+    ]
+    stats = {item["root"]: item for item in incremental_cleaner.summary()}
+    for policy in get_cleanup_policies():
+        line = (
+            f"\n📁 {policy['root']}\n" f"   старше {format_duration(policy['min_age'])}"
+        )
+        if policy["max_size"] is not None:
+            line += f", лимит {format_size(policy['max_size'])}"
+        if policy["exclude"]:
+            line += f", кроме {' '.join(policy['exclude'])}"
+        item = stats.get(policy["root"])
+        if item is not None:
+            line += (
+                f"\n   удалено {item['deleted']}, освобождено {format_size(item['freed'])}, "
+                f"проходов {item['passes']}, ошибок {item['errors']}"
+            )
+            if item["last_pass_size"] is not None:
+                line += (
+                    f"\n   размер после прохода: {format_size(item['last_pass_size'])}"
+                )
+        lines.append(line)
+    return "\n".join(lines)
+
+
+@restricted
+async def auto_cleanup(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Включает или выключает фоновую автоочистку: /auto_cleanup [on|off]."""
+    action = context.args[0].lower() if context.args else "status"
+    jobs = context.job_queue.get_jobs_by_name(AUTO_CLEANUP_JOB)
+
+    if action in ("on", "вкл"):
+        if not jobs:
+            context.job_queue.run_repeating(
+                auto_cleanup_tick,
+                interval=AUTO_CLEANUP_INTERVAL,
+                first=AUTO_CLEANUP_INTERVAL,
+                name=AUTO_CLEANUP_JOB,
+            )
+            await run_blocking(
+                save_job,
+                AUTO_CLEANUP_JOB,
+                AUTO_CLEANUP_JOB,
+                "repeating",
+                interval=AUTO_CLEANUP_INTERVAL,
+            )
+        enabled = True
+    elif action in ("off", "выкл"):
+        for job in jobs:
+            job.schedule_removal()
+        await run_blocking(delete_job, AUTO_CLEANUP_JOB)
+        enabled = False
+    elif action == "status":
+        enabled = bool(jobs)
     else:
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text="ℹ️ Очистка системных временных файлов и папки Prefetch специфична для Windows. Для вашей ОС (Linux/macOS) эта функция не применяется к `C:\\Windows\\Temp` и `C:\\Windows\\Prefetch`.",
+        await update.message.reply_text("Использование: /auto_cleanup [on|off]")
+        return
+
+    await update.message.reply_text(_format_auto_cleanup_status(enabled))
+
+
+def _split_batches(groups: list[tuple[int, list]], count: int) -> list[list]:
+    """Раскладывает группы по пачкам примерно равного объёма (крупные — первыми)."""
+    batches = [[] for _ in range(min(count, len(groups)))]
+    weights = [0] * len(batches)
+    for size, files in sorted(
+        groups, key=lambda group: group[0] * len(group[1]), reverse=True
+    ):
+        lightest = weights.index(min(weights))
+        batches[lightest].append((size, files))
+        weights[lightest] += size * len(files)
+    return batches
+
+
+async def _wait_with_progress(awaitables: list, editor, render) -> list:
+    """Дожидается задач пула, обновляя сообщение с прогрессом; возвращает их результаты."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    pending = set(tasks)
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=CLEANUP_PROGRESS_INTERVAL)
+        await editor.update(render())
+    return [task.result() for task in tasks]
+
+
+def _format_duplicates_progress(root: str, stage: str, stats: dict) -> str:
+    return (
+        f"🔎 Поиск дубликатов в {root}\n"
+        f"Этап: {stage}\n"
+        f"Файлов просмотрено: {stats['files']}, "
+        f"частичных хэшей: {stats['partial_hashed']}, "
+        f"полных: {stats['full_hashed']} ({format_size(stats['bytes_hashed'])})"
+    )
+
+
+async def find_duplicate_groups(
+    root: str, min_size: int, editor: ThrottledMessageEditor
+) -> tuple[list[dict], dict]:
+    """
+    Ищет дубликаты в три этапа: группировка по размеру (только метаданные),
+    хэш начала и конца файла, полный хэш для оставшихся совпадений.
+    Читаются только файлы, размер которых совпал с другими. Обход и хэширование
+    идут в пуле сканирования: одновременно работает лишь несколько пачек,
+    общий пул потоков остаётся свободным.
+    """
+    stats = {
+        "files": 0,
+        "partial_hashed": 0,
+        "full_hashed": 0,
+        "bytes_hashed": 0,
+        "errors": 0,
+    }
+    stage = "группировка по размеру"
+
+    def render() -> str:
+        return _format_duplicates_progress(root, stage, stats)
+
+    buckets = await _wait_with_progress(
+        [
+            run_scan(
+                collect_size_buckets,
+                root,
+                min_size,
+                stats,
+                timeout=DUPLICATES_TIMEOUT,
+            )
+        ],
+        editor,
+        render,
+    )
+    candidates = list(buckets[0].items())
+
+    stage = (
+        f"хэш начала и конца файлов ({sum(len(f) for _, f in candidates)} кандидатов)"
+    )
+    partial_groups = []
+    for result in await _wait_with_progress(
+        [
+            run_scan(hash_groups, batch, False, stats, timeout=DUPLICATES_TIMEOUT)
+            for batch in _split_batches(candidates, DUPLICATES_BATCHES)
+        ],
+        editor,
+        render,
+    ):
+        partial_groups.extend(result)
+
+    # Маленькие файлы частичный хэш прочитал целиком, полный хэш не нужен.
+    final_groups = [
+        (size, files)
+        for size, files in partial_groups
+        if size <= 2 * PARTIAL_HASH_BYTES
+    ]
+    to_verify = [
+        (size, files) for size, files in partial_groups if size > 2 * PARTIAL_HASH_BYTES
+    ]
+    stage = f"полный хэш ({sum(len(f) for _, f in to_verify)} файлов)"
+    for result in await _wait_with_progress(
+        [
+            run_scan(hash_groups, batch, True, stats, timeout=DUPLICATES_TIMEOUT)
+            for batch in _split_batches(to_verify, DUPLICATES_BATCHES)
+        ],
+        editor,
+        render,
+    ):
+        final_groups.extend(result)
+
+    groups = []
+    for size, files in final_groups:
+        files = sorted(files, key=lambda item: item[1])
+        groups.append(
+            {
+                "size": size,
+                "files": files,
+                "reclaimable": size * (len(files) - 1),
+                "deleted": None,
+            }
         )
+    groups.sort(key=lambda group: group["reclaimable"], reverse=True)
+    return groups, stats
+
+
+def _render_duplicates_page(report: dict) -> tuple[str, InlineKeyboardMarkup | None]:
+    groups = report["groups"]
+    pages = max(1, -(-len(groups) // DUPLICATES_PAGE_SIZE))
+    page = min(report["page"], pages - 1)
+    report["page"] = page
+    reclaimable = sum(group["reclaimable"] for group in groups if not group["deleted"])
 
-    final_message = (
-        f"🎉 Очистка временных файлов завершена!\n"
-        f"Всего удалено элементов: {total_deleted}\n"
-        f"Всего ошибок (файлы в использовании и т.п.): {total_errors}"
+    lines = [
+        f"🗂 Дубликаты в {report['root']}: групп {len(groups)}, "
+        f"можно освободить {format_size(reclaimable)}",
+        f"Файлов просмотрено: {report['stats']['files']}, прочитано полностью: "
+        f"{format_size(report['stats']['bytes_hashed'])}",
+    ]
+    if not groups:
+        lines.append("\n✅ Дубликатов не найдено.")
+        return "\n".join(lines), None
+
+    lines.append(f"Страница {page + 1} из {pages}")
+    start = page * DUPLICATES_PAGE_SIZE
+    buttons = []
+    for number, group in enumerate(groups[start : start + DUPLICATES_PAGE_SIZE], start):
+        lines.append(
+            f"\n{number + 1}. {len(group['files'])} × {format_size(group['size'])} "
+            f"— освободить {format_size(group['reclaimable'])}"
+        )
+        if group["deleted"]:
+            lines.append(f"   🗑 {group['deleted']}")
+        for index, (path, _) in enumerate(group["files"][:DUPLICATES_PATHS_SHOWN]):
+            lines.append(f"   {'✅' if index == 0 else '♻️'} {path}")
+        hidden = len(group["files"]) - DUPLICATES_PATHS_SHOWN
+        if hidden > 0:
+            lines.append(f"   …и ещё {hidden}")
+        if not group["deleted"]:
+            buttons.append(
+                InlineKeyboardButton(
+                    f"🗑 {number + 1}", callback_data=f"dup_del_{number}"
+                )
+            )
+
+    text = "\n".join(lines)
+    if len(text) > TELEGRAM_TEXT_LIMIT:
+        text = text[: TELEGRAM_TEXT_LIMIT - 1] + "…"
+    rows = [buttons] if buttons else []
+    navigation = []
+    if page > 0:
+        navigation.append(
+            InlineKeyboardButton("◀️", callback_data=f"dup_page_{page - 1}")
+        )
+    if page < pages - 1:
+        navigation.append(
+            InlineKeyboardButton("▶️", callback_data=f"dup_page_{page + 1}")
+        )
+    if navigation:
+        rows.append(navigation)
+    return text, InlineKeyboardMarkup(rows) if rows else None
+
+
+@restricted
+async def find_duplicates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Поиск одинаковых файлов: /find_duplicates <путь> [min=1M]."""
+    args = list(context.args or [])
+    min_size = DUPLICATES_MIN_SIZE
+    path_parts = []
+    try:
+        for arg in args:
+            if arg.lower().startswith("min="):
+                min_size = max(1, parse_size(arg[4:]))
+            else:
+                path_parts.append(arg)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    if not path_parts:
+        await update.message.reply_text(
+            "Использование: /find_duplicates <путь> [min=1M]\n"
+            f"По умолчанию файлы меньше {format_size(DUPLICATES_MIN_SIZE)} пропускаются."
+        )
+        return
+
+    root = os.path.abspath(os.path.expanduser(" ".join(path_parts)))
+    if not os.path.isdir(root):
+        await update.message.reply_text(f"❌ Папка не найдена: {root}")
+        return
+
+    status = await update.message.reply_text(f"🔎 Ищу дубликаты в {root}...")
+    editor = ThrottledMessageEditor(status)
+    try:
+        groups, stats = await find_duplicate_groups(root, min_size, editor)
+    except Exception as e:
+        logger.error(f"Ошибка поиска дубликатов в {root}: {e}")
+        await editor.flush(f"❌ Ошибка поиска дубликатов: {e}")
+        return
+
+    logger.info(
+        f"Дубликаты в {root}: групп {len(groups)}, файлов {stats['files']}, "
+        f"полностью прочитано {format_size(stats['bytes_hashed'])}"
     )
-    await context.bot.send_message(chat_id=chat_id, text=final_message)
+    report = {"root": root, "groups": groups, "stats": stats, "page": 0}
+    context.user_data[DUPLICATES_KEY] = report
+    text, reply_markup = _render_duplicates_page(report)
+    await status.edit_text(text, reply_markup=reply_markup)
+
+
+async def handle_duplicates_button(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, data: str
+) -> None:
+    """Кнопки отчёта о дубликатах: dup_page_N, dup_del_N (подтверждение), dup_yes_N."""
+    query = update.callback_query
+    report = context.user_data.get(DUPLICATES_KEY)
+    if report is None:
+        await query.edit_message_text(
+            "❌ Отчёт устарел. Запустите /find_duplicates заново."
+        )
+        return
+
+    _, action, value = data.split("_", 2)
+    index = int(value)
+    if action == "page":
+        report["page"] = index
+    elif action in ("del", "yes"):
+        if not 0 <= index < len(report["groups"]):
+            await query.edit_message_text("❌ Группа не найдена.")
+            return
+        group = report["groups"][index]
+        if action == "del" and not group["deleted"]:
+            copies = "\n".join(f"♻️ {path}" for path, _ in group["files"][1:])
+            text = (
+                f"⚠️ Удалить {len(group['files']) - 1} копий и освободить "
+                f"{format_size(group['reclaimable'])}?\n"
+                f"Останется: {group['files'][0][0]}\n\n{copies}"
+            )
+            if len(text) > TELEGRAM_TEXT_LIMIT:
+                text = text[: TELEGRAM_TEXT_LIMIT - 1] + "…"
+            await query.edit_message_text(
+                text,
+                reply_markup=InlineKeyboardMarkup(
+                    [
+                        [
+                            InlineKeyboardButton(
+                                "✅ Удалить копии", callback_data=f"dup_yes_{index}"
+                            ),
+                            InlineKeyboardButton(
+                                "↩️ Назад", callback_data=f"dup_page_{report['page']}"
+                            ),
+                        ]
+                    ]
+                ),
+            )
+            return
+        if action == "yes" and not group["deleted"]:
+            # Удаление идёт отдельной задачей: обработчик кнопок блокирующий,
+            # а повторное нажатие видит группу уже помеченной.
+            group["deleted"] = "удаляется…"
+            context.application.create_task(
+                _delete_group(query, report, group), update=update
+            )
+
+    text, reply_markup = _render_duplicates_page(report)
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+
+async def _delete_group(query, report: dict, group: dict) -> None:
+    try:
+        result = await run_blocking(delete_duplicates, group)
+    except Exception as e:
+        logger.error(f"Ошибка удаления дубликатов размера {group['size']}: {e}")
+        # Кнопка удаления вернётся, можно повторить.
+        group["deleted"] = None
+    else:
+        group["deleted"] = (
+            f"удалено {result['deleted']}, освобождено {format_size(result['freed'])}"
+            + (
+                f", пропущено изменённых: {result['skipped']}"
+                if result["skipped"]
+                else ""
+            )
+            + (f", ошибок: {result['errors']}" if result["errors"] else "")
+        )
+        logger.info(f"Удаление дубликатов размера {group['size']}: {group['deleted']}")
+    text, reply_markup = _render_duplicates_page(report)
+    try:
+        await query.edit_message_text(text, reply_markup=reply_markup)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
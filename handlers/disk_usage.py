@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+from utils.decorators import restricted
+from utils.du_index import (
+    list_directory,
+    new_scan_stats,
+    scan_directory,
+    store_directory,
+)
+from utils.executor import run_blocking, run_scan
+from utils.file_scan import format_size
+from utils.message_editor import ThrottledMessageEditor
+
+logger = logging.getLogger(__name__)
+
+# Сколько крупнейших элементов показывать и сколько из них папок получают кнопки.
+DU_TOP_N = 10
+DU_BUTTONS = 8
+# Сканирование одной подпапки верхнего уровня может идти долго на большом диске.
+DU_TIMEOUT = 1800
+DU_PROGRESS_INTERVAL = 2
+# Пути для кнопок хранятся в user_data по id сообщения; старые сообщения вытесняются.
+DU_PATHS_KEY = "du_paths"
+DU_REMEMBERED_MESSAGES = 20
+RESCAN_FLAGS = ("--rescan", "--force")
+
+
+def _format_listing(
+    path: str, entries: list[tuple], total: int, stats: dict, done: bool
+) -> str:
+    elapsed = time.monotonic() - stats["started"]
+    header = "💽" if done else "⏳"
+    lines = [
+        f"{header} {path} — {format_size(total)}"
+        + ("" if done else " (подсчёт продолжается...)"),
+        f"Папок прочитано: {stats['scanned']}, из индекса: {stats['cached']}, "
+        f"ошибок: {stats['errors']}, {elapsed:.1f} с",
+        "",
+    ]
+    for number, (name, size, is_dir) in enumerate(entries[:DU_TOP_N], start=1):
+        share = f" ({size / total:.0%})" if total else ""
+        icon = "📁" if is_dir else "📄"
+        lines.append(f"{number}. {icon} {name} — {format_size(size)}{share}")
+    if not entries:
+        lines.append("Папка пуста.")
+    if done and stats["cached"]:
+        minutes = max(1, round((time.time() - stats["oldest_cached"]) / 60))
+        lines.append(
+            f"\nℹ️ Размеры {stats['cached']} папок взяты из индекса (до {minutes} мин "
+            "давности): файлы, выросшие без изменения папки, там не учтены. "
+            f"Пересчитать: /du {path} --rescan"
+        )
+    return "\n".join(lines)
+
+
+def _sorted_entries(listing: dict, child_totals: dict) -> list[tuple]:
+    entries = [(name, size, True) for name, size in child_totals.items()]
+    entries.extend((name, size, False) for name, size in listing["top_files"])
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return entries
+
+
+def _build_keyboard(
+    context: ContextTypes.DEFAULT_TYPE, message_id: int, path: str, entries: list
+) -> InlineKeyboardMarkup | None:
+    """Кнопки перехода в крупнейшие подпапки и на уровень выше."""
+    targets = [
+        os.path.join(path, name) for name, _, is_dir in entries[:DU_TOP_N] if is_dir
+    ][:DU_BUTTONS]
+    parent = os.path.dirname(path)
+    if parent == path:
+        parent = None
+
+    paths = context.user_data.setdefault(DU_PATHS_KEY, OrderedDict())
+    paths[message_id] = targets + ([parent] if parent else [])
+    paths.move_to_end(message_id)
+    while len(paths) > DU_REMEMBERED_MESSAGES:
+        paths.popitem(last=False)
+
+    rows = [
+        [
+            InlineKeyboardButton(
+                f"📁 {os.path.basename(target)}", callback_data=f"du_{i}"
+            )
+        ]
+        for i, target in enumerate(targets)
+    ]
+    if parent:
+        rows.append(
+            [InlineKeyboardButton("⬆️ Наверх", callback_data=f"du_{len(targets)}")]
+        )
+    return InlineKeyboardMarkup(rows) if rows else None
+
+
+async def show_disk_usage(
+    context: ContextTypes.DEFAULT_TYPE, message, path: str, force: bool = False
+) -> None:
+    """
+    Считает размеры содержимого папки и показывает крупнейшие элементы в сообщении
+    message. Подпапки верхнего уровня сканируются параллельно, промежуточный
+    результат обновляется по мере их завершения. Сканирование идёт в отдельном
+    пуле (run_scan), общий пул остаётся свободным для фоновых задач.
+    """
+    editor = ThrottledMessageEditor(message)
+    stats = new_scan_stats()
+    listing = await run_blocking(list_directory, path, stats)
+    if listing is None:
+        await editor.flush(f"❌ Не удалось прочитать папку: {path}")
+        return
+
+    child_totals = {}
+    tasks = {
+        asyncio.ensure_future(
+            run_scan(
+                scan_directory,
+                os.path.join(path, name),
+                stats,
+                force,
+                timeout=DU_TIMEOUT,
+            )
+        ): name
+        for name in listing["subdirs"]
+    }
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, timeout=DU_PROGRESS_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            if task.exception() is not None:
+                logger.error(
+                    f"Ошибка подсчёта размера {tasks[task]} в {path}: {task.exception()}"
+                )
+                stats["errors"] += 1
+            elif task.result() is not None:
+                child_totals[tasks[task]] = task.result()
+        if pending:
+            total = listing["files_size"] + sum(child_totals.values())
+            await editor.update(
+                _format_listing(
+                    path, _sorted_entries(listing, child_totals), total, stats, False
+                )
+            )
+
+    total = listing["files_size"] + sum(child_totals.values())
+    await run_blocking(store_directory, path, listing, total)
+    entries = _sorted_entries(listing, child_totals)
+    text = _format_listing(path, entries, total, stats, True)
+    reply_markup = _build_keyboard(context, editor.message.message_id, path, entries)
+    try:
+        await editor.message.edit_text(text, reply_markup=reply_markup)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+    logger.info(
+        f"/du {path}: {format_size(total)}, прочитано папок {stats['scanned']}, "
+        f"из индекса {stats['cached']}, {time.monotonic() - stats['started']:.1f} с"
+    )
+
+
+@restricted
+async def disk_usage(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Крупнейшие папки и файлы: /du <путь> [--rescan]."""
+    args = list(context.args or [])
+    force = any(arg.lower() in RESCAN_FLAGS for arg in args)
+    path_parts = [arg for arg in args if arg.lower() not in RESCAN_FLAGS]
+    path = " ".join(path_parts) if path_parts else os.path.abspath(os.sep)
+    path = os.path.abspath(os.path.expanduser(path))
+
+    if not os.path.isdir(path):
+        await update.message.reply_text(
+            f"❌ Папка не найдена: {path}\nИспользование: /du <путь> [--rescan]"
+        )
+        return
+
+    message = await update.message.reply_text(f"⏳ Считаю размер {path}...")
+    try:
+        await show_disk_usage(context, message, path, force)
+    except Exception as e:
+        logger.error(f"Ошибка /du для {path}: {e}")
+        await message.edit_text(f"❌ Ошибка подсчёта размера {path}: {e}")
+
+
+async def handle_du_button(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, index: int
+) -> None:
+    """Переход по кнопке /du: открывает подпапку в том же сообщении."""
+    query = update.callback_query
+    paths = context.user_data.get(DU_PATHS_KEY, {}).get(query.message.message_id)
+    if not paths or not 0 <= index < len(paths):
+        await query.edit_message_text("❌ Список устарел. Запустите /du заново.")
+        return
+    path = paths[index]
+    await query.edit_message_text(f"⏳ Считаю размер {path}...")
+    # Обработчик инлайн-кнопок блокирующий: подсчёт уходит в отдельную задачу,
+    # чтобы бот продолжал принимать команды, пока сканируется большая папка.
+    context.application.create_task(
+        _drill_down(context, query.message, path), update=update
+    )
+
+
+async def _drill_down(context: ContextTypes.DEFAULT_TYPE, message, path: str) -> None:
+    try:
+        await show_disk_usage(context, message, path)
+    except Exception as e:
+        logger.error(f"Ошибка /du для {path}: {e}")
+        await message.edit_text(f"❌ Ошибка подсчёта размера {path}: {e}")
@@ -1,48 +1,71 @@
 import logging
 import psutil
 import platform
-import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from utils.decorators import restricted
 import time
+from collections import OrderedDict
 from telegram.helpers import escape_markdown
-from utils.state_manager import save_bot_state
-
-# Проверка доступности модулей для скриншотов
-try:
-    import pyautogui
-    from PIL import Image
-
-    SCREENSHOT_AVAILABLE = True
-except ImportError:
-    SCREENSHOT_AVAILABLE = False
-    logging.warning(
-        "Функция скриншотов недоступна - отсутствуют зависимости (pyautogui, Pillow)"
-    )
-
-# Проверка доступности модулей для батареи
-try:
-    import psutil
-
-    BATTERY_AVAILABLE = True
-except ImportError:
-    BATTERY_AVAILABLE = False
-    logging.warning(
-        "Функция мониторинга батареи недоступна - отсутствует зависимость (psutil)"
-    )
-
+from utils.state_manager import mark_state_dirty
+from utils.metrics_sampler import get_latest_snapshot, snapshot_age
+from utils.process_cache import MATCH_MODES, process_table
+from utils.alert_rules import alert_engine, enabled_groups
+from utils.battery_monitor import battery_monitor
+from utils.process_groups import GROUP_MODES, SORT_KEYS, aggregate_processes
+from utils.process_kill import collect_targets, terminate_processes
+from utils.file_scan import format_size
+from utils.executor import run_blocking, run_cpu_bound, get_executor_stats
+from utils.metrics_history import metrics_history, summarize
+from utils.charts import CHARTS_AVAILABLE, render_area_chart
+from utils.time_parsing import format_duration, parse_duration
 
 logger = logging.getLogger(__name__)
 
+# Сколько найденных процессов показывать в /is_running и /kill_process.
+PROCESS_MATCHES_SHOWN = 25
+KILL_TREE_FLAGS = ("--tree", "-t")
+# Сколько групп показывать в /apps.
+APPS_TOP_N = 15
+
+# /history: метрика -> (ряд в истории, подпись графика, верх шкалы, делитель, единица).
+HISTORY_METRICS = {
+    "cpu": ("cpu", "CPU, %", 100, 1, "%"),
+    "ram": ("ram", "RAM, %", 100, 1, "%"),
+    "disk": ("disk", "Disk, %", 100, 1, "%"),
+    "swap": ("swap", "Swap, %", 100, 1, "%"),
+    "net": ("net_recv", "Network in, KB/s", None, 1024, " КБ/с"),
+    "net_in": ("net_recv", "Network in, KB/s", None, 1024, " КБ/с"),
+    "net_out": ("net_sent", "Network out, KB/s", None, 1024, " КБ/с"),
+    "battery": ("battery", "Battery, %", 100, 1, "%"),
+}
+HISTORY_DEFAULT_WINDOW = 3600
+HISTORY_MAX_WINDOW = 30 * 86400
+# Кэш отправленных графиков: (метрика, окно, разрешение, время последней точки) -> file_id.
+HISTORY_RENDER_CACHE_SIZE = 32
+_history_file_ids = OrderedDict()
+
 
 @restricted
 async def system_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Отправляет информацию о статусе системы."""
-    cpu_percent = psutil.cpu_percent(interval=1)
-    virtual_memory = psutil.virtual_memory()
-    disk_usage = psutil.disk_usage("/")
+    """Отправляет информацию о статусе системы из последнего фонового замера."""
+    snapshot = get_latest_snapshot()
+    if snapshot is None:
+        await update.message.reply_text(
+            "⏳ Данные о системе ещё собираются\\. Повторите запрос через несколько секунд\\.",
+            parse_mode="MarkdownV2",
+        )
+        return
+
+    cpu_percent = snapshot["cpu_percent"]
+    virtual_memory = snapshot["virtual_memory"]
+    swap_memory = snapshot["swap_memory"]
+    disk_usage = snapshot["disk_usage"]
+    age = snapshot_age(snapshot)
+    executor_stats = get_executor_stats()
+    queued_tasks = sum(pool["queue_depth"] for pool in executor_stats.values())
+    running_tasks = sum(pool["pending"] for pool in executor_stats.values())
 
     status_text = (
         f"💻 *Статус системы:*\n"
@@ -50,8 +73,12 @@ async def system_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         f"RAM: `{virtual_memory.percent:.1f}%` использовано "
         # ИСПРАВЛЕНИЕ: Заменяем `\\))` на `\\)`
         f"\\({escape_markdown(f'{virtual_memory.used / (1024**3):.1f}', version=2)} ГБ из {escape_markdown(f'{virtual_memory.total / (1024**3):.1f}', version=2)} ГБ\\)\n"
+        f"Подкачка: `{swap_memory.percent:.1f}%` использовано "
+        f"\\({escape_markdown(f'{swap_memory.used / (1024**3):.1f}', version=2)} ГБ из {escape_markdown(f'{swap_memory.total / (1024**3):.1f}', version=2)} ГБ\\)\n"
         f"Диск C\\: `{disk_usage.percent:.1f}%` использовано "
-        f"\\({escape_markdown(f'{disk_usage.used / (1024**3):.1f}', version=2)} ГБ из {escape_markdown(f'{disk_usage.total / (1024**3):.1f}', version=2)} ГБ\\)"
+        f"\\({escape_markdown(f'{disk_usage.used / (1024**3):.1f}', version=2)} ГБ из {escape_markdown(f'{disk_usage.total / (1024**3):.1f}', version=2)} ГБ\\)\n"
+        f"Фоновые задачи: `{running_tasks}` \\(в очереди: `{queued_tasks}`\\)\n"
+        f"_Данные обновлены {escape_markdown(f'{age:.0f}', version=2)} с назад_"
     )
 
     await update.message.reply_text(status_text, parse_mode="MarkdownV2")
@@ -81,49 +108,105 @@ async def uptime(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 @restricted
-async def list_processes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Отправляет список наиболее ресурсоемких процессов."""
-    chat_id = update.effective_chat.id
-
-    sent_message = await context.bot.send_message(
-        chat_id=chat_id,
-        text=escape_markdown(
-            "⏳ Собираю данные о процессах... Это может занять несколько секунд при первом запросе.",
-            version=2,
-        ),
-        parse_mode="MarkdownV2",
+async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отправляет график метрики за выбранное окно: /history cpu 1h."""
+    usage = (
+        "Использование: `/history <метрика> [окно]`\n"
+        f"Метрики: {escape_markdown(', '.join(HISTORY_METRICS), version=2)}\n"
+        "Окно: например `30m`, `1h`, `24h`, `7d`"
     )
+    if not context.args or context.args[0].lower() not in HISTORY_METRICS:
+        await update.message.reply_text(usage, parse_mode="MarkdownV2")
+        return
+    if not CHARTS_AVAILABLE:
+        await update.message.reply_text(
+            "❌ Построение графиков недоступно\\. Установите `pip install pillow`",
+            parse_mode="MarkdownV2",
+        )
+        return
 
+    metric_name = context.args[0].lower()
+    series, title, y_max, divisor, unit = HISTORY_METRICS[metric_name]
     try:
-        for p in psutil.process_iter(["pid"]):
-            try:
-                _ = p.cpu_percent(interval=None)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-
-        await asyncio.sleep(0.5)
-
-        processes = []
-        for p in psutil.process_iter(["pid", "name", "cpu_percent", "memory_info"]):
-            try:
-                if p.status() == psutil.STATUS_ZOMBIE:
-                    continue
-                p_info = p.info
-                processes.append(
-                    {
-                        "pid": p_info["pid"],
-                        "name": p_info["name"],
-                        "cpu_percent": p_info["cpu_percent"],
-                        "memory_percent": p_info["memory_info"].rss
-                        / psutil.virtual_memory().total
-                        * 100,
-                    }
-                )
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+        window = (
+            parse_duration(context.args[1], default_unit="h")
+            if len(context.args) > 1
+            else HISTORY_DEFAULT_WINDOW
+        )
+    except ValueError:
+        await update.message.reply_text(usage, parse_mode="MarkdownV2")
+        return
+    window = min(window, HISTORY_MAX_WINDOW)
+
+    resolution, timestamps, values = metrics_history.points(series, window)
+    if not values:
+        await update.message.reply_text(
+            "⏳ За этот период ещё нет данных\\. История копится с момента запуска бота\\.",
+            parse_mode="MarkdownV2",
+        )
+        return
+
+    values = [value / divisor for value in values]
+    stats = summarize(values)
+    caption = (
+        f"📈 {metric_name} за {format_duration(window)} "
+        f"(шаг {format_duration(resolution)}, точек: {stats['count']})\n"
+        f"мин {stats['min']:.1f}{unit} · сред {stats['avg']:.1f}{unit} · "
+        f"p95 {stats['p95']:.1f}{unit} · макс {stats['max']:.1f}{unit}"
+    )
 
-        processes.sort(
-            key=lambda x: x["cpu_percent"] + x["memory_percent"], reverse=True
+    cache_key = (
+        series,
+        window,
+        resolution,
+        metrics_history.last_timestamp(series, window),
+    )
+    file_id = _history_file_ids.get(cache_key)
+    if file_id:
+        _history_file_ids.move_to_end(cache_key)
+        await update.message.reply_photo(photo=file_id, caption=caption)
+        return
+
+    try:
+        now = time.time()
+        png = await run_cpu_bound(
+            render_area_chart,
+            timestamps,
+            values,
+            title,
+            y_max,
+            now - window,
+            now,
+            f"-{format_duration(window, latin=True)}",
+        )
+        message = await update.message.reply_photo(photo=png, caption=caption)
+        _history_file_ids[cache_key] = message.photo[-1].file_id
+        while len(_history_file_ids) > HISTORY_RENDER_CACHE_SIZE:
+            _history_file_ids.popitem(last=False)
+    except Exception as e:
+        logger.error(f"Ошибка при построении графика {metric_name}: {e}")
+        await update.message.reply_text(f"❌ Не удалось построить график: {e}")
+
+
+def _processes_not_ready_text() -> str:
+    return "⏳ Таблица процессов ещё заполняется\\. Повторите запрос через несколько секунд\\."
+
+
+@restricted
+async def list_processes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Отправляет список наиболее ресурсоемких процессов из кэша процессов."""
+    age = process_table.age()
+    if age is None:
+        await update.message.reply_text(
+            _processes_not_ready_text(), parse_mode="MarkdownV2"
+        )
+        return
+
+    try:
+        processes = sorted(
+            process_table.rows(),
+            key=lambda x: x["cpu_percent"] + x["memory_percent"],
+            reverse=True,
         )
 
         message_parts = []
@@ -131,83 +214,241 @@ async def list_processes(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
         message_parts.append("```\n")
         for i, p in enumerate(processes[:10]):
+            cpu_text = f"{p['cpu_percent']:.1f}%"
+            ram_text = f"{p['memory_percent']:.1f}%"
             line = (
                 f"{i+1}. PID: {p['pid']}, {escape_markdown(p['name'], version=2)}, "  # Экранируем имя процесса, на всякий случай
-                f"CPU: {escape_markdown(f'{p['cpu_percent']:.1f}%', version=2)}, "  # Экранируем CPU процент
-                f"RAM: {escape_markdown(f'{p['memory_percent']:.1f}%', version=2)}\n"  # Экранируем RAM процент
+                f"CPU: {escape_markdown(cpu_text, version=2)}, "  # Экранируем CPU процент
+                f"RAM: {escape_markdown(ram_text, version=2)}\n"  # Экранируем RAM процент
             )
             message_parts.append(line)
         message_parts.append("```\n")
 
         message_parts.append(
-            "_Для завершения процесса используйте_ `/kill_process \\[PID\\]`"
+            f"_Данные обновлены {escape_markdown(f'{age:.0f}', version=2)} с назад_\n"
+            "_Для завершения процесса используйте_ `/kill_process \\[PID\\]` или `/kill_process \\[имя\\]`"
         )
 
-        final_message_text = "".join(message_parts)
-
-        await sent_message.edit_text(final_message_text, parse_mode="MarkdownV2")
+        await update.message.reply_text("".join(message_parts), parse_mode="MarkdownV2")
 
     except Exception as e:
         logger.error(f"Ошибка при получении списка процессов: {e}")
-        error_message = f"❌ Произошла ошибка при получении списка процессов: `{escape_markdown(str(e), version=2)}`"
-        try:
-            await sent_message.edit_text(error_message, parse_mode="MarkdownV2")
-        except Exception as edit_error:
-            logger.error(
-                f"Не удалось отредактировать сообщение с ошибкой: {edit_error}"
+        await update.message.reply_text(
+            f"❌ Произошла ошибка при получении списка процессов: `{escape_markdown(str(e), version=2)}`",
+            parse_mode="MarkdownV2",
+        )
+
+
+@restricted
+async def list_apps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Процессы, сгруппированные в приложения, с суммарными CPU, RAM, потоками
+    и дескрипторами. /apps [exe|tree] [cpu|ram|threads|handles|count]
+    """
+    by, sort = "exe", "cpu"
+    for arg in context.args or []:
+        arg = arg.lower()
+        if arg in GROUP_MODES:
+            by = arg
+        elif arg in SORT_KEYS:
+            sort = arg
+        else:
+            await update.message.reply_text(
+                "Использование: `/apps [exe|tree] [cpu|ram|threads|handles|count]`",
+                parse_mode="MarkdownV2",
             )
-            await context.bot.send_message(
-                chat_id=chat_id, text=error_message, parse_mode="MarkdownV2"
+            return
+
+    age = process_table.age()
+    if age is None:
+        await update.message.reply_text(
+            _processes_not_ready_text(), parse_mode="MarkdownV2"
+        )
+        return
+
+    try:
+        groups = aggregate_processes(process_table.columns(), by, sort)
+        lines = [
+            f"*Приложения* \\({'по исполняемому файлу' if by == 'exe' else 'по дереву процессов'}, "
+            f"сортировка: {sort}\\):\n\n",
+            "```\n",
+            escape_markdown(
+                f"{'Приложение':<24} {'Проц':>4} {'CPU':>6} {'RAM':>9} {'Пот':>5} {'Деск':>6}\n",
+                version=2,
+                entity_type="pre",
+            ),
+        ]
+        for group in groups[:APPS_TOP_N]:
+            lines.append(
+                escape_markdown(
+                    f"{group['name'][:24]:<24} {group['count']:>4} "
+                    f"{group['cpu_percent']:5.1f}% {format_size(group['rss']):>9} "
+                    f"{group['threads']:>5} {group['handles']:>6}\n",
+                    version=2,
+                    entity_type="pre",
+                )
             )
+        lines.append("```\n")
+        if len(groups) > APPS_TOP_N:
+            lines.append(f"_…и ещё {len(groups) - APPS_TOP_N}_\n")
+        lines.append(
+            f"_Данные обновлены {escape_markdown(f'{age:.0f}', version=2)} с назад_"
+        )
+        await update.message.reply_text("".join(lines), parse_mode="MarkdownV2")
+    except Exception as e:
+        logger.error(f"Ошибка при группировке процессов: {e}")
+        await update.message.reply_text(
+            f"❌ Ошибка при группировке процессов: `{escape_markdown(str(e), version=2)}`",
+            parse_mode="MarkdownV2",
+        )
 
 
 @restricted
 async def check_process_running(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    """Проверяет, запущен ли процесс по имени."""
-    if not context.args:
+    """
+    Ищет процессы по имени в индексе кэша процессов и показывает все совпадения.
+    /is_running [--exact|--prefix|--regex|--fuzzy] <имя>
+    """
+    args = list(context.args or [])
+    mode = "auto"
+    if args and args[0].startswith("--") and args[0][2:].lower() in MATCH_MODES:
+        mode = args.pop(0)[2:].lower()
+    if not args:
         await update.message.reply_text(
-            "Использование: `/is_running <имя_приложения>`", parse_mode="MarkdownV2"
+            "Использование: `/is_running <имя_приложения>`\n"
+            "Режимы поиска: `--exact`, `--prefix`, `--regex`, `--fuzzy`",
+            parse_mode="MarkdownV2",
         )
         return
 
-    process_name = " ".join(context.args).lower()
-    found = False
-    for p in psutil.process_iter(["name"]):
-        if process_name in p.info["name"].lower():
-            await update.message.reply_text(
-                f"✅ Процесс `{p.info['name']}` \\(PID: `{p.pid}`\\) *запущен*\\.",
-                parse_mode="MarkdownV2",
-            )
-            found = True
-            break
-    if not found:
+    if process_table.age() is None:
+        await update.message.reply_text(
+            _processes_not_ready_text(), parse_mode="MarkdownV2"
+        )
+        return
+
+    process_name = " ".join(args)
+    try:
+        used_mode, matches = process_table.find(process_name, mode)
+    except ValueError as e:
         await update.message.reply_text(
-            f"❌ Процесс `{process_name}` *не найден*\\.", parse_mode="MarkdownV2"
+            f"❌ {escape_markdown(str(e), version=2)}", parse_mode="MarkdownV2"
+        )
+        return
+
+    if not matches:
+        await update.message.reply_text(
+            f"❌ Процесс `{escape_markdown(process_name, version=2)}` *не найден*\\.",
+            parse_mode="MarkdownV2",
+        )
+        return
+
+    matches = sorted(matches, key=lambda p: (p["name"].lower(), p["pid"]))
+    total_cpu = sum(p["cpu_percent"] for p in matches)
+    total_rss = sum(p["rss"] for p in matches)
+    mode_names = {
+        "exact": "точное совпадение",
+        "prefix": "по началу имени",
+        "substring": "по части имени",
+        "regex": "регулярное выражение",
+        "fuzzy": "похожие имена",
+    }
+    lines = [
+        f"✅ Найдено процессов: *{len(matches)}* \\({escape_markdown(mode_names[used_mode], version=2)}\\)\n",
+        "```\n",
+    ]
+    for p in matches[:PROCESS_MATCHES_SHOWN]:
+        lines.append(
+            escape_markdown(
+                f"{p['pid']:>7}  {p['name'][:28]:<28} CPU {p['cpu_percent']:5.1f}%  "
+                f"RSS {format_size(p['rss'])}\n",
+                version=2,
+                entity_type="pre",
+            )
         )
+    lines.append("```\n")
+    if len(matches) > PROCESS_MATCHES_SHOWN:
+        lines.append(f"_…и ещё {len(matches) - PROCESS_MATCHES_SHOWN}_\n")
+    lines.append(
+        escape_markdown(
+            f"Всего: CPU {total_cpu:.1f}%, RSS {format_size(total_rss)}", version=2
+        )
+    )
+    await update.message.reply_text("".join(lines), parse_mode="MarkdownV2")
 
 
 @restricted
 async def kill_process_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    """Завершает процесс по PID с подтверждением."""
-    if not context.args:
+    """
+    Завершает процессы с подтверждением.
+    /kill_process [--tree] <PID> [PID ...] | [--tree] [--<режим>] <имя>
+    По имени без флага ищется только точное совпадение или префикс: подстрока,
+    регулярное выражение и нечёткий поиск — лишь по явному флагу, чтобы опечатка
+    не выбрала для завершения посторонние процессы.
+    """
+    args = list(context.args or [])
+    tree = any(arg.lower() in KILL_TREE_FLAGS for arg in args)
+    args = [arg for arg in args if arg.lower() not in KILL_TREE_FLAGS]
+    mode = "strict"
+    if args and args[0].startswith("--") and args[0][2:].lower() in MATCH_MODES:
+        mode = args.pop(0)[2:].lower()
+    if not args:
         await update.message.reply_text(
-            "Использование: `/kill_process <PID>`", parse_mode="MarkdownV2"
+            "Использование: `/kill_process <PID> [PID ...]` или `/kill_process <имя>`\n"
+            "По имени — точное совпадение или префикс; "
+            "`\\-\\-substring`, `\\-\\-regex`, `\\-\\-fuzzy` — другие режимы поиска\n"
+            "`\\-\\-tree` — вместе со всеми дочерними процессами",
+            parse_mode="MarkdownV2",
         )
         return
 
     try:
-        pid = int(context.args[0])
-        context.user_data["kill_pid"] = pid
+        tokens = [part for arg in args for part in arg.split(",") if part]
+        if all(token.isdigit() for token in tokens):
+            pids = [int(token) for token in tokens]
+            query = None
+        else:
+            if process_table.age() is None:
+                await update.message.reply_text(
+                    _processes_not_ready_text(), parse_mode="MarkdownV2"
+                )
+                return
+            query = " ".join(args)
+            _, matches = process_table.find(query, mode)
+            pids = [p["pid"] for p in matches]
+
+        targets, missing = await run_blocking(collect_targets, pids, tree)
+        if not targets:
+            text = (
+                f"❌ Процесс `{escape_markdown(query, version=2)}` *не найден*\\."
+                if query is not None
+                else "❌ Процессы с указанными PID *не найдены или уже завершены*\\."
+            )
+            await update.message.reply_text(text, parse_mode="MarkdownV2")
+            return
 
-        try:
-            process = psutil.Process(pid)
-            process_info = f"Процесс: `{process.name()}` \\(PID: `{pid}`\\)"
-        except psutil.NoSuchProcess:
-            process_info = f"PID: `{pid}` (Процесс не найден или уже завершен)"
+        context.user_data["kill_targets"] = targets
+        lines = [
+            f"⚠️ Вы уверены, что хотите завершить процессов: *{len(targets)}*"
+            + (" \\(вместе с дочерними\\)" if tree else "")
+            + "?\n",
+            "```\n",
+        ]
+        for pid, _, name in targets[:PROCESS_MATCHES_SHOWN]:
+            lines.append(
+                escape_markdown(
+                    f"{pid:>7}  {name[:40]}\n", version=2, entity_type="pre"
+                )
+            )
+        lines.append("```")
+        if len(targets) > PROCESS_MATCHES_SHOWN:
+            lines.append(f"\n_…и ещё {len(targets) - PROCESS_MATCHES_SHOWN}_")
+        if missing:
+            lines.append(f"\nPID уже не существует: {missing}")
 
         reply_markup = InlineKeyboardMarkup(
             [
@@ -216,14 +457,14 @@ async def kill_process_command(
             ]
         )
         await update.message.reply_text(
-            f"⚠️ Вы уверены, что хотите завершить {process_info}?",
+            "".join(lines),
             reply_markup=reply_markup,
             parse_mode="MarkdownV2",
         )
 
-    except ValueError:
+    except ValueError as e:
         await update.message.reply_text(
-            "❌ PID должен быть числом\\.", parse_mode="MarkdownV2"
+            f"❌ {escape_markdown(str(e), version=2)}", parse_mode="MarkdownV2"
         )
     except Exception as e:
         logger.error(f"Ошибка при подготовке завершения процесса: {e}")
@@ -231,47 +472,35 @@ async def kill_process_command(
 
 
 async def execute_kill_process(
-    update: Update, context: ContextTypes.DEFAULT_TYPE, pid: int
+    update: Update, context: ContextTypes.DEFAULT_TYPE, targets: list[tuple]
 ) -> None:
-    """Выполняет завершение процесса после подтверждения."""
+    """
+    Выполняет завершение процессов после подтверждения: все цели завершаются
+    разом в пуле потоков, итог приходит одним сообщением.
+    """
+    query = update.callback_query
+    await query.edit_message_text(f"⏳ Завершаю процессов: {len(targets)}...")
     try:
-        process = psutil.Process(pid)
-        process_name = process.name()
-        process.terminate()
-        process.wait(timeout=3)
-
-        if process.is_running():
-            process.kill()
-            await update.callback_query.edit_message_text(
-                f"☠️ Процесс `{process_name}` \\(PID: `{pid}`\\) *был принудительно завершен*\\.",
-                parse_mode="MarkdownV2",
-            )
-            logger.info(f"Процесс {process_name} (PID: {pid}) принудительно завершен.")
-        else:
-            await update.callback_query.edit_message_text(
-                f"✅ Процесс `{process_name}` \\(PID: `{pid}`\\) *успешно завершен*\\.",
-                parse_mode="MarkdownV2",
-            )
-            logger.info(f"Процесс {process_name} (PID: {pid}) успешно завершен.")
-
-    except psutil.NoSuchProcess:
-        await update.callback_query.edit_message_text(
-            f"❌ Процесс с PID `{pid}` *не найден или уже завершен*\\.",
-            parse_mode="MarkdownV2",
-        )
-        logger.warning(f"Попытка завершить несуществующий процесс PID: {pid}")
-    except psutil.AccessDenied:
-        await update.callback_query.edit_message_text(
-            f"❌ Отказано в доступе для завершения процесса с PID `{pid}`\\.",
-            parse_mode="MarkdownV2",
-        )
-        logger.error(f"Отказано в доступе при завершении процесса PID: {pid}")
+        result = await run_blocking(terminate_processes, targets)
     except Exception as e:
-        logger.error(f"Ошибка при завершении процесса PID {pid}: {e}")
-        await update.callback_query.edit_message_text(
-            f"❌ Неизвестная ошибка при завершении процесса `{pid}`: {escape_markdown(str(e), version=2)}",
-            parse_mode="MarkdownV2",
+        logger.error(f"Ошибка при завершении процессов: {e}")
+        await query.edit_message_text(f"❌ Ошибка при завершении процессов: {e}")
+        return
+
+    lines = [
+        f"{'✅' if not result['survived'] and not result['denied'] else '⚠️'} "
+        f"Завершение процессов ({len(targets)}) за {result['elapsed']:.1f} с:",
+        f"Завершено: {result['terminated']}",
+        f"Принудительно: {result['killed']}",
+        f"Уже не было: {result['gone']}",
+        f"Нет доступа: {result['denied']}",
+    ]
+    if result["survived"]:
+        lines.append(
+            f"Не завершились: {result['survived']} — "
+            + ", ".join(result["survivors"][:PROCESS_MATCHES_SHOWN])
         )
+    await query.edit_message_text("\n".join(lines))
 
 
 @restricted
@@ -280,28 +509,37 @@ async def battery_status(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Информация о батарее доступна только на Windows через psutil.
     if platform.system() == "Windows":
         try:
-            battery = psutil.sensors_battery()
+            battery, _ = await run_blocking(battery_monitor.read, None, True)
             if battery:
+                estimate = battery_monitor.estimate()
                 status_text = (
                     f"🔋 *Состояние батареи:*\n" f"Заряд: `{battery.percent:.1f}%`\n"
                 )
 
                 if battery.power_plugged:
-                    status_text += "Статус: Заряжается ⚡"
+                    status_text += "Статус: Заряжается ⚡\n"
                 elif battery.secsleft == psutil.POWER_TIME_UNLIMITED:
-                    status_text += "Статус: Полностью заряжен ✅"
-                elif battery.secsleft == psutil.POWER_TIME_UNKNOWN:
-                    status_text += (
-                        "Статус: Отключен от сети, оставшееся время неизвестно ⏳"
-                    )
+                    status_text += "Статус: Полностью заряжен ✅\n"
                 else:
-                    # Форматируем оставшееся время работы батареи.
-                    minutes, seconds = divmod(int(battery.secsleft), 60)
-                    hours, minutes = divmod(minutes, 60)
-                    time_left_str = (
-                        f"{hours}ч {minutes}м" if hours > 0 else f"{minutes}м"
+                    status_text += "Статус: Разряжается 📉\n"
+
+                if estimate and estimate["rate_per_hour"] is not None:
+                    rate = f"{estimate['rate_per_hour']:+.1f}% в час"
+                    status_text += f"Скорость: `{escape_markdown(rate, version=2)}`\n"
+                if estimate and estimate["seconds_to_target"] is not None:
+                    left = format_duration(estimate["seconds_to_target"])
+                    status_text += (
+                        f"До {estimate['target']:g}%: примерно "
+                        f"`{escape_markdown(left, version=2)}` \\(по истории заряда\\)"
                     )
-                    status_text += f"Статус: Разряжается, осталось примерно `{escape_markdown(time_left_str, version=2)}` 📉"
+                elif not battery.power_plugged and battery.secsleft not in (
+                    psutil.POWER_TIME_UNLIMITED,
+                    psutil.POWER_TIME_UNKNOWN,
+                ):
+                    left = format_duration(battery.secsleft)
+                    status_text += f"Осталось примерно `{escape_markdown(left, version=2)}` \\(оценка системы\\)"
+                elif estimate is None or estimate["rate_per_hour"] is None:
+                    status_text += "Оценка времени появится после нескольких замеров ⏳"
             else:
                 status_text = "❌ Информация о батарее недоступна \\(возможно, это ПК без батареи или нет поддержки\\)\\."
         except Exception as e:
@@ -318,99 +556,50 @@ async def battery_status(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
 
 
-async def check_battery_level(context: ContextTypes.DEFAULT_TYPE) -> None:
+@restricted
+async def alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Периодическая проверка уровня заряда батареи.
-    Отправляет уведомления при низком заряде, полном заряде или недоступности.
-    Флаги уведомлений теперь хранятся в context.bot_data.
+    Оповещения о CPU, RAM, диске и температуре: /alerts [on|off].
+    Без аргументов показывает правила и их состояние.
     """
-    chat_id = context.job.data["chat_id"]
-
-    if "battery_low_notified" not in context.bot_data:
-        context.bot_data["battery_low_notified"] = False
-    if "battery_full_notified" not in context.bot_data:
-        context.bot_data["battery_full_notified"] = False
-    if "battery_unavailable_notified" not in context.bot_data:
-        context.bot_data["battery_unavailable_notified"] = False
-    if "battery_check_error_notified" not in context.bot_data:
-        context.bot_data["battery_check_error_notified"] = False
-
-    try:
-        if not BATTERY_AVAILABLE:
-            if not context.bot_data["battery_unavailable_notified"]:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text="❌ Автоматический мониторинг батареи: модуль `psutil` не установлен.",
-                )
-                context.bot_data["battery_unavailable_notified"] = True
-                save_bot_state(context.bot_data)
-            return
-
-        battery = psutil.sensors_battery()
-
-        if battery is None:
-            if not context.bot_data["battery_unavailable_notified"]:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text="ℹ️ Автоматический мониторинг батареи: Информация о батарее недоступна. (Настольный ПК?)",
-                )
-                context.bot_data["battery_unavailable_notified"] = True
-                context.bot_data["battery_check_error_notified"] = False
-                save_bot_state(context.bot_data)
-            return
-
-        context.bot_data["battery_unavailable_notified"] = False
-        context.bot_data["battery_check_error_notified"] = False
-
-        if (
-            battery.percent < 20
-            and not battery.power_plugged
-            and not context.bot_data["battery_low_notified"]
-        ):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"⚠️ \\*Внимание\\!\\* Низкий заряд батареи: `{battery.percent:.1f}%`\\. Подключите зарядное устройство\\.",
-                parse_mode="MarkdownV2",
-            )
-            context.bot_data["battery_low_notified"] = True
-            context.bot_data["battery_full_notified"] = False
-            save_bot_state(context.bot_data)
-            logger.info(
-                f"Отправлено уведомление о низком заряде батареи: {battery.percent}%"
-            )
-        elif battery.percent >= 25 and context.bot_data["battery_low_notified"]:
-            context.bot_data["battery_low_notified"] = False
-            save_bot_state(context.bot_data)
-
-        if (
-            battery.percent > 95
-            and battery.power_plugged
-            and not context.bot_data["battery_full_notified"]
-        ):
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"✅ Батарея заряжена до `{battery.percent:.1f}%`\\. Можно отключить зарядное устройство\\.",
-                parse_mode="MarkdownV2",
-            )
-            context.bot_data["battery_full_notified"] = True
-            context.bot_data["battery_low_notified"] = False
-            save_bot_state(context.bot_data)
-            logger.info(
-                f"Отправлено уведомление о полном заряде батареи: {battery.percent}%"
-            )
-        elif battery.percent < 90 and context.bot_data["battery_full_notified"]:
-            context.bot_data["battery_full_notified"] = False
-            save_bot_state(context.bot_data)
-
-    except Exception as e:
-        logger.error(f"Ошибка в автоматической проверке батареи: {e}")
-        if not context.bot_data["battery_check_error_notified"]:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=f"❌ Ошибка при автоматической проверке батареи: {e}",
+    args = [arg.lower() for arg in context.args or []]
+    if args and args[0] in ("on", "off"):
+        context.bot_data["alerts_enabled"] = args[0] == "on"
+        context.bot_data["alert_chat_id"] = update.effective_chat.id
+        alert_engine.reset("system")
+        context.bot_data["alert_states"] = alert_engine.dump_states()
+        mark_state_dirty()
+
+    groups = enabled_groups(context.bot_data)
+    lines = [
+        "🔔 Оповещения о системе: "
+        + ("*включены*" if "system" in groups else "*выключены*")
+        + "\n",
+        "🔋 Оповещения о батарее: "
+        + ("*включены*" if "battery" in groups else "*выключены*")
+        + "\n\n",
+        "```\n",
+    ]
+    for item in alert_engine.summary(groups):
+        rule = item["rule"]
+        sign = ">" if rule["above"] else "<"
+        if not item["available"]:
+            status = "недоступно"
+        elif item["active"]:
+            status = "сработало"
+        else:
+            status = "ок" if item["enabled"] else "выкл"
+        lines.append(
+            escape_markdown(
+                f"{rule['name']:<20} {rule['metric']} {sign} {rule['threshold']:g} "
+                f"(сброс {rule['clear']:g}, {rule['sustain']:g} с) — {status}\n",
+                version=2,
+                entity_type="pre",
             )
-            context.bot_data["battery_check_error_notified"] = True
-            save_bot_state(context.bot_data)
-        context.bot_data["battery_low_notified"] = False
-        context.bot_data["battery_full_notified"] = False
-        context.bot_data["battery_unavailable_notified"] = False
+        )
+    lines.append("```\n")
+    lines.append(
+        "Включить: `/alerts on`, выключить: `/alerts off`, "
+        "батарея: `/toggle_battery_monitoring`"
+    )
+    await update.message.reply_text("".join(lines), parse_mode="MarkdownV2")
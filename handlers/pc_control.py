@@ -4,13 +4,38 @@ import platform
 import ctypes
 import asyncio
 import re
+import time
 from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.decorators import restricted
+from utils.executor import run_blocking
+from utils.state_manager import delete_job, save_job
 
 logger = logging.getLogger(__name__)
 
+# Имя задачи таймера выключения в JobQueue и в базе состояния.
+SHUTDOWN_TIMER_JOB = "shutdown_timer"
+
+
+async def remember_shutdown_timer(user_id: int, seconds: float, job_data: dict) -> None:
+    """Сохраняет таймер выключения в базе, чтобы он пережил перезапуск бота."""
+    await run_blocking(
+        save_job,
+        SHUTDOWN_TIMER_JOB,
+        SHUTDOWN_TIMER_JOB,
+        "once",
+        chat_id=job_data["chat_id"],
+        user_id=user_id,
+        run_at=time.time() + seconds,
+        data=job_data,
+    )
+
+
+async def forget_shutdown_timer() -> None:
+    """Удаляет сохранённый таймер выключения из базы."""
+    await run_blocking(delete_job, SHUTDOWN_TIMER_JOB)
+
 
 @restricted
 async def shutdown_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -28,9 +53,9 @@ async def shutdown_now(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             logger.error("Нет объекта сообщения для отправки ответа.")
 
         if platform.system() == "Windows":
-            subprocess.run(["shutdown", "/s", "/t", "0"])
+            await run_blocking(subprocess.run, ["shutdown", "/s", "/t", "0"])
         else:
-            subprocess.run(["shutdown", "-h", "now"])
+            await run_blocking(subprocess.run, ["shutdown", "-h", "now"])
     except Exception as e:
         error_msg = f"❌ Ошибка: {e}"
         if message_to_edit:
@@ -55,9 +80,9 @@ async def reboot(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             logger.error("Нет объекта сообщения для отправки ответа.")
 
         if platform.system() == "Windows":
-            subprocess.run(["shutdown", "/r", "/t", "0"])
+            await run_blocking(subprocess.run, ["shutdown", "/r", "/t", "0"])
         else:
-            subprocess.run(["reboot"])
+            await run_blocking(subprocess.run, ["reboot"])
     except Exception as e:
         error_msg = f"❌ Ошибка: {e}"
         if message_to_edit:
@@ -84,12 +109,18 @@ async def lock_pc(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             logger.error("Нет объекта сообщения для отправки ответа.")
 
         if platform.system() == "Windows":
-            subprocess.run(["rundll32.exe", "user32.dll,LockWorkStation"])
+            await run_blocking(
+                subprocess.run, ["rundll32.exe", "user32.dll,LockWorkStation"]
+            )
         elif platform.system() == "Linux":
             try:
-                subprocess.run(["loginctl", "lock-session"], check=True)
+                await run_blocking(
+                    subprocess.run, ["loginctl", "lock-session"], check=True
+                )
             except subprocess.CalledProcessError:
-                subprocess.run(["gnome-screensaver-command", "-l"], check=True)
+                await run_blocking(
+                    subprocess.run, ["gnome-screensaver-command", "-l"], check=True
+                )
         else:
             error_msg = "❌ Блокировка не поддерживается на этой системе"
             if message_to_edit:
@@ -167,8 +198,13 @@ async def shutdown_timer(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         }
 
         context.user_data["shutdown_timer"] = context.job_queue.run_once(
-            shutdown_pc, seconds, name="shutdown_timer", data=job_data
+            shutdown_pc,
+            seconds,
+            name=SHUTDOWN_TIMER_JOB,
+            user_id=update.effective_user.id,
+            data=job_data,
         )
+        await remember_shutdown_timer(update.effective_user.id, seconds, job_data)
 
         shutdown_time_str = (datetime.now() + timedelta(seconds=seconds)).strftime(
             "%H:%M:%S"
@@ -202,6 +238,7 @@ async def cancel_shutdown(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         try:
             context.user_data["shutdown_timer"].remove()
             del context.user_data["shutdown_timer"]
+            await forget_shutdown_timer()
 
             if platform.system() == "Windows":
                 try:
@@ -236,6 +273,7 @@ async def shutdown_pc(context: ContextTypes.DEFAULT_TYPE):
     message_id = context.job.data.get("message_id")
 
     try:
+        await forget_shutdown_timer()
         if chat_id:
             if message_id:
                 try:
@@ -259,9 +297,9 @@ async def shutdown_pc(context: ContextTypes.DEFAULT_TYPE):
             logger.error("Нет chat_id для отправки ответа в shutdown_pc.")
 
         if platform.system() == "Windows":
-            subprocess.run(["shutdown", "/s", "/t", "0"])
+            await run_blocking(subprocess.run, ["shutdown", "/s", "/t", "0"])
         else:
-            subprocess.run(["shutdown", "-h", "now"])
+            await run_blocking(subprocess.run, ["shutdown", "-h", "now"])
     except Exception as e:
         error_msg = f"❌ Ошибка при выключении: {e}"
         if chat_id:
@@ -365,4 +403,3 @@ async def flip_screen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             f"❌ Не удалось перевернуть экран: {e}\n"
             "Попробуйте вручную через настройки дисплея или Ctrl+Alt+стрелки"
         )
-
@@ -1,61 +1,604 @@
+import asyncio
 import logging
 import os
+import tempfile
+import time
 from datetime import datetime
-from telegram import Update
+from telegram import InputMediaPhoto, Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 from utils.decorators import restricted
+from utils.executor import run_blocking, run_cpu_bound
+from utils.message_editor import ThrottledMessageEditor
+from utils.screen_capture import (
+    CAPTURE_AVAILABLE,
+    IMAGE_FORMATS,
+    capture_and_encode,
+    capture_if_changed,
+    capture_video_frame,
+)
+from utils.time_parsing import format_duration, parse_duration
+from utils.video_writer import MJPEGAviWriter
 
-# Проверка доступности модулей для скриншотов
-try:
-    import pyautogui
-    from PIL import Image
+logger = logging.getLogger(__name__)
 
-    SCREENSHOT_AVAILABLE = True
-except ImportError:
-    SCREENSHOT_AVAILABLE = False
-    logging.warning(
-        "Функция скриншотов недоступна - отсутствуют зависимости (pyautogui, Pillow)"
+if not CAPTURE_AVAILABLE:
+    logger.warning(
+        "Функция скриншотов недоступна - отсутствуют зависимости (Pillow и mss или pyautogui)"
     )
 
-logger = logging.getLogger(__name__)
+# Параметры скриншота по умолчанию: сжатый JPEG с ограничением длинной стороны.
+SCREENSHOT_FORMAT = "jpeg"
+SCREENSHOT_QUALITY = 80
+SCREENSHOT_MAX_EDGE = 1920
+SCREENSHOT_USAGE = (
+    "Использование: /screenshot [jpeg|webp|png|original] [q=1-100] [max=пиксели] "
+    "[monitor=N|region=x,y,ширина,высота|window]\n"
+    "original — исходный PNG без сжатия, отправляется документом.\n"
+    "monitor, region и window снимают только выбранную часть экрана."
+)
+
+# Наблюдение за экраном: кадр отправляется, только если заметно изменилась
+# доля ячеек отпечатка не меньше WATCH_MIN_CHANGE, и заменяет предыдущий.
+WATCH_DEFAULT_INTERVAL = 30
+WATCH_MIN_INTERVAL = 5
+WATCH_MAX_DURATION = 6 * 3600
+WATCH_MIN_CHANGE = 0.002
+WATCH_MAX_ERRORS = 3
+WATCH_USAGE = (
+    "Использование: /watch_screen [интервал] [jpeg|png] [q=1-100] [max=пиксели] "
+    "[monitor=N|region=x,y,ширина,высота|window]\n"
+    "Например: /watch_screen 30s или /watch_screen 1m q=60\n"
+    "Остановка: /watch_screen stop"
+)
+
+# Запись экрана и таймлапс: кадры JPEG сразу дописываются в AVI (Motion JPEG)
+# во временном файле, поэтому память не растёт с длиной записи.
+RECORD_DEFAULT_DURATION = 30
+RECORD_MAX_DURATION = 300
+RECORD_DEFAULT_FPS = 2
+RECORD_MAX_FPS = 5
+TIMELAPSE_DEFAULT_DURATION = 3600
+TIMELAPSE_MAX_DURATION = 24 * 3600
+TIMELAPSE_DEFAULT_INTERVAL = 30
+TIMELAPSE_MIN_INTERVAL = 2
+TIMELAPSE_PLAYBACK_FPS = 10
+RECORDING_QUALITY = 70
+RECORDING_MAX_EDGE = 1280
+# Лимит Telegram на отправку файла ботом — 50 МБ, оставляем запас.
+RECORDING_MAX_BYTES = 45 * 1024 * 1024
+# Время на выгрузку файла записи: 45 МБ по медленному каналу идут минутами.
+RECORDING_UPLOAD_TIMEOUT = 600
+RECORDING_KEY = "screen_recording"
+RECORD_USAGE = (
+    "Использование: /record [длительность] [fps=1-5] [q=1-100] [max=пиксели] "
+    "[monitor=N|region=x,y,ширина,высота|window]\n"
+    "Например: /record 30s fps=3\n"
+    "Остановка с отправкой записанного: /record stop"
+)
+TIMELAPSE_USAGE = (
+    "Использование: /timelapse [длительность] every [интервал] [q=1-100] [max=пиксели] "
+    "[monitor=N|region=x,y,ширина,высота|window]\n"
+    "Например: /timelapse 2h every 30s\n"
+    "Остановка с отправкой записанного: /timelapse stop"
+)
+
+
+def _parse_int(arg: str, value: str) -> int:
+    if not value.isdigit():
+        raise ValueError(f"Ожидалось целое число: {arg}")
+    return int(value)
+
+
+def parse_screenshot_args(
+    args: list[str],
+    quality: int = SCREENSHOT_QUALITY,
+    max_edge: int | None = SCREENSHOT_MAX_EDGE,
+) -> dict:
+    """Разбирает параметры /screenshot. Бросает ValueError при ошибке."""
+    options = {
+        "fmt": SCREENSHOT_FORMAT,
+        "quality": quality,
+        "max_edge": max_edge,
+        "as_document": False,
+        "target": None,
+    }
+    for arg in args:
+        arg = arg.lower()
+        key, _, value = arg.partition("=")
+        if arg == "original":
+            options.update(fmt="png", max_edge=None, as_document=True)
+        elif arg in IMAGE_FORMATS:
+            options["fmt"] = arg
+        elif arg == "window":
+            options["target"] = {"window": True}
+        elif key == "q" and value:
+            quality = _parse_int(arg, value)
+            if not 1 <= quality <= 100:
+                raise ValueError("Качество должно быть от 1 до 100.")
+            options["quality"] = quality
+        elif key == "max" and value:
+            max_edge = _parse_int(arg, value)
+            if max_edge < 16:
+                raise ValueError("Слишком маленький размер изображения.")
+            options["max_edge"] = max_edge
+        elif key in ("monitor", "m") and value:
+            monitor = _parse_int(arg, value)
+            if monitor < 1:
+                raise ValueError("Мониторы нумеруются с 1.")
+            options["target"] = {"monitor": monitor}
+        elif key == "region" and value:
+            parts = value.split(",")
+            if len(parts) != 4:
+                raise ValueError("Область задаётся как region=x,y,ширина,высота.")
+            try:
+                left, top, width, height = (int(part) for part in parts)
+            except ValueError:
+                raise ValueError(f"Ожидались целые числа: {arg}") from None
+            if width <= 0 or height <= 0:
+                raise ValueError("Ширина и высота области должны быть положительными.")
+            options["target"] = {"region": (left, top, width, height)}
+        else:
+            raise ValueError(f"Неизвестный параметр: {arg}")
+    # Telegram показывает как фото только JPEG/PNG; WebP уходит документом.
+    if options["fmt"] == "webp":
+        options["as_document"] = True
+    return options
 
 
 @restricted
 async def screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Скриншот экрана с сохранением во временную папку"""
-    if not SCREENSHOT_AVAILABLE:
+    """Скриншот экрана: захват и сжатие в памяти, без временных файлов."""
+    if not CAPTURE_AVAILABLE:
         await update.message.reply_text(
             "❌ Функция скриншотов недоступна. Установите:\n"
-            "`pip install pyautogui pillow`",
+            "`pip install pillow mss` (или pyautogui вместо mss)",
             parse_mode="Markdown",
         )
         return
 
-    screenshot_path = None
+    try:
+        options = parse_screenshot_args(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{SCREENSHOT_USAGE}")
+        return
+
     try:
         await update.message.reply_text("📸 Делаю скриншот...")
 
-        temp_dir = os.path.join(
-            os.environ.get("TEMP", os.path.expanduser("~")), "pc_bot_screenshots"
+        result = await run_cpu_bound(
+            capture_and_encode,
+            options["fmt"],
+            options["quality"],
+            options["max_edge"],
+            options["target"],
         )
-        os.makedirs(temp_dir, exist_ok=True)
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        screenshot_path = os.path.join(temp_dir, f"screen_{timestamp}.png")
+        extension = IMAGE_FORMATS[options["fmt"]][1]
+        filename = f"screen_{timestamp}.{extension}"
 
-        pyautogui.screenshot(screenshot_path)
+        upload_started = time.perf_counter()
+        if options["as_document"]:
+            await update.message.reply_document(
+                document=result["data"], filename=filename, caption="🖥 Текущий экран"
+            )
+        else:
+            await update.message.reply_photo(
+                photo=result["data"], filename=filename, caption="🖥 Текущий экран"
+            )
+        upload_time = time.perf_counter() - upload_started
 
-        with open(screenshot_path, "rb") as photo:
-            await update.message.reply_photo(photo=photo, caption="🖥 Текущий экран")
+        width, height = result["size"]
+        logger.info(
+            f"Скриншот {width}x{height} {options['fmt']}: {len(result['data']) / 1024:.0f} КБ, "
+            f"захват {result['capture_time']:.2f} с, кодирование {result['encode_time']:.2f} с, "
+            f"отправка {upload_time:.2f} с"
+        )
 
     except Exception as e:
         await update.message.reply_text(f"❌ Ошибка при создании скриншота: {str(e)}")
-    finally:
-        if screenshot_path and os.path.exists(screenshot_path):
-            try:
-                os.remove(screenshot_path)
-                logger.info(f"Временный файл скриншота удален: {screenshot_path}")
-            except Exception as e:
-                logger.error(
-                    f"Не удалось удалить временный файл скриншота {screenshot_path}: {e}"
+
+
+def _watch_job_name(chat_id: int) -> str:
+    return f"watch_screen_{chat_id}"
+
+
+def _stop_watch_jobs(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> bool:
+    jobs = context.job_queue.get_jobs_by_name(_watch_job_name(chat_id))
+    for job in jobs:
+        job.schedule_removal()
+    return bool(jobs)
+
+
+def _watch_caption(data: dict) -> str:
+    return (
+        f"👁 Наблюдение за экраном (каждые {format_duration(data['interval'])})\n"
+        f"Обновлено: {datetime.now().strftime('%H:%M:%S')}, "
+        f"изменилось {data['difference']:.1%} кадра\n"
+        f"Кадров отправлено: {data['sent']}, пропущено без изменений: {data['skipped']}"
+    )
+
+
+@restricted
+async def watch_screen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Периодически снимает экран и обновляет одно сообщение с кадром,
+    только когда изображение заметно изменилось.
+    """
+    chat_id = update.effective_chat.id
+    args = list(context.args or [])
+
+    if args and args[0].lower() in ("stop", "off", "стоп"):
+        if _stop_watch_jobs(context, chat_id):
+            await update.message.reply_text("⏹ Наблюдение за экраном остановлено.")
+        else:
+            await update.message.reply_text("ℹ️ Наблюдение за экраном не запущено.")
+        return
+
+    if not CAPTURE_AVAILABLE:
+        await update.message.reply_text(
+            "❌ Функция скриншотов недоступна. Установите:\n"
+            "`pip install pillow mss` (или pyautogui вместо mss)",
+            parse_mode="Markdown",
+        )
+        return
+
+    try:
+        interval = WATCH_DEFAULT_INTERVAL
+        if args and args[0][0].isdigit():
+            interval = parse_duration(args.pop(0))
+        if interval < WATCH_MIN_INTERVAL:
+            raise ValueError(
+                f"Интервал должен быть не меньше {WATCH_MIN_INTERVAL} секунд."
+            )
+        options = parse_screenshot_args(args)
+        if options["as_document"]:
+            raise ValueError("В режиме наблюдения поддерживаются только jpeg и png.")
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{WATCH_USAGE}")
+        return
+
+    _stop_watch_jobs(context, chat_id)
+    context.job_queue.run_repeating(
+        watch_screen_tick,
+        interval=interval,
+        first=0,
+        name=_watch_job_name(chat_id),
+        chat_id=chat_id,
+        data={
+            "interval": interval,
+            "options": options,
+            "started": time.time(),
+            "message_id": None,
+            "fingerprint": None,
+            "difference": 0.0,
+            "sent": 0,
+            "skipped": 0,
+            "errors": 0,
+        },
+    )
+    await update.message.reply_text(
+        f"👁 Наблюдение за экраном запущено: проверка каждые {format_duration(interval)}, "
+        f"автоостановка через {format_duration(WATCH_MAX_DURATION)}.\n"
+        "Остановить: /watch_screen stop"
+    )
+
+
+async def _publish_watch_frame(
+    context: ContextTypes.DEFAULT_TYPE, chat_id: int, data: dict, frame: bytes
+) -> None:
+    """Заменяет кадр в сообщении наблюдения; если сообщения нет, отправляет новое."""
+    caption = _watch_caption(data)
+    if data["message_id"] is not None:
+        try:
+            await context.bot.edit_message_media(
+                chat_id=chat_id,
+                message_id=data["message_id"],
+                media=InputMediaPhoto(media=frame, caption=caption),
+            )
+            return
+        except BadRequest as e:
+            if "message is not modified" in str(e).lower():
+                return
+            logger.warning(
+                f"Не удалось обновить кадр наблюдения: {e}. Отправляю новое сообщение."
+            )
+
+    message = await context.bot.send_photo(
+        chat_id=chat_id, photo=frame, caption=caption
+    )
+    data["message_id"] = message.message_id
+
+
+async def watch_screen_tick(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: снимает экран и публикует кадр, если он изменился."""
+    job = context.job
+    data = job.data
+    chat_id = job.chat_id
+
+    if time.time() - data["started"] > WATCH_MAX_DURATION:
+        job.schedule_removal()
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"⏹ Наблюдение за экраном остановлено: прошло "
+            f"{format_duration(WATCH_MAX_DURATION)}.",
+        )
+        return
+
+    options = data["options"]
+    try:
+        result = await run_cpu_bound(
+            capture_if_changed,
+            data["fingerprint"],
+            WATCH_MIN_CHANGE,
+            options["fmt"],
+            options["quality"],
+            options["max_edge"],
+            options["target"],
+        )
+        if not result["changed"]:
+            data["skipped"] += 1
+            return
+
+        data["difference"] = result["difference"]
+        data["sent"] += 1
+        try:
+            await _publish_watch_frame(context, chat_id, data, result["data"])
+        except Exception:
+            data["sent"] -= 1
+            raise
+        # Отпечаток обновляется только после успешной отправки, чтобы
+        # изменения сравнивались с последним кадром, который видел пользователь.
+        data["fingerprint"] = result["fingerprint"]
+        data["errors"] = 0
+        logger.info(
+            f"Наблюдение за экраном: изменилось {result['difference']:.1%}, "
+            f"кадр {len(result['data']) / 1024:.0f} КБ, "
+            f"подготовка {result['elapsed']:.2f} с"
+        )
+    except Exception as e:
+        data["errors"] += 1
+        logger.error(f"Ошибка наблюдения за экраном: {e}")
+        if data["errors"] >= WATCH_MAX_ERRORS:
+            job.schedule_removal()
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=f"❌ Наблюдение за экраном остановлено из-за ошибок: {e}",
+            )
+
+
+def _parse_recording_options(args: list[str]) -> dict:
+    options = parse_screenshot_args(
+        args, quality=RECORDING_QUALITY, max_edge=RECORDING_MAX_EDGE
+    )
+    if options["fmt"] != "jpeg" or options["as_document"]:
+        raise ValueError("Запись всегда идёт в Motion JPEG, формат выбрать нельзя.")
+    return options
+
+
+async def _stop_recording(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    recording = context.chat_data.get(RECORDING_KEY)
+    if recording is None:
+        await update.message.reply_text("ℹ️ Запись экрана не идёт.")
+        return
+    recording["stop"].set()
+    await update.message.reply_text(
+        "⏹ Останавливаю запись, отправлю то, что успел снять..."
+    )
+
+
+async def _start_recording(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    title: str,
+    duration: float,
+    interval: float,
+    fps: float | None,
+    options: dict,
+) -> None:
+    if not CAPTURE_AVAILABLE:
+        await update.message.reply_text(
+            "❌ Функция скриншотов недоступна. Установите:\n"
+            "`pip install pillow mss` (или pyautogui вместо mss)",
+            parse_mode="Markdown",
+        )
+        return
+    if RECORDING_KEY in context.chat_data:
+        await update.message.reply_text(
+            "⚠️ Запись экрана уже идёт. Остановите её: /record stop"
+        )
+        return
+
+    recording = {"stop": asyncio.Event()}
+    context.chat_data[RECORDING_KEY] = recording
+    status = await update.message.reply_text(f"{title}: подготовка...")
+    # Запись идёт отдельной задачей, обработчик сразу освобождается.
+    recording["task"] = context.application.create_task(
+        _record_screen(
+            context, status, recording, title, duration, interval, fps, options
+        ),
+        update=update,
+    )
+
+
+@restricted
+async def record_screen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Короткая запись экрана: /record 30s [fps=2]."""
+    args = list(context.args or [])
+    if args and args[0].lower() in ("stop", "off", "стоп"):
+        await _stop_recording(update, context)
+        return
+
+    try:
+        duration = RECORD_DEFAULT_DURATION
+        if args and args[0][0].isdigit():
+            duration = parse_duration(args.pop(0))
+        if duration > RECORD_MAX_DURATION:
+            raise ValueError(
+                f"Максимальная длительность записи — {format_duration(RECORD_MAX_DURATION)}."
+            )
+        fps = RECORD_DEFAULT_FPS
+        for arg in list(args):
+            key, _, value = arg.lower().partition("=")
+            if key == "fps" and value:
+                fps = _parse_int(arg, value)
+                args.remove(arg)
+        if not 1 <= fps <= RECORD_MAX_FPS:
+            raise ValueError(f"fps должен быть от 1 до {RECORD_MAX_FPS}.")
+        options = _parse_recording_options(args)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{RECORD_USAGE}")
+        return
+
+    await _start_recording(
+        update, context, "🎬 Запись экрана", duration, 1 / fps, None, options
+    )
+
+
+@restricted
+async def timelapse(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Таймлапс: /timelapse 2h every 30s — кадр раз в интервал, воспроизведение ускорено."""
+    args = list(context.args or [])
+    if args and args[0].lower() in ("stop", "off", "стоп"):
+        await _stop_recording(update, context)
+        return
+
+    try:
+        duration = TIMELAPSE_DEFAULT_DURATION
+        interval = TIMELAPSE_DEFAULT_INTERVAL
+        if args and args[0][0].isdigit():
+            duration = parse_duration(args.pop(0))
+        if args and args[0].lower() in ("every", "каждые"):
+            args.pop(0)
+            if not args:
+                raise ValueError("Не указан интервал после every.")
+            interval = parse_duration(args.pop(0))
+        if duration > TIMELAPSE_MAX_DURATION:
+            raise ValueError(
+                f"Максимальная длительность таймлапса — {format_duration(TIMELAPSE_MAX_DURATION)}."
+            )
+        if interval < TIMELAPSE_MIN_INTERVAL:
+            raise ValueError(
+                f"Интервал должен быть не меньше {TIMELAPSE_MIN_INTERVAL} секунд."
+            )
+        if interval > duration:
+            raise ValueError("Интервал больше длительности таймлапса.")
+        options = _parse_recording_options(args)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{TIMELAPSE_USAGE}")
+        return
+
+    await _start_recording(
+        update,
+        context,
+        "🎞 Таймлапс",
+        duration,
+        interval,
+        TIMELAPSE_PLAYBACK_FPS,
+        options,
+    )
+
+
+async def _record_screen(
+    context: ContextTypes.DEFAULT_TYPE,
+    status,
+    recording: dict,
+    title: str,
+    duration: float,
+    interval: float,
+    fps: float | None,
+    options: dict,
+) -> None:
+    """
+    Снимает кадры по расписанию и сразу дописывает их в AVI-файл.
+    По окончании, остановке или достижении лимита размера отправляет файл.
+    fps — частота воспроизведения (таймлапс); None — запись в реальном времени:
+    в заголовок пишется фактическая частота захвата, чтобы на медленной машине
+    видео не проигрывалось быстрее, чем было на экране.
+    """
+    realtime = fps is None
+    if realtime:
+        fps = 1 / interval
+    editor = ThrottledMessageEditor(status)
+    fd, path = tempfile.mkstemp(prefix="screen_record_", suffix=".avi")
+    os.close(fd)
+    writer = None
+    reason = "запись завершена"
+    started = time.monotonic()
+    frames_planned = int(duration / interval)
+
+    try:
+        for frame_number in range(frames_planned):
+            # Расписание от момента старта: медленный захват не накапливает сдвиг.
+            delay = started + frame_number * interval - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(recording["stop"].wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            if recording["stop"].is_set():
+                reason = "остановлено по команде"
+                break
+            if time.monotonic() - started >= duration:
+                break
+
+            frame = await run_cpu_bound(
+                capture_video_frame,
+                options["quality"],
+                options["max_edge"],
+                options["target"],
+                writer.frame_size if writer else None,
+            )
+            if writer is None:
+                writer = await run_blocking(MJPEGAviWriter, path, *frame["size"], fps)
+            if writer.size + len(frame["data"]) > RECORDING_MAX_BYTES:
+                reason = (
+                    f"достигнут лимит размера {RECORDING_MAX_BYTES // (1024 * 1024)} МБ"
                 )
+                break
+            await run_blocking(writer.add_frame, frame["data"])
+            await editor.update(
+                f"{title}: кадр {writer.frame_count} из {frames_planned}, "
+                f"{writer.size / (1024 * 1024):.1f} МБ"
+            )
+
+        if writer is None or writer.frame_count == 0:
+            await editor.flush(f"{title}: не снято ни одного кадра.")
+            return
+
+        elapsed = time.monotonic() - started
+        if realtime and elapsed > 0:
+            writer.fps = min(fps, writer.frame_count / elapsed)
+        await run_blocking(writer.close)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        await editor.flush(f"{title}: {reason}, отправляю файл...")
+        filename = f"screen_record_{datetime.now().strftime('%Y%m%d_%H%M%S')}.avi"
+        with open(path, "rb") as video:
+            await context.bot.send_document(
+                chat_id=status.chat_id,
+                document=video,
+                filename=filename,
+                caption=(
+                    f"{title}: {writer.frame_count} кадров за {format_duration(elapsed)}, "
+                    f"{writer.width}x{writer.height}, {writer.fps:.1f} к/с, "
+                    f"{size_mb:.1f} МБ ({reason})"
+                ),
+                write_timeout=RECORDING_UPLOAD_TIMEOUT,
+            )
+        await editor.flush(f"{title}: готово, {reason}.")
+        logger.info(
+            f"Запись экрана отправлена: {writer.frame_count} кадров, {size_mb:.1f} МБ, "
+            f"{format_duration(elapsed)}"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка записи экрана: {e}")
+        await editor.flush(f"❌ {title}: ошибка записи: {e}")
+    finally:
+        context.chat_data.pop(RECORDING_KEY, None)
+        if writer is not None:
+            await run_blocking(writer.close)
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить временный файл записи {path}: {e}")
@@ -31,6 +31,7 @@ import handlers.pc_control as pc_control
 import handlers.monitoring as monitoring
 import handlers.screenshots as screenshots
 import handlers.cleanup as cleanup
+import handlers.disk_usage as disk_usage
 
 logger = logging.getLogger(__name__)
 
@@ -87,17 +88,38 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "\\- Статус: `/status` или кнопка 📊\n"
         "\\- Процессы: `/processes` или кнопка 📋\n"
         "\\- Время работы: `/uptime` или кнопка ⏱\n"
-        "\\- Проверить запуск: `/is_running` \\[имя\\_приложения\\]\n"
+        "\\- График: `/history` \\[cpu\\|ram\\|disk\\|swap\\|net\\|battery\\] \\[1h\\]\n"
+        "\\- Приложения: `/apps` \\[exe\\|tree\\] \\[cpu\\|ram\\|threads\\|handles\\|count\\]\n"
+        "\\- Проверить запуск: `/is_running` \\[имя\\_приложения\\] \\(режимы `\\-\\-exact`, `\\-\\-prefix`, `\\-\\-substring`, `\\-\\-regex`, `\\-\\-fuzzy`\\)\n"
+        "\\- Завершить: `/kill_process` \\[PID \\.\\.\\.\\|имя\\] \\(по имени — точно или по префиксу, другие режимы только флагом; `\\-\\-tree` — вместе с дочерними\\)\n"
         "\\- Батарея: `/battery` или кнопка 🔋\n"
-        "\\- Авто\\-мониторинг батареи: `/toggle_battery_monitoring`\n\n"
+        "\\- Авто\\-мониторинг батареи: `/toggle_battery_monitoring`\n"
+        "\\- Оповещения о CPU, RAM, диске и температуре: `/alerts` \\[on\\|off\\]\n\n"
         "🔐 *Безопасность:*\n"
         "\\- Блокировка: `/lock` или кнопка 🔒\n\n"
         "📷 *Скриншот:*\n"
-        "\\- `/screenshot` или кнопка 📷\n\n"
+        "\\- `/screenshot` или кнопка 📷 \\(JPEG, до 1920 px\\)\n"
+        "\\- Формат: `/screenshot` \\[jpeg\\|webp\\|png\\] \\[q\\=80\\] \\[max\\=1920\\]\n"
+        "\\- Без сжатия: `/screenshot original`\n"
+        "\\- Часть экрана: `/screenshot monitor\\=2`, `/screenshot region\\=0,0,800,600`, `/screenshot window`\n"
+        "\\- Наблюдение: `/watch_screen` \\[30s\\] \\- кадр обновляется только при изменениях\n"
+        "\\- Остановить наблюдение: `/watch_screen stop`\n"
+        "\\- Запись экрана: `/record` \\[30s\\] \\[fps\\=2\\]\n"
+        "\\- Таймлапс: `/timelapse` \\[2h\\] every \\[30s\\]\n"
+        "\\- Остановить запись и получить файл: `/record stop`\n\n"
         "🎮 *Игры:*\n"
         "\\- Запуск игр: кнопка 🎮\n\n"
         "🧹 *Очистка:*\n"
-        "\\- `/clear_temp` или кнопка 🧹\n\n"
+        "\\- `/clear_temp` или кнопка 🧹\n"
+        "\\- Оценить освобождаемое место: `/clear_temp \\-\\-dry\\-run`\n"
+        "\\- Фоновая автоочистка старых файлов: `/auto_cleanup` \\[on\\|off\\]\n"
+        "\\- Что занимает место: `/du` \\[путь\\] \\[\\-\\-rescan\\]\n"
+        "\\- Дубликаты файлов: `/find_duplicates` \\[путь\\] \\[min\\=1M\\]\n\n"
+        "🤖 *ИИ\\-помощник:*\n"
+        "\\- Вопрос: `/ask` \\[запрос\\]\n"
+        "\\- Без кэша: `/ask!` \\[запрос\\] или `/ask \\-\\-fresh` \\[запрос\\]\n"
+        "\\- Статистика кэша: `/ask_stats`\n"
+        "\\- Забыть диалог: `/forget`\n\n"
         "❌ *Отмена:*\n"
         "\\- `/cancel` \\- отмена запланированного выключения"
     )
@@ -234,7 +256,11 @@ async def inline_button_handler(
 
     data = query.data
 
-    if data.startswith("timer_"):
+    if data.startswith("du_"):
+        await disk_usage.handle_du_button(update, context, int(data[3:]))
+    elif data.startswith("dup_"):
+        await cleanup.handle_duplicates_button(update, context, data)
+    elif data.startswith("timer_"):
         minutes = int(query.data.split("_")[1])
         context.user_data["shutdown_minutes"] = minutes
         await query.edit_message_text(
@@ -278,7 +304,14 @@ async def inline_button_handler(
         }
 
         context.user_data["shutdown_timer"] = context.job_queue.run_once(
-            pc_control.shutdown_pc, seconds, name="shutdown_timer", data=job_data
+            pc_control.shutdown_pc,
+            seconds,
+            name=pc_control.SHUTDOWN_TIMER_JOB,
+            user_id=update.effective_user.id,
+            data=job_data,
+        )
+        await pc_control.remember_shutdown_timer(
+            update.effective_user.id, seconds, job_data
         )
 
         shutdown_time = (datetime.now() + timedelta(minutes=minutes)).strftime("%H:%M")
@@ -295,13 +328,12 @@ async def inline_button_handler(
         elif action == "lock":
             await pc_control.lock_pc(update, context)
         elif action == "kill":
-            pid = context.user_data.get("kill_pid")
-            if pid:
-                await monitoring.execute_kill_process(update, context, pid)
-                del context.user_data["kill_pid"]
+            targets = context.user_data.pop("kill_targets", None)
+            if targets:
+                await monitoring.execute_kill_process(update, context, targets)
             else:
                 await query.edit_message_text(
-                    "❌ Ошибка: PID для завершения не найден\\.",
+                    "❌ Ошибка: процессы для завершения не найдены\\.",
                     parse_mode="MarkdownV2",
                 )
         elif action == "clear_temp":
@@ -318,6 +350,7 @@ async def inline_button_handler(
                 else:
                     context.user_data["shutdown_timer"].schedule_removal()
                 del context.user_data["shutdown_timer"]
+                await pc_control.forget_shutdown_timer()
 
                 if platform.system() == "Windows":
                     try:
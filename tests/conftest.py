@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py создаётся пользователем при установке (см. README) и в репозиторий
+# не входит; для тестов хватает тестовых значений и временной папки состояния.
+try:
+    import config  # noqa: F401
+except ImportError:
+    config = types.ModuleType("config")
+    config.BOT_TOKEN = "123456:TEST"
+    config.ALLOWED_CHAT_ID = 1
+    config.DEEPSEEK_API_KEY = "test"
+    config.BOT_STATE_FILE = os.path.join(tempfile.mkdtemp(), "bot_state.json")
+    sys.modules["config"] = config
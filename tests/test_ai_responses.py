@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from openai import AsyncOpenAI
+
+from handlers import ai_responses
+from tools.fake_openai import FakeOpenAIServer
+from utils.ai_scheduler import ai_scheduler
+from utils.message_editor import ThrottledMessageEditor
+
+
+class FakeMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, parse_mode=None):
+        self.edits.append(text)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    def start(**kwargs):
+        server = FakeOpenAIServer(**kwargs).start()
+        monkeypatch.setattr(
+            ai_responses,
+            "deepseek_client",
+            AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0),
+        )
+        servers.append(server)
+        return server
+
+    servers = []
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _ask(text="Привет"):
+    message = FakeMessage()
+    editor = ThrottledMessageEditor(message)
+    messages = [{"role": "user", "content": text}]
+    answer = asyncio.run(ai_responses._stream_completion(messages, editor))
+    return answer, message
+
+
+def test_streamed_answer_is_assembled(fake_api):
+    server = fake_api(answer="Потоковый ответ из нескольких кусков.")
+
+    answer, message = _ask()
+
+    assert answer == "Потоковый ответ из нескольких кусков."
+    assert len(server.requests) == 1
+    assert server.requests[0]["stream"] is True
+    assert server.requests[0]["model"] == ai_responses.DEEPSEEK_MODEL
+    # Первый кусок сразу показывается в сообщении.
+    assert message.edits and answer.startswith(message.edits[0])
+
+
+def test_429_is_retried_after_retry_after(fake_api):
+    server = fake_api(answer="Ответ после повтора.", failures=[429], retry_after=0)
+    retries = ai_scheduler.stats["retries"]
+
+    answer, _ = _ask()
+
+    assert answer == "Ответ после повтора."
+    assert len(server.requests) == 2
+    assert ai_scheduler.stats["retries"] == retries + 1
@@ -0,0 +1,29 @@
+import random
+
+from utils.metrics_history import summarize
+
+
+def test_summarize_empty():
+    assert summarize([]) is None
+
+
+def test_p95_is_nearest_rank():
+    values = list(range(100))
+    random.Random(1).shuffle(values)
+
+    stats = summarize(values)
+
+    # ceil(0.95 * 100) = 95-й элемент по возрастанию, т. е. индекс 94.
+    assert stats["p95"] == 94
+    assert stats["min"] == 0
+    assert stats["max"] == 99
+    assert stats["avg"] == 49.5
+    assert stats["count"] == 100
+
+
+def test_p95_small_samples():
+    assert summarize([7])["p95"] == 7
+    # ceil(0.95 * 20) = 19 -> индекс 18.
+    assert summarize(list(range(20)))["p95"] == 18
+    # ceil(0.95 * 21) = 20 -> индекс 19.
+    assert summarize(list(range(21)))["p95"] == 19
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from telegram.ext import ExtBot
+
+from tools.fake_bot_api import FakeBotAPIServer
+from utils import outbound_limiter
+from utils.outbound_limiter import PRIORITY_CRITICAL, OutboundRateLimiter
+
+CHAT_ID = 42
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    # Те же корзины, но в десять раз быстрее, чтобы тесты шли доли секунды.
+    monkeypatch.setattr(outbound_limiter, "PRIVATE_CHAT_RATE", 10)
+    monkeypatch.setattr(outbound_limiter, "PRIVATE_CHAT_BURST", 2)
+
+
+def _run(server: FakeBotAPIServer, scenario):
+    limiter = OutboundRateLimiter()
+
+    async def main():
+        bot = ExtBot(
+            "123456:TEST", base_url=f"{server.base_url}/bot", rate_limiter=limiter
+        )
+        await bot.initialize()
+        try:
+            return await scenario(bot)
+        finally:
+            await bot.shutdown()
+
+    with server:
+        return asyncio.run(main()), limiter
+
+
+def test_burst_stays_under_chat_limit_and_alert_goes_first():
+    server = FakeBotAPIServer(chat_limit=4, window=0.1)
+
+    async def scenario(bot):
+        calls = [
+            bot.send_message(chat_id=CHAT_ID, text=f"Сообщение {i}") for i in range(8)
+        ]
+        calls.append(
+            bot.send_message(
+                chat_id=CHAT_ID,
+                text="Оповещение",
+                rate_limit_args={"priority": PRIORITY_CRITICAL},
+            )
+        )
+        await asyncio.gather(*calls)
+
+    _run(server, scenario)
+
+    texts = [data["text"] for data in server.delivered("sendMessage")]
+    assert server.flood_waits == 0
+    assert len(texts) == 9
+    assert texts.index("Оповещение") < 3
+
+
+def test_progress_edits_are_coalesced():
+    server = FakeBotAPIServer(chat_limit=4, window=0.1)
+
+    async def scenario(bot):
+        message = await bot.send_message(chat_id=CHAT_ID, text="0%")
+        await asyncio.gather(
+            *(
+                bot.edit_message_text(
+                    chat_id=CHAT_ID, message_id=message.message_id, text=f"{i}0%"
+                )
+                for i in range(1, 11)
+            )
+        )
+
+    _, limiter = _run(server, scenario)
+
+    edits = [data["text"] for data in server.delivered("editMessageText")]
+    assert edits[-1] == "100%"
+    assert len(edits) < 10
+    assert limiter.stats["coalesced"] == 10 - len(edits)
+
+
+def test_retry_after_pauses_and_resends():
+    server = FakeBotAPIServer(retry_after=1)
+    server.force_retry_after = 1
+
+    async def scenario(bot):
+        started = time.monotonic()
+        await bot.send_message(chat_id=CHAT_ID, text="После паузы")
+        return time.monotonic() - started
+
+    elapsed, limiter = _run(server, scenario)
+
+    assert server.flood_waits == 1
+    assert [data["text"] for data in server.delivered("sendMessage")] == ["После паузы"]
+    assert limiter.stats["retried"] == 1
+    assert elapsed >= 1
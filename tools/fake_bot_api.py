@@ -0,0 +1,278 @@
+"""
+Локальная имитация Bot API для проверки и замера очереди исходящих сообщений.
+
+Сервер отвечает на sendMessage, editMessageText и прочие методы как Telegram
+и сам следит за лимитом на чат: если в окне window секунд чат получил больше
+chat_limit запросов, отвечает 429 с retry_after, как настоящий API.
+
+Замер: python -m tools.fake_bot_api [сообщений] — одна и та же пачка
+(обычные сообщения, правки прогресса и оповещения в середине) отправляется
+без ограничителя и через OutboundRateLimiter; выводятся число 429, задержки
+по приоритетам и время доставки. Бот можно запустить против сервера:
+python -m tools.fake_bot_api --serve 8601 и TELEGRAM_BASE_URL=http://127.0.0.1:8601.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BENCH_MESSAGES = 20
+BENCH_EDITS = 15
+BENCH_ALERTS = 3
+BENCH_CHAT_ID = 42
+
+
+class FakeBotAPIServer:
+    """
+    HTTP-сервер Bot API в фоновом потоке. В calls копятся
+    (время, метод, параметры) всех принятых запросов, в flood_waits — число
+    ответов 429. force_retry_after — сколько следующих запросов принудительно
+    получат 429 независимо от лимита.
+    """
+
+    def __init__(
+        self,
+        chat_limit: int = 4,
+        window: float = 1.0,
+        retry_after: int = 1,
+        port: int = 0,
+    ):
+        self.chat_limit = chat_limit
+        self.window = window
+        self.retry_after = retry_after
+        self.force_retry_after = 0
+        self.calls = []
+        self.flood_waits = 0
+        self._recent = defaultdict(deque)
+        self._message_ids = iter(range(1, 10**9))
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBotAPIServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeBotAPIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def delivered(self, method: str | None = None) -> list[dict]:
+        """Параметры успешно обработанных запросов (по желанию — одного метода)."""
+        return [
+            data
+            for _, name, data, ok in self.calls
+            if ok and (method is None or name == method)
+        ]
+
+    def _limited(self, chat_id, now: float) -> bool:
+        if self.force_retry_after:
+            self.force_retry_after -= 1
+            return True
+        if chat_id is None:
+            return False
+        recent = self._recent[str(chat_id)]
+        while recent and now - recent[0] >= self.window:
+            recent.popleft()
+        if len(recent) >= self.chat_limit:
+            return True
+        recent.append(now)
+        return False
+
+    def _answer(self, method: str, data: dict) -> tuple[int, dict]:
+        now = time.monotonic()
+        with self._lock:
+            if method == "getMe":
+                self.calls.append((now, method, data, True))
+                return 200, {
+                    "ok": True,
+                    "result": {
+                        "id": 1,
+                        "is_bot": True,
+                        "first_name": "Fake",
+                        "username": "fake_bot",
+                    },
+                }
+            chat_id = data.get("chat_id")
+            if self._limited(chat_id, now):
+                self.flood_waits += 1
+                self.calls.append((now, method, data, False))
+                return 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after "
+                    f"{self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            self.calls.append((now, method, data, True))
+            if method in ("sendChatAction", "answerCallbackQuery", "deleteMessage"):
+                return 200, {"ok": True, "result": True}
+            message_id = data.get("message_id") or next(self._message_ids)
+            return 200, {
+                "ok": True,
+                "result": {
+                    "message_id": int(message_id),
+                    "date": int(time.time()),
+                    "chat": {"id": int(chat_id or 0), "type": "private"},
+                    "text": data.get("text", ""),
+                },
+            }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8", "replace")
+                if body.startswith("{"):
+                    data = json.loads(body)
+                else:
+                    data = {key: values[0] for key, values in parse_qs(body).items()}
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                status, payload = server._answer(method, data)
+                out = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            do_GET = do_POST
+
+        return Handler
+
+
+async def run_burst(
+    bot,
+    chat_id: int = BENCH_CHAT_ID,
+    messages: int = BENCH_MESSAGES,
+    edits: int = BENCH_EDITS,
+    alerts: int = BENCH_ALERTS,
+) -> dict:
+    """
+    Отправляет пачку как при очистке с прогрессом: обычные сообщения, правки
+    одного сообщения и оповещения с приоритетом CRITICAL в середине пачки.
+    Возвращает задержки доставки по видам и число ошибок.
+    """
+    from utils.outbound_limiter import PRIORITY_CRITICAL
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def timed(kind: str, call) -> None:
+        started = time.monotonic()
+        try:
+            await call
+        except Exception:
+            errors[kind] += 1
+            return
+        latencies[kind].append(time.monotonic() - started)
+
+    progress = await bot.send_message(chat_id=chat_id, text="Прогресс: 0%")
+    started = time.monotonic()
+    calls = [
+        timed("normal", bot.send_message(chat_id=chat_id, text=f"Сообщение {i}"))
+        for i in range(messages)
+    ]
+    calls += [
+        timed(
+            "progress",
+            bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=progress.message_id,
+                text=f"Прогресс: {100 * (i + 1) // edits}%",
+            ),
+        )
+        for i in range(edits)
+    ]
+    middle = len(calls) // 2
+    calls[middle:middle] = [
+        timed(
+            "critical",
+            bot.send_message(
+                chat_id=chat_id,
+                text=f"Оповещение {i}",
+                rate_limit_args={"priority": PRIORITY_CRITICAL},
+            ),
+        )
+        for i in range(alerts)
+    ]
+    await asyncio.gather(*calls)
+    return {
+        "latencies": dict(latencies),
+        "errors": dict(errors),
+        "elapsed": time.monotonic() - started,
+    }
+
+
+def _format_result(title: str, result: dict, server: FakeBotAPIServer) -> str:
+    lines = [f"{title}: {result['elapsed']:.1f} с, ответов 429: {server.flood_waits}"]
+    for kind in ("critical", "normal", "progress"):
+        values = sorted(result["latencies"].get(kind, []))
+        failed = result["errors"].get(kind, 0)
+        if values:
+            p50 = values[len(values) // 2]
+            lines.append(
+                f"  {kind:<9} доставлено {len(values):>3}, ошибок {failed:>3}, "
+                f"медиана {p50:.2f} с, максимум {values[-1]:.2f} с"
+            )
+        else:
+            lines.append(f"  {kind:<9} доставлено   0, ошибок {failed:>3}")
+    return "\n".join(lines)
+
+
+async def benchmark(messages: int = BENCH_MESSAGES) -> None:
+    from telegram.ext import ExtBot
+    from utils.outbound_limiter import OutboundRateLimiter
+
+    for title, limiter in (
+        ("Без ограничителя", None),
+        ("OutboundRateLimiter", OutboundRateLimiter()),
+    ):
+        with FakeBotAPIServer() as server:
+            bot = ExtBot(
+                "123456:BENCH",
+                base_url=f"{server.base_url}/bot",
+                rate_limiter=limiter,
+            )
+            await bot.initialize()
+            try:
+                result = await run_burst(bot, messages=messages)
+            finally:
+                await bot.shutdown()
+            print(_format_result(title, result, server))
+            if limiter is not None:
+                print(f"  статистика очереди: {limiter.stats}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        fake = FakeBotAPIServer(port=int(sys.argv[2])).start()
+        print(f"Имитация Bot API: TELEGRAM_BASE_URL={fake.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            fake.stop()
+    else:
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else BENCH_MESSAGES
+        asyncio.run(benchmark(count))
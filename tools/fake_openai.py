@@ -0,0 +1,170 @@
+"""
+Локальная заглушка OpenAI chat-completions для проверки /ask без сети.
+
+Запуск: python -m tools.fake_openai [порт], затем запустить бота с
+DEEPSEEK_BASE_URL=http://127.0.0.1:<порт>/v1. Ответ отдаётся потоком SSE
+по несколько символов; первые запросы можно завершать ошибкой (например,
+429 с Retry-After), чтобы проверить повторы ai_scheduler.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ANSWER = "Привет! Это ответ локальной заглушки."
+CHUNK_SIZE = 4
+
+
+class FakeOpenAIServer:
+    """
+    HTTP-сервер в фоновом потоке. failures — список статусов, которыми
+    по очереди отвечают первые запросы; retry_after — значение заголовка
+    Retry-After для них. В requests копятся тела принятых запросов.
+    """
+
+    def __init__(
+        self,
+        answer: str = DEFAULT_ANSWER,
+        failures: list[int] | None = None,
+        retry_after: float | None = 0,
+        chunk_delay: float = 0.0,
+        port: int = 0,
+    ):
+        self.answer = answer
+        self.failures = list(failures or [])
+        self.retry_after = retry_after
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _next_failure(self) -> int | None:
+        with self._lock:
+            return self.failures.pop(0) if self.failures else None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers=None) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append(request)
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                failure = server._next_failure()
+                if failure is not None:
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    self._send_json(
+                        failure,
+                        {"error": {"message": f"fake error {failure}"}},
+                        headers,
+                    )
+                    return
+
+                if request.get("stream"):
+                    self._stream(request.get("model", "fake"))
+                else:
+                    self._send_json(
+                        200, _completion(request.get("model", "fake"), server.answer)
+                    )
+
+            def _stream(self, model: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for start in range(0, len(server.answer), CHUNK_SIZE):
+                    piece = server.answer[start : start + CHUNK_SIZE]
+                    self.wfile.write(_sse(_chunk(model, {"content": piece})))
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self.wfile.write(_sse(_chunk(model, {}, "stop")))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def _completion(model: str, answer: str) -> dict:
+    return {
+        "id": "fake-completion",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+def _chunk(model: str, delta: dict, finish_reason: str | None = None) -> dict:
+    return {
+        "id": "fake-completion",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _sse(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8600
+    fake = FakeOpenAIServer(port=port, chunk_delay=0.05)
+    print(f"Заглушка OpenAI: DEEPSEEK_BASE_URL={fake.base_url}")
+    fake.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
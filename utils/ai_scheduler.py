@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Сколько запросов к ИИ выполняется одновременно и сколько может ждать в очереди.
+AI_MAX_CONCURRENCY = 2
+AI_MAX_QUEUE = 10
+# Повторы при временных ошибках API: экспоненциальная задержка с джиттером.
+AI_MAX_RETRIES = 4
+AI_BACKOFF_BASE = 1.0
+AI_BACKOFF_MAX = 30.0
+AI_RETRY_AFTER_MAX = 120.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class QueueFullError(Exception):
+    """Очередь запросов к ИИ заполнена."""
+
+
+def _retry_after_seconds(error: APIStatusError) -> float | None:
+    """Читает заголовок Retry-After (секунды или HTTP-дата), если он есть."""
+    headers = getattr(error.response, "headers", None) or {}
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int) -> float:
+    """Экспоненциальная задержка с полным джиттером для попытки attempt (с нуля)."""
+    return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * 2**attempt))
+
+
+class AIRequestScheduler:
+    """
+    Планировщик запросов к ИИ: ограничивает число одновременных запросов,
+    ставит остальные в ограниченную FIFO-очередь и повторяет запросы
+    при временных ошибках API с учётом Retry-After.
+    """
+
+    def __init__(
+        self, max_concurrency: int = AI_MAX_CONCURRENCY, max_queue: int = AI_MAX_QUEUE
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._active = 0
+        self._waiters = deque()
+        self.stats = {"completed": 0, "rejected": 0, "retries": 0, "failed": 0}
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self, on_queued=None) -> None:
+        """
+        Занимает слот исполнения. Если слотов нет, встаёт в очередь и вызывает
+        корутину on_queued(position). При переполненной очереди — QueueFullError.
+        """
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+
+        if self.queued >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFullError()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if on_queued is not None:
+            try:
+                await on_queued(self.queued)
+            except Exception as e:
+                logger.warning(f"Не удалось сообщить позицию в очереди ИИ: {e}")
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Слот уже был передан нам — возвращаем его следующему.
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        """Освобождает слот, передавая его первому ожидающему в очереди."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, on_queued=None):
+        """Контекстный менеджер вокруг acquire()/release()."""
+        await self.acquire(on_queued)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def call_with_retry(self, request_factory):
+        """
+        Выполняет request_factory() и повторяет его при 408/409/429/5xx и сетевых
+        ошибках. Задержка берётся из Retry-After, иначе — экспоненциальная с джиттером.
+        """
+        attempt = 0
+        while True:
+            try:
+                result = await request_factory()
+                self.stats["completed"] += 1
+                return result
+            except APIStatusError as e:
+                if (
+                    e.status_code not in RETRYABLE_STATUS_CODES
+                    or attempt >= AI_MAX_RETRIES
+                ):
+                    self.stats["failed"] += 1
+                    raise
+                retry_after = _retry_after_seconds(e)
+                delay = (
+                    min(retry_after, AI_RETRY_AFTER_MAX)
+                    if retry_after is not None
+                    else backoff_delay(attempt)
+                )
+                reason = f"статус {e.status_code}"
+            except (APIConnectionError, APITimeoutError) as e:
+                if attempt >= AI_MAX_RETRIES:
+                    self.stats["failed"] += 1
+                    raise
+                delay = backoff_delay(attempt)
+                reason = type(e).__name__
+
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.warning(
+                f"Временная ошибка ИИ ({reason}), повтор {attempt}/{AI_MAX_RETRIES} через {delay:.1f} с"
+            )
+            await asyncio.sleep(delay)
+
+
+ai_scheduler = AIRequestScheduler()
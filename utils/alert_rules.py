@@ -0,0 +1,313 @@
+import logging
+import time
+import psutil
+from telegram.ext import ContextTypes
+from utils.outbound_limiter import PRIORITY_CRITICAL
+from utils.state_manager import mark_state_dirty
+
+logger = logging.getLogger(__name__)
+
+# Группы правил включаются отдельно: системные — /alerts, батарея — /toggle_battery_monitoring.
+ALERT_GROUPS = {
+    "system": "alerts_enabled",
+    "battery": "battery_monitoring_enabled",
+}
+
+
+def make_rule(
+    name: str,
+    metric: str,
+    threshold: float,
+    clear: float,
+    above: bool = True,
+    sustain: float = 0,
+    cooldown: float = 0,
+    group: str = "system",
+    message: str = "",
+    clear_message: str | None = None,
+) -> dict:
+    """
+    Правило оповещения по метрике снимка. При above срабатывает, когда значение
+    выше threshold, и сбрасывается, когда опустится до clear (для above=False —
+    наоборот); разрыв между порогами — гистерезис. Условие должно держаться
+    sustain секунд, повторное оповещение не раньше чем через cooldown секунд.
+    В message и clear_message подставляется {value}.
+    """
+    return {
+        "name": name,
+        "metric": metric,
+        "threshold": threshold,
+        "clear": clear,
+        "above": above,
+        "sustain": sustain,
+        "cooldown": cooldown,
+        "group": group,
+        "message": message,
+        "clear_message": clear_message,
+    }
+
+
+ALERT_RULES = [
+    make_rule(
+        "cpu_high",
+        "cpu",
+        90,
+        75,
+        sustain=60,
+        cooldown=900,
+        message="🔥 Высокая загрузка CPU: {value:.0f}% дольше минуты.",
+        clear_message="✅ Загрузка CPU снизилась: {value:.0f}%.",
+    ),
+    make_rule(
+        "ram_high",
+        "ram",
+        90,
+        85,
+        sustain=60,
+        cooldown=900,
+        message="🧠 Мало свободной памяти: занято {value:.0f}% RAM.",
+        clear_message="✅ Память освободилась: занято {value:.0f}% RAM.",
+    ),
+    make_rule(
+        "disk_high",
+        "disk",
+        95,
+        90,
+        cooldown=3600,
+        message="💽 Диск почти заполнен: занято {value:.1f}%.",
+    ),
+    make_rule(
+        "temperature_high",
+        "temperature",
+        85,
+        75,
+        sustain=30,
+        cooldown=900,
+        message="🌡 Высокая температура: {value:.0f} °C.",
+        clear_message="✅ Температура снизилась: {value:.0f} °C.",
+    ),
+    make_rule(
+        "battery_low",
+        "battery_discharging",
+        20,
+        25,
+        above=False,
+        cooldown=600,
+        group="battery",
+        message="⚠️ Внимание! Низкий заряд батареи: {value:.1f}%. "
+        "Подключите зарядное устройство.",
+    ),
+    make_rule(
+        "battery_full",
+        "battery_charging",
+        95,
+        90,
+        cooldown=600,
+        group="battery",
+        message="✅ Батарея заряжена до {value:.1f}%. "
+        "Можно отключить зарядное устройство.",
+    ),
+    make_rule(
+        "battery_unavailable",
+        "battery_missing",
+        0.5,
+        0.5,
+        group="battery",
+        message="ℹ️ Автоматический мониторинг батареи: информация о батарее "
+        "недоступна. (Настольный ПК?)",
+    ),
+]
+
+
+def _battery_value(snapshot: dict, plugged: bool) -> float | None:
+    battery = snapshot["battery"]
+    if battery is None or bool(battery.power_plugged) != plugged:
+        return None
+    return battery.percent
+
+
+# Метрика -> извлечение значения из снимка сэмплера. None — метрика сейчас
+# неприменима (например, батарея заряжается для правила разряда).
+METRIC_EXTRACTORS = {
+    "cpu": lambda s: s["cpu_percent"],
+    "ram": lambda s: s["virtual_memory"].percent,
+    "swap": lambda s: s["swap_memory"].percent,
+    "disk": lambda s: s["disk_usage"].percent,
+    "temperature": lambda s: s.get("temperature"),
+    "battery_discharging": lambda s: _battery_value(s, False),
+    "battery_charging": lambda s: _battery_value(s, True),
+    "battery_missing": lambda s: 1.0 if s["battery"] is None else 0.0,
+}
+# Метрики датчиков: None у них значит не «неприменимо», а «нет данных на этой машине».
+SENSOR_METRICS = {"temperature"}
+# psutil.sensors_temperatures нет на Windows (и macOS) — правила по температуре
+# там не вычисляются вовсе.
+UNSUPPORTED_METRICS = (
+    set() if hasattr(psutil, "sensors_temperatures") else {"temperature"}
+)
+
+
+class AlertEngine:
+    """
+    Вычисляет все правила по одному снимку метрик. Каждая метрика извлекается
+    из снимка один раз за тик, сколько бы правил на неё ни ссылалось; psutil
+    здесь не вызывается вовсе — данные уже собраны сэмплером.
+    """
+
+    def __init__(self, rules: list[dict]):
+        self.rules = rules
+        self.states = {}
+        self.missing = set()
+
+    def _state(self, name: str) -> dict:
+        return self.states.setdefault(
+            name, {"active": False, "since": None, "fired_at": None}
+        )
+
+    def load_states(self, states: dict) -> None:
+        """Восстанавливает состояния правил из сохранённого состояния бота."""
+        self.states = {
+            name: {
+                "active": bool(state.get("active")),
+                "since": None,
+                "fired_at": state.get("fired_at"),
+            }
+            for name, state in (states or {}).items()
+        }
+
+    def dump_states(self) -> dict:
+        """Состояния правил для сохранения: активность и время последнего оповещения."""
+        return {
+            name: {"active": state["active"], "fired_at": state["fired_at"]}
+            for name, state in self.states.items()
+        }
+
+    def reset(self, group: str) -> None:
+        """Сбрасывает состояния правил группы (при включении или выключении)."""
+        for rule in self.rules:
+            if rule["group"] == group:
+                self.states.pop(rule["name"], None)
+
+    def evaluate(
+        self, snapshot: dict, groups: set[str], now: float | None = None
+    ) -> list[tuple[dict, str, float]]:
+        """
+        Проверяет правила включённых групп. Возвращает события
+        (правило, 'fire' или 'clear', значение).
+        """
+        now = time.time() if now is None else now
+        values = {}
+        events = []
+        for rule in self.rules:
+            if rule["group"] not in groups or rule["metric"] in UNSUPPORTED_METRICS:
+                continue
+            metric = rule["metric"]
+            if metric not in values:
+                try:
+                    values[metric] = METRIC_EXTRACTORS[metric](snapshot)
+                except Exception as e:
+                    logger.error(f"Не удалось получить метрику {metric}: {e}")
+                    values[metric] = None
+            value = values[metric]
+            state = self._state(rule["name"])
+
+            if value is None:
+                # Метрика неприменима: правило молча возвращается в исходное состояние.
+                state["active"] = False
+                state["since"] = None
+                continue
+
+            if rule["above"]:
+                triggered = value > rule["threshold"]
+                cleared = value <= rule["clear"]
+            else:
+                triggered = value < rule["threshold"]
+                cleared = value >= rule["clear"]
+
+            if state["active"]:
+                if cleared:
+                    state["active"] = False
+                    state["since"] = None
+                    if rule["clear_message"]:
+                        events.append((rule, "clear", value))
+                continue
+
+            if not triggered:
+                state["since"] = None
+                continue
+            if state["since"] is None:
+                state["since"] = now
+            if now - state["since"] < rule["sustain"]:
+                continue
+            if (
+                state["fired_at"] is not None
+                and now - state["fired_at"] < rule["cooldown"]
+            ):
+                continue
+            state["active"] = True
+            state["fired_at"] = now
+            events.append((rule, "fire", value))
+        self.missing = {
+            metric
+            for metric, value in values.items()
+            if value is None and metric in SENSOR_METRICS
+        }
+        return events
+
+    def summary(self, groups: set[str]) -> list[dict]:
+        """
+        Правила с признаком включённости группы и текущим состоянием.
+        available=False — метрика на этой платформе не поддерживается или
+        датчик не отдал данных при последней проверке.
+        """
+        return [
+            {
+                "rule": rule,
+                "enabled": rule["group"] in groups,
+                "available": rule["metric"] not in UNSUPPORTED_METRICS
+                and rule["metric"] not in self.missing,
+                "active": self.states.get(rule["name"], {}).get("active", False),
+            }
+            for rule in self.rules
+        ]
+
+
+alert_engine = AlertEngine(ALERT_RULES)
+
+
+def enabled_groups(bot_data: dict) -> set[str]:
+    """Группы правил, включённые в настройках бота."""
+    return {group for group, key in ALERT_GROUPS.items() if bot_data.get(key)}
+
+
+async def process_alerts(context: ContextTypes.DEFAULT_TYPE, snapshot: dict) -> None:
+    """
+    Вызывается сэмплером после каждого замера: проверяет все правила по снимку
+    и отправляет оповещения в чат, где оповещения были включены.
+    """
+    groups = enabled_groups(context.bot_data)
+    if not groups:
+        return
+    before = alert_engine.dump_states()
+    events = alert_engine.evaluate(snapshot, groups, snapshot["timestamp"])
+    states = alert_engine.dump_states()
+    if states != before:
+        context.bot_data["alert_states"] = states
+        mark_state_dirty()
+    if not events:
+        return
+
+    chat_id = context.bot_data.get("alert_chat_id")
+    if chat_id is None:
+        return
+    for rule, event, value in events:
+        template = rule["message"] if event == "fire" else rule["clear_message"]
+        try:
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=template.format(value=value),
+                rate_limit_args={"priority": PRIORITY_CRITICAL},
+            )
+            logger.info(f"Оповещение {rule['name']} ({event}): {value:.1f}")
+        except Exception as e:
+            logger.error(f"Не удалось отправить оповещение {rule['name']}: {e}")
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+import psutil
+from utils.alert_rules import ALERT_RULES
+from utils.metrics_history import RingBuffer
+
+logger = logging.getLogger(__name__)
+
+# Границы адаптивного интервала опроса батареи (в секундах).
+BATTERY_MIN_INTERVAL = 15
+BATTERY_MAX_INTERVAL = 600
+# Пока скорость неизвестна, интервал не больше этого значения.
+BATTERY_BOOTSTRAP_INTERVAL = 60
+# Опрос раз в такую долю оставшегося до порога времени.
+BATTERY_INTERVAL_FRACTION = 0.1
+# Окно и минимум точек для оценки скорости регрессией.
+BATTERY_RATE_WINDOW = 1800
+BATTERY_RATE_MIN_POINTS = 3
+BATTERY_RATE_MIN_SPAN = 120
+BATTERY_HISTORY_SIZE = 512
+
+
+def _rule_threshold(name: str) -> float:
+    return next(rule["threshold"] for rule in ALERT_RULES if rule["name"] == name)
+
+
+# Пороги берутся из правил оповещений, чтобы опрос учащался именно возле них.
+BATTERY_LOW_THRESHOLD = _rule_threshold("battery_low")
+BATTERY_FULL_THRESHOLD = _rule_threshold("battery_full")
+
+
+def linear_rate(timestamps: list[float], values: list[float]) -> float | None:
+    """Наклон прямой по методу наименьших квадратов (единиц в секунду)."""
+    count = len(timestamps)
+    if count < 2:
+        return None
+    mean_t = sum(timestamps) / count
+    mean_v = sum(values) / count
+    spread = sum((t - mean_t) ** 2 for t in timestamps)
+    if not spread:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in zip(timestamps, values)) / spread
+
+
+class BatteryMonitor:
+    """
+    Адаптивный опрос батареи. Сэмплер спрашивает её на каждом тике, но
+    psutil.sensors_battery вызывается, только когда подошёл срок; в остальное
+    время отдаётся последнее показание. Интервал сокращается по мере
+    приближения к порогу и растёт на сети при стабильном заряде.
+    Показания копятся в истории, по ней регрессией оценивается скорость
+    заряда/разряда и время до порога.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = RingBuffer(BATTERY_HISTORY_SIZE)
+        self.last = None
+        self.read_at = None
+        self.interval = BATTERY_BOOTSTRAP_INTERVAL
+        self._plugged = None
+
+    def read(self, now: float | None = None, force: bool = False) -> tuple:
+        """
+        Возвращает (показание, свежее ли оно). Выполняется в пуле потоков.
+        force — опросить батарею независимо от интервала.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if (
+                not force
+                and self.read_at is not None
+                and now - self.read_at < self.interval
+            ):
+                return self.last, False
+            battery = psutil.sensors_battery()
+            self._record(battery, now)
+            return battery, True
+
+    def _record(self, battery, now: float) -> None:
+        self.last = battery
+        self.read_at = now
+        if battery is None:
+            self.interval = BATTERY_MAX_INTERVAL
+            return
+        plugged = bool(battery.power_plugged)
+        if plugged != self._plugged:
+            # Сменился источник питания: прежний наклон к новому режиму не относится.
+            self._history = RingBuffer(BATTERY_HISTORY_SIZE)
+            self._plugged = plugged
+        self._history.append(now, battery.percent)
+        self.interval = self._next_interval(battery, self._estimate(battery, now))
+
+    def _estimate(self, battery, now: float) -> dict:
+        timestamps, values = self._history.points_since(now - BATTERY_RATE_WINDOW)
+        rate = None
+        if (
+            len(timestamps) >= BATTERY_RATE_MIN_POINTS
+            and timestamps[-1] - timestamps[0] >= BATTERY_RATE_MIN_SPAN
+        ):
+            rate = linear_rate(timestamps, values)
+
+        if battery.power_plugged:
+            target = (
+                BATTERY_FULL_THRESHOLD
+                if battery.percent < BATTERY_FULL_THRESHOLD
+                else 100
+            )
+        else:
+            target = (
+                BATTERY_LOW_THRESHOLD if battery.percent > BATTERY_LOW_THRESHOLD else 0
+            )
+
+        seconds_to_target = None
+        if rate and (target - battery.percent) * rate > 0:
+            seconds_to_target = (target - battery.percent) / rate
+        return {
+            "percent": battery.percent,
+            "plugged": bool(battery.power_plugged),
+            "rate_per_hour": rate * 3600 if rate is not None else None,
+            "target": target,
+            "seconds_to_target": seconds_to_target,
+            "points": len(timestamps),
+        }
+
+    @staticmethod
+    def _next_interval(battery, estimate: dict) -> float:
+        if battery.power_plugged and battery.percent >= BATTERY_FULL_THRESHOLD:
+            return BATTERY_MAX_INTERVAL
+        distance = abs(estimate["target"] - battery.percent)
+        if estimate["seconds_to_target"] is not None:
+            interval = estimate["seconds_to_target"] * BATTERY_INTERVAL_FRACTION
+        elif estimate["rate_per_hour"] is not None:
+            # Заряд стабилен или меняется в сторону от порога. От батареи заряд
+            # не стоит на месте долго (проценты целые), поэтому у порога опрос чаще.
+            if battery.power_plugged:
+                return BATTERY_MAX_INTERVAL
+            interval = distance * 60
+        else:
+            # Скорость ещё неизвестна: чем ближе порог, тем чаще опрос.
+            interval = min(BATTERY_BOOTSTRAP_INTERVAL, distance * 20)
+        return min(BATTERY_MAX_INTERVAL, max(BATTERY_MIN_INTERVAL, interval))
+
+    def estimate(self, now: float | None = None) -> dict | None:
+        """Оценка по последнему показанию или None, если батареи нет или опроса ещё не было."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.last is None:
+                return None
+            result = self._estimate(self.last, now)
+            result["interval"] = self.interval
+            return result
+
+
+battery_monitor = BatteryMonitor()
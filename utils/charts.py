@@ -0,0 +1,98 @@
+import io
+
+# Функции рендеринга выполняются в пуле процессов. На Windows (spawn) дочерний
+# процесс сначала заново импортирует главный модуль бота со всеми его импортами
+# (без запуска: main() под if __name__ == "__main__") и лишь потом этот модуль.
+# Поэтому здесь нет ничего, кроме Pillow, а в bot.py не должно быть побочных
+# действий на уровне модуля, кроме настройки логирования.
+try:
+    from PIL import Image, ImageDraw, ImageFont
+
+    CHARTS_AVAILABLE = True
+except ImportError:
+    CHARTS_AVAILABLE = False
+
+CHART_WIDTH = 800
+CHART_HEIGHT = 320
+CHART_PADDING = (50, 30, 20, 30)  # слева, сверху, справа, снизу
+BACKGROUND_COLOR = (24, 26, 31)
+GRID_COLOR = (60, 64, 72)
+LINE_COLOR = (86, 182, 255)
+FILL_COLOR = (86, 182, 255, 70)
+TEXT_COLOR = (200, 204, 210)
+
+
+def _column_values(timestamps, values, start, end, columns):
+    """Сводит точки к одному значению (максимуму) на каждый столбец пикселей."""
+    span = max(end - start, 1e-9)
+    result = [None] * columns
+    for timestamp, value in zip(timestamps, values):
+        column = min(columns - 1, max(0, int((timestamp - start) / span * columns)))
+        if result[column] is None or value > result[column]:
+            result[column] = value
+    return result
+
+
+def render_area_chart(
+    timestamps: list[float],
+    values: list[float],
+    title: str,
+    y_max: float | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    start_label: str = "",
+    end_label: str = "now",
+) -> bytes:
+    """
+    Рисует PNG-график с заливкой под линией и возвращает его байты.
+    y_max задаёт верх шкалы (например, 100 для процентов), иначе берётся максимум данных.
+    """
+    left, top, right, bottom = CHART_PADDING
+    plot_width = CHART_WIDTH - left - right
+    plot_height = CHART_HEIGHT - top - bottom
+    start = timestamps[0] if start is None else start
+    end = timestamps[-1] if end is None else end
+    scale_max = y_max if y_max is not None else max(max(values), 1e-9)
+
+    image = Image.new("RGB", (CHART_WIDTH, CHART_HEIGHT), BACKGROUND_COLOR)
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    overlay_draw = ImageDraw.Draw(overlay)
+    font = ImageFont.load_default()
+
+    for fraction in (0, 0.25, 0.5, 0.75, 1):
+        y = top + plot_height * (1 - fraction)
+        draw.line([(left, y), (left + plot_width, y)], fill=GRID_COLOR)
+        draw.text((4, y - 6), f"{scale_max * fraction:.4g}", fill=TEXT_COLOR, font=font)
+
+    columns = _column_values(timestamps, values, start, end, plot_width)
+    points = [
+        (left + column, top + plot_height * (1 - min(value, scale_max) / scale_max))
+        for column, value in enumerate(columns)
+        if value is not None
+    ]
+    if len(points) == 1:
+        points.append((points[0][0] + 1, points[0][1]))
+    if points:
+        baseline = top + plot_height
+        overlay_draw.polygon(
+            [(points[0][0], baseline), *points, (points[-1][0], baseline)],
+            fill=FILL_COLOR,
+        )
+        image.paste(overlay, mask=overlay)
+        draw.line(points, fill=LINE_COLOR, width=2)
+
+    draw.text((left, 8), title, fill=TEXT_COLOR, font=font)
+    draw.text(
+        (left, CHART_HEIGHT - bottom + 8), start_label, fill=TEXT_COLOR, font=font
+    )
+    draw.text(
+        (CHART_WIDTH - right - 30, CHART_HEIGHT - bottom + 8),
+        end_label,
+        fill=TEXT_COLOR,
+        font=font,
+    )
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
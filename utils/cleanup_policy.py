@@ -0,0 +1,237 @@
+import fnmatch
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import deque
+from utils.file_scan import iter_tree
+
+logger = logging.getLogger(__name__)
+
+# Сколько старейших файлов помнить за проход для соблюдения лимита размера папки.
+CAP_CANDIDATES = 1000
+# Файлы моложе этого возраста не удаляются даже ради лимита размера.
+DEFAULT_CAP_MIN_AGE = 3600
+
+
+def make_policy(
+    root: str,
+    min_age: float,
+    include: tuple[str, ...] = ("*",),
+    exclude: tuple[str, ...] = (),
+    max_size: int | None = None,
+    cap_min_age: float = DEFAULT_CAP_MIN_AGE,
+) -> dict:
+    """
+    Политика очистки папки: удаляются файлы старше min_age секунд, имя которых
+    подходит под include и не подходит под exclude (шаблоны glob). Если папка
+    больше max_size байт, дополнительно удаляются самые старые подходящие файлы
+    старше cap_min_age. Папки, подходящие под exclude, не обходятся.
+    """
+    return {
+        "root": root,
+        "min_age": min_age,
+        "include": tuple(include),
+        "exclude": tuple(exclude),
+        "max_size": max_size,
+        "cap_min_age": cap_min_age,
+    }
+
+
+def _matches(name: str, patterns: tuple[str, ...]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+class PolicyRunner:
+    """
+    Пошаговое выполнение одной политики. Обход папки продолжается с места
+    остановки на следующем шаге; по окончании прохода проверяется лимит размера,
+    и следующий шаг начинает новый проход.
+    """
+
+    def __init__(self, policy: dict):
+        self.policy = policy
+        self.passes = 0
+        self.deleted = 0
+        self.freed = 0
+        self.errors = 0
+        self.last_pass_size = None
+        self._walker = None
+        self._pass_size = 0
+        self._cap_candidates = []
+        self._cap_queue = deque()
+        # Обход — генератор: один шаг не может выполняться в двух потоках сразу.
+        self.stepping = threading.Lock()
+
+    def _start_pass(self) -> None:
+        exclude = self.policy["exclude"]
+        self._walker = iter_tree(
+            self.policy["root"], skip_dir=lambda name: _matches(name, exclude)
+        )
+        self._pass_size = 0
+        self._cap_candidates = []
+
+    def _finish_pass(self) -> None:
+        self._walker = None
+        self.passes += 1
+        self.last_pass_size = self._pass_size
+        max_size = self.policy["max_size"]
+        if max_size is None or self._pass_size <= max_size:
+            return
+        # Папка больше лимита: в очередь попадают самые старые файлы, пока
+        # их суммарного размера не хватит, чтобы уложиться в лимит.
+        excess = self._pass_size - max_size
+        for neg_mtime, path, size in sorted(self._cap_candidates, reverse=True):
+            if excess <= 0:
+                break
+            self._cap_queue.append((path, -neg_mtime))
+            excess -= size
+        self._cap_candidates = []
+
+    def _remember_cap_candidate(self, path: str, size: int, mtime: float) -> None:
+        # Куча по -mtime ограниченного размера хранит самые старые файлы.
+        heapq.heappush(self._cap_candidates, (-mtime, path, size))
+        if len(self._cap_candidates) > CAP_CANDIDATES:
+            heapq.heappop(self._cap_candidates)
+
+    def _delete(self, path: str, is_dir: bool, size: int, result: dict) -> None:
+        try:
+            if is_dir:
+                os.rmdir(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            # Непустая папка или файл, занятый приложением, — обычная ситуация.
+            if not is_dir:
+                logger.debug(f"Автоочистка: не удалось удалить {path}: {e}")
+                self.errors += 1
+                result["errors"] += 1
+            return
+        self.deleted += 1
+        self.freed += size
+        result["deleted"] += 1
+        result["freed"] += size
+
+    def step(self, scan_budget: int, delete_budget: int, now: float) -> dict:
+        """
+        Выполняет один шаг: просматривает не больше scan_budget элементов
+        и удаляет не больше delete_budget. Возвращает счётчики шага.
+        """
+        result = {"scanned": 0, "deleted": 0, "freed": 0, "errors": 0}
+        policy = self.policy
+
+        while self._cap_queue and result["deleted"] < delete_budget:
+            path, mtime = self._cap_queue.popleft()
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            # Файл изменили после прохода или он стал слишком молодым — не трогаем.
+            if info.st_mtime != mtime or now - info.st_mtime < policy["cap_min_age"]:
+                continue
+            self._delete(path, False, info.st_size, result)
+
+        if not os.path.isdir(policy["root"]):
+            return result
+        if self._walker is None:
+            self._start_pass()
+
+        while result["scanned"] < scan_budget and result["deleted"] < delete_budget:
+            try:
+                path, is_dir, size, mtime = next(self._walker)
+            except StopIteration:
+                self._finish_pass()
+                break
+            result["scanned"] += 1
+            age = now - mtime
+
+            if is_dir:
+                if age >= policy["min_age"]:
+                    self._delete(path, True, 0, result)
+                continue
+
+            name = os.path.basename(path)
+            eligible = _matches(name, policy["include"]) and not _matches(
+                name, policy["exclude"]
+            )
+            if eligible and age >= policy["min_age"]:
+                self._delete(path, False, size, result)
+                continue
+
+            self._pass_size += size
+            if (
+                eligible
+                and policy["max_size"] is not None
+                and age >= policy["cap_min_age"]
+            ):
+                self._remember_cap_candidate(path, size, mtime)
+
+        return result
+
+
+class IncrementalCleaner:
+    """Набор политик очистки, которые выполняются небольшими порциями."""
+
+    def __init__(self):
+        # tick выполняется в пуле потоков, summary — в цикле событий.
+        self._lock = threading.Lock()
+        self.runners = {}
+        self.ticks = 0
+        self.last_tick = None
+
+    def tick(self, policies: list[dict], scan_budget: int, delete_budget: int) -> dict:
+        """
+        Один шаг по всем политикам; бюджет делится между ними поровну.
+        Выполняется в пуле потоков.
+        """
+        active = {policy["root"] for policy in policies}
+        with self._lock:
+            for root in list(self.runners):
+                if root not in active:
+                    del self.runners[root]
+
+        totals = {"scanned": 0, "deleted": 0, "freed": 0, "errors": 0}
+        if not policies:
+            return totals
+        now = time.time()
+        share_scan = max(1, scan_budget // len(policies))
+        share_delete = max(1, delete_budget // len(policies))
+        for policy in policies:
+            with self._lock:
+                runner = self.runners.get(policy["root"])
+                if runner is None or runner.policy != policy:
+                    runner = self.runners[policy["root"]] = PolicyRunner(policy)
+            if not runner.stepping.acquire(blocking=False):
+                # Предыдущий тик ещё обходит эту папку — пропускаем её в этот раз.
+                continue
+            try:
+                result = runner.step(share_scan, share_delete, now)
+            finally:
+                runner.stepping.release()
+            for key, value in result.items():
+                totals[key] += value
+        self.ticks += 1
+        self.last_tick = now
+        return totals
+
+    def summary(self) -> list[dict]:
+        """Накопленная статистика по каждой политике."""
+        with self._lock:
+            runners = list(self.runners.items())
+        return [
+            {
+                "root": root,
+                "passes": runner.passes,
+                "deleted": runner.deleted,
+                "freed": runner.freed,
+                "errors": runner.errors,
+                "last_pass_size": runner.last_pass_size,
+            }
+            for root, runner in runners
+        ]
+
+
+incremental_cleaner = IncrementalCleaner()
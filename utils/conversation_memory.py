@@ -0,0 +1,91 @@
+import hashlib
+import json
+
+# История диалога хранится в context.chat_data под этими ключами.
+HISTORY_KEY = "ai_history"
+SUMMARY_KEY = "ai_history_summary"
+# Бюджеты в приблизительных токенах: последние реплики и сжатая выжимка старых.
+HISTORY_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 300
+SUMMARY_QUESTION_CHARS = 80
+SUMMARY_ANSWER_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (около 3 символов на токен для смешанного текста)."""
+    return len(text) // 3 + 1
+
+
+def _history_tokens(history: list[dict]) -> int:
+    return sum(estimate_tokens(message["content"]) for message in history)
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def build_messages(chat_data: dict, system_prompt: str, user_query: str) -> list[dict]:
+    """Собирает запрос: системный промпт, выжимка старых реплик, свежая история и вопрос."""
+    messages = [{"role": "system", "content": system_prompt}]
+    summary = chat_data.get(SUMMARY_KEY)
+    if summary:
+        messages.append(
+            {
+                "role": "system",
+                "content": "Кратко о более ранней части диалога:\n"
+                + "\n".join(summary),
+            }
+        )
+    messages.extend(chat_data.get(HISTORY_KEY, []))
+    messages.append({"role": "user", "content": user_query})
+    return messages
+
+
+def append_turn(chat_data: dict, user_query: str, ai_response: str) -> None:
+    """Добавляет пару вопрос/ответ в историю и сжимает её до бюджета."""
+    history = chat_data.setdefault(HISTORY_KEY, [])
+    history.append({"role": "user", "content": user_query})
+    history.append({"role": "assistant", "content": ai_response})
+    compact_history(chat_data)
+
+
+def compact_history(chat_data: dict) -> None:
+    """
+    Пока история превышает бюджет, самые старые пары реплик переносятся
+    в короткую выжимку; выжимка сама ограничена и теряет старейшие строки.
+    """
+    history = chat_data.get(HISTORY_KEY, [])
+    summary = chat_data.setdefault(SUMMARY_KEY, [])
+
+    while len(history) > 2 and _history_tokens(history) > HISTORY_TOKEN_BUDGET:
+        question = history.pop(0)
+        answer = (
+            history.pop(0) if history and history[0]["role"] == "assistant" else None
+        )
+        line = f"- Вопрос: {_shorten(question['content'], SUMMARY_QUESTION_CHARS)}"
+        if answer:
+            line += f" → Ответ: {_shorten(answer['content'], SUMMARY_ANSWER_CHARS)}"
+        summary.append(line)
+
+    while (
+        summary
+        and sum(estimate_tokens(line) for line in summary) > SUMMARY_TOKEN_BUDGET
+    ):
+        summary.pop(0)
+
+
+def reset_history(chat_data: dict) -> None:
+    """Полностью забывает диалог в чате."""
+    chat_data.pop(HISTORY_KEY, None)
+    chat_data.pop(SUMMARY_KEY, None)
+
+
+def history_digest(chat_data: dict) -> str:
+    """Отпечаток текущего контекста диалога для ключа кэша ответов; пустой без истории."""
+    history = chat_data.get(HISTORY_KEY)
+    summary = chat_data.get(SUMMARY_KEY)
+    if not history and not summary:
+        return ""
+    raw = json.dumps([summary or [], history or []], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,258 @@
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import time
+from config import BOT_STATE_FILE
+from utils.file_scan import is_link
+
+logger = logging.getLogger(__name__)
+
+# Индекс размеров папок лежит рядом с файлом состояния бота.
+DU_INDEX_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(BOT_STATE_FILE)), "du_index.sqlite3"
+)
+# Сколько крупнейших файлов каждой папки хранить в индексе.
+DU_TOP_FILES = 10
+# Записи индекса пишутся пачками такого размера.
+DU_WRITE_BATCH = 500
+# mtime папки не меняется, когда файл в ней растёт на месте (логи, базы, образы
+# дисков), поэтому запись индекса считается верной не дольше этого срока.
+DU_INDEX_MAX_AGE = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    files_size INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    subdirs TEXT NOT NULL,
+    top_files TEXT NOT NULL,
+    total_size INTEGER NOT NULL,
+    scanned_at REAL NOT NULL
+);
+"""
+
+
+def _connect(path: str = DU_INDEX_FILE) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def new_scan_stats() -> dict:
+    """Счётчики сканирования; обновляются из рабочих потоков по ходу обхода."""
+    return {
+        "scanned": 0,
+        "cached": 0,
+        "errors": 0,
+        "oldest_cached": None,
+        "started": time.monotonic(),
+    }
+
+
+def _subtree_range(path: str) -> tuple[str, str]:
+    """Границы ключей всех вложенных путей для запроса по диапазону первичного ключа."""
+    prefix = path if path.endswith(os.sep) else path + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class _SubtreeScanner:
+    """
+    Обход одного поддерева с собственным соединением к индексу.
+    Папка, mtime которой совпадает с записью в индексе не старше
+    DU_INDEX_MAX_AGE, не перечитывается: её файлы и список подпапок берутся
+    из индекса, проверяются только подпапки.
+    """
+
+    def __init__(self, stats: dict, index_path: str, force: bool = False):
+        self.stats = stats
+        self.force = force
+        self.db = _connect(index_path)
+        self._pending = []
+
+    def close(self) -> None:
+        self._flush()
+        self.db.close()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO dirs (path, mtime, files_size, file_count, "
+                "subdirs, top_files, total_size, scanned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def _read_directory(self, path: str, old_subdirs: list[str]) -> tuple:
+        files_size = 0
+        file_count = 0
+        subdirs = []
+        top_files = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if not is_link(entry) and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    self.stats["errors"] += 1
+                    continue
+                files_size += size
+                file_count += 1
+                if len(top_files) < DU_TOP_FILES:
+                    heapq.heappush(top_files, (size, entry.name))
+                elif size > top_files[0][0]:
+                    heapq.heapreplace(top_files, (size, entry.name))
+
+        # Удалённые подпапки убираем из индекса вместе со всем их поддеревом.
+        for name in set(old_subdirs) - set(subdirs):
+            child = os.path.join(path, name)
+            low, high = _subtree_range(child)
+            with self.db:
+                self.db.execute(
+                    "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                    (child, low, high),
+                )
+        top_files.sort(reverse=True)
+        return files_size, file_count, subdirs, [[n, s] for s, n in top_files]
+
+    def load(self, path: str) -> dict | None:
+        """
+        Содержимое одной папки без рекурсии: размер её файлов, крупнейшие файлы
+        и список подпапок. Берётся из индекса, если mtime папки не изменился
+        и запись не устарела.
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self.stats["errors"] += 1
+            return None
+
+        row = self.db.execute(
+            "SELECT mtime, files_size, file_count, subdirs, top_files, scanned_at "
+            "FROM dirs WHERE path = ?",
+            (path,),
+        ).fetchone()
+        now = time.time()
+        if (
+            row is not None
+            and row[0] == mtime
+            and now - row[5] < DU_INDEX_MAX_AGE
+            and not self.force
+        ):
+            self.stats["cached"] += 1
+            oldest = self.stats["oldest_cached"]
+            if oldest is None or row[5] < oldest:
+                self.stats["oldest_cached"] = row[5]
+            return {
+                "mtime": mtime,
+                "files_size": row[1],
+                "file_count": row[2],
+                "subdirs": json.loads(row[3]),
+                "top_files": json.loads(row[4]),
+                "scanned_at": row[5],
+            }
+
+        old_subdirs = json.loads(row[3]) if row is not None else []
+        try:
+            files_size, file_count, subdirs, top_files = self._read_directory(
+                path, old_subdirs
+            )
+        except OSError as e:
+            logger.debug(f"Не удалось прочитать папку {path}: {e}")
+            self.stats["errors"] += 1
+            return None
+        self.stats["scanned"] += 1
+        return {
+            "mtime": mtime,
+            "files_size": files_size,
+            "file_count": file_count,
+            "subdirs": subdirs,
+            "top_files": top_files,
+            "scanned_at": now,
+        }
+
+    def store(self, path: str, listing: dict, total_size: int) -> None:
+        self._pending.append(
+            (
+                path,
+                listing["mtime"],
+                listing["files_size"],
+                listing["file_count"],
+                json.dumps(listing["subdirs"], ensure_ascii=False),
+                json.dumps(listing["top_files"], ensure_ascii=False),
+                total_size,
+                # Взятая из индекса запись сохраняет время чтения, чтобы срок
+                # годности не продлевался без перечитывания папки.
+                listing["scanned_at"],
+            )
+        )
+        if len(self._pending) >= DU_WRITE_BATCH:
+            self._flush()
+
+    def scan(self, path: str) -> int | None:
+        """Полный размер поддерева папки (или None, если её не удалось прочитать)."""
+        listing = self.load(path)
+        if listing is None:
+            return None
+        total = listing["files_size"]
+        for name in listing["subdirs"]:
+            child_total = self.scan(os.path.join(path, name))
+            if child_total is not None:
+                total += child_total
+        self.store(path, listing, total)
+        return total
+
+
+def scan_directory(
+    path: str,
+    stats: dict | None = None,
+    force: bool = False,
+    index_path: str = DU_INDEX_FILE,
+) -> int | None:
+    """
+    Считает полный размер папки, используя индекс (force — перечитать всё).
+    Выполняется в пуле потоков; разные поддеревья можно сканировать параллельно,
+    у каждого вызова своё соединение.
+    """
+    scanner = _SubtreeScanner(
+        stats if stats is not None else new_scan_stats(), index_path, force
+    )
+    try:
+        return scanner.scan(path)
+    finally:
+        scanner.close()
+
+
+def list_directory(
+    path: str, stats: dict, index_path: str = DU_INDEX_FILE
+) -> dict | None:
+    """
+    Верхний уровень папки; подпапки затем сканируются параллельно через
+    scan_directory. Показываемая папка всегда перечитывается, чтобы размеры
+    её файлов были точными.
+    """
+    scanner = _SubtreeScanner(stats, index_path, force=True)
+    try:
+        return scanner.load(path)
+    finally:
+        scanner.close()
+
+
+def store_directory(
+    path: str, listing: dict, total_size: int, index_path: str = DU_INDEX_FILE
+) -> None:
+    """Сохраняет запись верхнего уровня после того, как посчитаны все подпапки."""
+    scanner = _SubtreeScanner(new_scan_stats(), index_path)
+    try:
+        scanner.store(path, listing, total_size)
+    finally:
+        scanner.close()
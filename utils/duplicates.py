@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+from utils.file_scan import iter_tree
+
+logger = logging.getLogger(__name__)
+
+# Частичный хэш читает столько байт с начала и с конца файла.
+PARTIAL_HASH_BYTES = 4096
+# Размер буфера при полном хэшировании.
+FULL_HASH_BUFFER = 1024 * 1024
+
+
+def collect_size_buckets(root: str, min_size: int, stats: dict) -> dict[int, list]:
+    """
+    Группирует файлы по размеру, читая только метаданные. Возвращает лишь размеры,
+    у которых больше одного файла: файлы уникального размера дубликатами быть не могут.
+    Элементы групп — пары (путь, mtime).
+    """
+    buckets = {}
+    for path, is_dir, size, mtime in iter_tree(root):
+        if is_dir:
+            continue
+        stats["files"] += 1
+        if size < min_size:
+            continue
+        buckets.setdefault(size, []).append((path, mtime))
+    return {size: files for size, files in buckets.items() if len(files) > 1}
+
+
+def partial_hash(path: str, size: int) -> bytes:
+    """Хэш первых и последних PARTIAL_HASH_BYTES байт файла."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+    return digest.digest()
+
+
+def full_hash(path: str) -> bytes:
+    """Хэш всего файла; чтение крупными блоками в один переиспользуемый буфер."""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(FULL_HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.digest()
+
+
+def hash_group(files: list[tuple], size: int, full: bool, stats: dict) -> list[list]:
+    """
+    Делит группу файлов одного размера по хэшу (частичному или полному)
+    и возвращает только подгруппы, где файлов больше одного.
+    Выполняется в пуле потоков.
+    """
+    by_hash = {}
+    for path, mtime in files:
+        try:
+            digest = full_hash(path) if full else partial_hash(path, size)
+        except OSError as e:
+            logger.debug(f"Не удалось прочитать {path}: {e}")
+            stats["errors"] += 1
+            continue
+        stats["full_hashed" if full else "partial_hashed"] += 1
+        if full:
+            stats["bytes_hashed"] += size
+        by_hash.setdefault(digest, []).append((path, mtime))
+    return [group for group in by_hash.values() if len(group) > 1]
+
+
+def hash_groups(
+    groups: list[tuple[int, list]], full: bool, stats: dict
+) -> list[tuple[int, list]]:
+    """Применяет hash_group к пачке групп (размер, файлы); одна пачка — одна задача пула."""
+    result = []
+    for size, files in groups:
+        result.extend((size, group) for group in hash_group(files, size, full, stats))
+    return result
+
+
+def delete_duplicates(group: dict) -> dict:
+    """
+    Удаляет все копии группы, кроме первой (самой старой). Перед удалением
+    проверяет, что размер и mtime файла не изменились после поиска.
+    """
+    result = {"deleted": 0, "freed": 0, "skipped": 0, "errors": 0}
+    for path, mtime in group["files"][1:]:
+        try:
+            info = os.stat(path)
+            if info.st_size != group["size"] or info.st_mtime != mtime:
+                result["skipped"] += 1
+                continue
+            os.remove(path)
+        except FileNotFoundError:
+            result["skipped"] += 1
+            continue
+        except OSError as e:
+            logger.error(f"Не удалось удалить дубликат {path}: {e}")
+            result["errors"] += 1
+            continue
+        result["deleted"] += 1
+        result["freed"] += group["size"]
+    return result
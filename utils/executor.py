@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Размеры пулов: потоки — для блокирующего ввода-вывода (subprocess, диск, psutil),
+# процессы — для тяжёлых вычислений (кодирование изображений и т.п.).
+THREAD_POOL_SIZE = min(8, (os.cpu_count() or 1) + 4)
+PROCESS_POOL_SIZE = max(1, min(4, (os.cpu_count() or 2) // 2))
+# Отдельный небольшой пул для долгих обходов диска (/du, поиск дубликатов), чтобы они
+# не занимали общий пул, которым пользуются сэмплер, кэш процессов и обработчики.
+SCAN_POOL_SIZE = 2
+# Таймаут по умолчанию для одного вызова (в секундах). None — без ограничения.
+DEFAULT_TIMEOUT = 30
+
+_pools = {"thread": None, "process": None, "scan": None}
+_pool_sizes = {
+    "thread": THREAD_POOL_SIZE,
+    "process": PROCESS_POOL_SIZE,
+    "scan": SCAN_POOL_SIZE,
+}
+_stats = {
+    kind: {"pending": 0, "max_pending": 0, "completed": 0, "failed": 0, "timed_out": 0}
+    for kind in _pools
+}
+_stats_lock = threading.Lock()
+# Задачи сканирования ждут свободного исполнителя здесь, а не в очереди пула,
+# поэтому их таймаут отсчитывается с момента запуска.
+_scan_slots = asyncio.Semaphore(SCAN_POOL_SIZE)
+
+
+def _get_pool(kind: str):
+    if _pools[kind] is None:
+        if kind == "thread":
+            _pools[kind] = ThreadPoolExecutor(
+                max_workers=THREAD_POOL_SIZE, thread_name_prefix="bot-worker"
+            )
+        elif kind == "scan":
+            _pools[kind] = ThreadPoolExecutor(
+                max_workers=SCAN_POOL_SIZE, thread_name_prefix="bot-scan"
+            )
+        else:
+            _pools[kind] = ProcessPoolExecutor(max_workers=PROCESS_POOL_SIZE)
+        logger.info(f"Создан пул '{kind}' на {_pool_sizes[kind]} исполнителей.")
+    return _pools[kind]
+
+
+def _on_done(kind: str, future) -> None:
+    with _stats_lock:
+        stats = _stats[kind]
+        stats["pending"] -= 1
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            stats["failed"] += 1
+        else:
+            stats["completed"] += 1
+
+
+async def _submit(kind: str, func, args, kwargs, timeout):
+    pool = _get_pool(kind)
+    with _stats_lock:
+        stats = _stats[kind]
+        stats["pending"] += 1
+        stats["max_pending"] = max(stats["max_pending"], stats["pending"])
+        queue_depth = stats["pending"] - _pool_sizes[kind]
+    if queue_depth > 0:
+        logger.warning(
+            f"Очередь пула '{kind}' растёт: {queue_depth} задач ждут исполнителя."
+        )
+
+    concurrent_future = pool.submit(func, *args, **kwargs)
+    concurrent_future.add_done_callback(functools.partial(_on_done, kind))
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(concurrent_future), timeout)
+    except asyncio.TimeoutError:
+        with _stats_lock:
+            _stats[kind]["timed_out"] += 1
+        logger.error(
+            f"Превышен таймаут {timeout} с для {getattr(func, '__name__', func)} в пуле '{kind}'."
+        )
+        raise
+
+
+async def run_blocking(func, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    Выполняет блокирующую функцию в общем пуле потоков, не останавливая цикл событий.
+    При превышении timeout выбрасывает asyncio.TimeoutError; ещё не начатая задача
+    снимается с очереди, уже запущенная дорабатывает в фоне.
+    """
+    return await _submit("thread", func, args, kwargs, timeout)
+
+
+async def run_scan(func, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    Выполняет долгий обход файловой системы в отдельном пуле сканирования.
+    Одновременно работает не больше SCAN_POOL_SIZE таких задач, остальные ждут.
+    """
+    async with _scan_slots:
+        return await _submit("scan", func, args, kwargs, timeout)
+
+
+async def run_cpu_bound(func, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    Выполняет тяжёлую вычислительную функцию в отдельном пуле процессов.
+    Функция и аргументы должны сериализоваться через pickle.
+    """
+    return await _submit("process", func, args, kwargs, timeout)
+
+
+def get_executor_stats() -> dict:
+    """Возвращает метрики пулов: ожидающие задачи, глубину очереди и счётчики."""
+    with _stats_lock:
+        result = {}
+        for kind, stats in _stats.items():
+            result[kind] = dict(stats)
+            result[kind]["workers"] = _pool_sizes[kind]
+            result[kind]["queue_depth"] = max(0, stats["pending"] - _pool_sizes[kind])
+        return result
+
+
+def shutdown_executors() -> None:
+    """Останавливает пулы при завершении работы бота."""
+    for kind, pool in _pools.items():
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+            _pools[kind] = None
+            logger.info(f"Пул '{kind}' остановлен.")
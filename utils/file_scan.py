@@ -0,0 +1,136 @@
+import logging
+import os
+import stat
+
+logger = logging.getLogger(__name__)
+
+_SIZE_UNITS = ("Б", "КБ", "МБ", "ГБ", "ТБ")
+
+
+def format_size(num_bytes: float) -> str:
+    """Размер в удобных единицах: '512 Б', '3.4 МБ', '1.2 ГБ'."""
+    size = float(num_bytes)
+    for unit in _SIZE_UNITS[:-1]:
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "Б" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} {_SIZE_UNITS[-1]}"
+
+
+_SIZE_SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(text: str) -> int:
+    """Разбирает размер вида '512', '64k', '10M', '2G'. Бросает ValueError при ошибке."""
+    value = text.strip().lower()
+    if value.endswith("b"):
+        value = value[:-1]
+    number = value.rstrip("kmgt")
+    suffix = value[len(number) :]
+    try:
+        return int(float(number) * _SIZE_SUFFIXES[suffix])
+    except (KeyError, ValueError):
+        raise ValueError(f"Некорректный размер: {text}") from None
+
+
+def is_link(entry: os.DirEntry) -> bool:
+    """
+    Символическая ссылка или точка повторной обработки (junction в Windows).
+    В такие папки нельзя заходить при удалении, иначе пострадает их цель.
+    """
+    if entry.is_symlink():
+        return True
+    if os.name != "nt":
+        return False
+    # В Windows атрибуты приходят вместе с результатом scandir, stat бесплатен.
+    attributes = getattr(entry.stat(follow_symlinks=False), "st_file_attributes", 0)
+    return bool(attributes & getattr(stat, "FILE_ATTRIBUTE_REPARSE_POINT", 0))
+
+
+def new_cleanup_stats(path: str) -> dict:
+    """Счётчики очистки одной папки; обновляются из рабочего потока по ходу обхода."""
+    return {"path": path, "files": 0, "dirs": 0, "bytes": 0, "errors": 0, "done": False}
+
+
+def clean_directory(
+    path: str, dry_run: bool = False, stats: dict | None = None
+) -> dict:
+    """
+    Удаляет содержимое папки (саму папку оставляет) и считает освобождённые байты.
+    Обход через os.scandir: размер берётся из DirEntry, без отдельного stat на элемент
+    в Windows. При dry_run ничего не удаляется, считается только объём, который можно
+    освободить. Выполняется в пуле потоков.
+    """
+    stats = stats if stats is not None else new_cleanup_stats(path)
+    try:
+        _clean_tree(path, stats, dry_run)
+    finally:
+        stats["done"] = True
+    return stats
+
+
+def _clean_tree(path: str, stats: dict, dry_run: bool) -> bool:
+    """Очищает папку рекурсивно; возвращает True, если она опустела."""
+    emptied = True
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if is_link(entry):
+                        if not dry_run:
+                            # В Windows ссылки на папки удаляются через rmdir.
+                            if os.name == "nt" and entry.is_dir():
+                                os.rmdir(entry.path)
+                            else:
+                                os.unlink(entry.path)
+                        stats["files"] += 1
+                    elif entry.is_dir(follow_symlinks=False):
+                        if _clean_tree(entry.path, stats, dry_run):
+                            if not dry_run:
+                                os.rmdir(entry.path)
+                            stats["dirs"] += 1
+                        else:
+                            emptied = False
+                    else:
+                        size = entry.stat(follow_symlinks=False).st_size
+                        if not dry_run:
+                            os.remove(entry.path)
+                        stats["files"] += 1
+                        stats["bytes"] += size
+                except OSError as e:
+                    logger.debug(f"Не удалось удалить {entry.path}: {e}")
+                    stats["errors"] += 1
+                    emptied = False
+    except OSError as e:
+        logger.warning(f"Не удалось прочитать папку {path}: {e}")
+        stats["errors"] += 1
+        return False
+    return emptied
+
+
+def iter_tree(path: str, skip_dir=None):
+    """
+    Обходит дерево через os.scandir и выдаёт (путь, это_папка, размер, mtime).
+    Папки выдаются после своего содержимого, ссылки не раскрываются.
+    skip_dir(имя) позволяет не заходить в папку. Генератор можно продолжать
+    порциями между вызовами: дескриптор папки не удерживается, пока он приостановлен.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as e:
+        logger.debug(f"Не удалось прочитать папку {path}: {e}")
+        return
+
+    for entry in entries:
+        try:
+            info = entry.stat(follow_symlinks=False)
+            if not is_link(entry) and entry.is_dir(follow_symlinks=False):
+                if skip_dir is not None and skip_dir(entry.name):
+                    continue
+                yield from iter_tree(entry.path, skip_dir)
+                yield entry.path, True, 0, info.st_mtime
+            else:
+                yield entry.path, False, info.st_size, info.st_mtime
+        except OSError as e:
+            logger.debug(f"Не удалось получить сведения о {entry.path}: {e}")
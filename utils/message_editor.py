@@ -0,0 +1,59 @@
+import logging
+import time
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Минимальный интервал между правками одного сообщения (в секундах).
+# Telegram ограничивает частоту editMessageText, частые правки ведут к 429.
+EDIT_INTERVAL = 1.0
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class ThrottledMessageEditor:
+    """
+    Показывает постепенно растущий текст, редактируя одно сообщение.
+    Промежуточные обновления объединяются: правка уходит не чаще раза в EDIT_INTERVAL,
+    а финальное состояние отправляется через flush(). Текст длиннее лимита Telegram
+    продолжается в новых сообщениях.
+    """
+
+    def __init__(self, message, parse_mode: str | None = None):
+        self.message = message
+        self.parse_mode = parse_mode
+        self._offset = 0
+        self._shown_text = None
+        self._last_edit = 0.0
+
+    async def update(self, text: str) -> None:
+        """Показывает новый текст, если с прошлой правки прошло не меньше EDIT_INTERVAL."""
+        if time.monotonic() - self._last_edit < EDIT_INTERVAL:
+            return
+        await self._render(text)
+
+    async def flush(self, text: str) -> None:
+        """Принудительно показывает окончательный текст."""
+        await self._render(text)
+
+    async def _render(self, text: str) -> None:
+        # Заполненные сообщения фиксируем и продолжаем текст в новом.
+        while len(text) - self._offset > TELEGRAM_MESSAGE_LIMIT:
+            chunk = text[self._offset : self._offset + TELEGRAM_MESSAGE_LIMIT]
+            await self._edit(chunk)
+            self._offset += TELEGRAM_MESSAGE_LIMIT
+            self.message = await self.message.reply_text("…")
+            self._shown_text = None
+
+        await self._edit(text[self._offset :] or "…")
+
+    async def _edit(self, text: str) -> None:
+        if text == self._shown_text:
+            return
+        try:
+            await self.message.edit_text(text, parse_mode=self.parse_mode)
+            self._shown_text = text
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+        finally:
+            self._last_edit = time.monotonic()
@@ -0,0 +1,161 @@
+import heapq
+import math
+import time
+from array import array
+
+# Уровни хранения: (разрешение в секундах, число точек).
+# 5 с × 720 = 1 час, 1 мин × 1440 = сутки, 15 мин × 2880 = 30 дней.
+HISTORY_TIERS = ((5, 720), (60, 1440), (900, 2880))
+HISTORY_METRICS = ("cpu", "ram", "disk", "swap", "net_sent", "net_recv", "battery")
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированного размера из пар (время, значение) на array('d')."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, value: float) -> None:
+        self.timestamps[self._head] = timestamp
+        self.values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def last_timestamp(self) -> float | None:
+        if not self._count:
+            return None
+        return self.timestamps[(self._head - 1) % self.capacity]
+
+    def points_since(self, since: float) -> tuple[list[float], list[float]]:
+        """Точки не старше since в хронологическом порядке. Время — O(размер окна)."""
+        timestamps = []
+        values = []
+        for offset in range(1, self._count + 1):
+            index = (self._head - offset) % self.capacity
+            if self.timestamps[index] < since:
+                break
+            timestamps.append(self.timestamps[index])
+            values.append(self.values[index])
+        timestamps.reverse()
+        values.reverse()
+        return timestamps, values
+
+
+class MetricSeries:
+    """
+    Временной ряд одной метрики на нескольких уровнях разрешения.
+    Сырые замеры пишутся в самый подробный уровень, а для грубых уровней
+    копятся средние по корзинам их разрешения.
+    """
+
+    def __init__(self, tiers=HISTORY_TIERS):
+        self.tiers = [
+            (resolution, RingBuffer(capacity)) for resolution, capacity in tiers
+        ]
+        # Для каждого грубого уровня: [начало корзины, сумма, количество].
+        self._buckets = [[None, 0.0, 0] for _ in self.tiers[1:]]
+
+    def add(self, timestamp: float, value: float) -> None:
+        self.tiers[0][1].append(timestamp, value)
+        for (resolution, buffer), bucket in zip(self.tiers[1:], self._buckets):
+            start = timestamp - timestamp % resolution
+            if bucket[0] is not None and bucket[0] != start and bucket[2]:
+                buffer.append(bucket[0], bucket[1] / bucket[2])
+                bucket[1] = 0.0
+                bucket[2] = 0
+            bucket[0] = start
+            bucket[1] += value
+            bucket[2] += 1
+
+    def _tier_for(self, window: float) -> tuple[int, RingBuffer]:
+        """Самый подробный уровень, который покрывает окно целиком."""
+        for resolution, buffer in self.tiers:
+            if resolution * buffer.capacity >= window:
+                return resolution, buffer
+        return self.tiers[-1]
+
+    def points(self, window: float, now: float | None = None):
+        """Возвращает (разрешение, времена, значения) за последние window секунд."""
+        now = time.time() if now is None else now
+        resolution, buffer = self._tier_for(window)
+        timestamps, values = buffer.points_since(now - window)
+        return resolution, timestamps, values
+
+    def last_timestamp(self, window: float = 0) -> float | None:
+        """Время последней точки на уровне, который обслуживает окно window."""
+        return self._tier_for(window)[1].last_timestamp()
+
+
+def summarize(values: list[float]) -> dict | None:
+    """
+    min/avg/max/p95 по списку значений. p95 — по методу ближайшего ранга
+    (элемент с номером ceil(0,95·n) по возрастанию), через частичную кучу
+    без полной сортировки.
+    """
+    if not values:
+        return None
+    count = len(values)
+    rank = math.ceil(count * 0.95)
+    top = heapq.nlargest(count - rank + 1, values)
+    return {
+        "count": count,
+        "min": min(values),
+        "avg": sum(values) / count,
+        "max": top[0],
+        "p95": top[-1],
+    }
+
+
+class MetricsHistory:
+    """Набор временных рядов системных метрик. Объём памяти не растёт со временем работы."""
+
+    def __init__(self, metrics=HISTORY_METRICS, tiers=HISTORY_TIERS):
+        self.series = {metric: MetricSeries(tiers) for metric in metrics}
+        self._last_net = None
+
+    def record(self, snapshot: dict) -> None:
+        """Добавляет в историю значения из снимка metrics_sampler."""
+        timestamp = snapshot["timestamp"]
+        self.series["cpu"].add(timestamp, snapshot["cpu_percent"])
+        self.series["ram"].add(timestamp, snapshot["virtual_memory"].percent)
+        self.series["disk"].add(timestamp, snapshot["disk_usage"].percent)
+        self.series["swap"].add(timestamp, snapshot["swap_memory"].percent)
+
+        net_io = snapshot.get("net_io")
+        if net_io is not None:
+            if self._last_net is not None and timestamp > self._last_net[0]:
+                elapsed = timestamp - self._last_net[0]
+                sent = max(0, net_io.bytes_sent - self._last_net[1].bytes_sent)
+                recv = max(0, net_io.bytes_recv - self._last_net[1].bytes_recv)
+                self.series["net_sent"].add(timestamp, sent / elapsed)
+                self.series["net_recv"].add(timestamp, recv / elapsed)
+            self._last_net = (timestamp, net_io)
+
+        # Между опросами батареи в снимке повторяется прошлое показание — его не пишем.
+        battery = snapshot.get("battery")
+        if battery is not None and snapshot.get("battery_fresh", True):
+            self.series["battery"].add(timestamp, battery.percent)
+
+    def query(
+        self, metric: str, window: float, now: float | None = None
+    ) -> dict | None:
+        """Статистика min/avg/max/p95 метрики за последние window секунд."""
+        _, _, values = self.series[metric].points(window, now)
+        return summarize(values)
+
+    def points(self, metric: str, window: float, now: float | None = None):
+        """Точки метрики за окно: (разрешение, времена, значения)."""
+        return self.series[metric].points(window, now)
+
+    def last_timestamp(self, metric: str, window: float = 0) -> float | None:
+        return self.series[metric].last_timestamp(window)
+
+
+metrics_history = MetricsHistory()
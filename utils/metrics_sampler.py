@@ -0,0 +1,82 @@
+import logging
+import time
+import psutil
+from telegram.ext import ContextTypes
+from utils.alert_rules import process_alerts
+from utils.battery_monitor import battery_monitor
+from utils.executor import run_blocking
+from utils.metrics_history import metrics_history
+
+logger = logging.getLogger(__name__)
+
+# Интервал фонового опроса системных метрик (в секундах).
+SAMPLE_INTERVAL = 5
+SAMPLER_JOB_NAME = "metrics_sampler"
+
+_latest_snapshot = None
+
+
+def prime_cpu_counter() -> None:
+    """Первый неблокирующий вызов cpu_percent, чтобы следующий замер был осмысленным."""
+    psutil.cpu_percent(interval=None)
+
+
+def _max_temperature() -> float | None:
+    """Максимальная температура среди датчиков; None, если датчики недоступны (Windows)."""
+    if not hasattr(psutil, "sensors_temperatures"):
+        return None
+    try:
+        sensors = psutil.sensors_temperatures()
+    except OSError:
+        return None
+    values = [t.current for entries in sensors.values() for t in entries if t.current]
+    return max(values) if values else None
+
+
+def collect_system_metrics() -> dict:
+    """
+    Снимает текущие показатели CPU, памяти, диска, подкачки, сети, батареи
+    и температуры без ожидания.
+    """
+    timestamp = time.time()
+    # Батарея опрашивается с адаптивным интервалом, между опросами — прошлое показание.
+    battery, battery_fresh = battery_monitor.read(timestamp)
+    return {
+        "timestamp": timestamp,
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "virtual_memory": psutil.virtual_memory(),
+        "swap_memory": psutil.swap_memory(),
+        "disk_usage": psutil.disk_usage("/"),
+        "net_io": psutil.net_io_counters(),
+        "battery": battery,
+        "battery_fresh": battery_fresh,
+        "temperature": _max_temperature(),
+    }
+
+
+async def sample_system_metrics(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Задача JobQueue: обновляет общий снимок системных метрик, пишет его в историю
+    и проверяет по нему правила оповещений.
+    """
+    global _latest_snapshot
+    try:
+        _latest_snapshot = await run_blocking(collect_system_metrics)
+        metrics_history.record(_latest_snapshot)
+    except Exception as e:
+        logger.error(f"Ошибка при сборе системных метрик: {e}")
+        return
+    try:
+        await process_alerts(context, _latest_snapshot)
+    except Exception as e:
+        logger.error(f"Ошибка при проверке правил оповещений: {e}")
+
+
+def get_latest_snapshot() -> dict | None:
+    """Возвращает последний снимок метрик или None, если замеров ещё не было."""
+    return _latest_snapshot
+
+
+def snapshot_age(snapshot: dict) -> float:
+    """Возраст снимка в секундах."""
+    return max(0.0, time.time() - snapshot["timestamp"])
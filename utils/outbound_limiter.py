@@ -0,0 +1,273 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты исходящих запросов: меньше — раньше.
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_PROGRESS = 2
+
+# Лимиты Telegram: около 30 сообщений в секунду на бота, около одного в секунду
+# в личный чат (с небольшим запасом на всплеск) и 20 в минуту в группу.
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+PRIVATE_CHAT_RATE = 1
+PRIVATE_CHAT_BURST = 3
+GROUP_CHAT_RATE = 20 / 60
+GROUP_CHAT_BURST = 5
+# Сколько раз повторять запрос после 429 (RetryAfter).
+MAX_RETRIES = 3
+
+# Правки одного сообщения (и индикатор набора) — прогресс: в очереди остаётся
+# только последняя версия, промежуточные не отправляются.
+PROGRESS_ENDPOINTS = {
+    "editMessageText",
+    "editMessageCaption",
+    "editMessageMedia",
+    "editMessageReplyMarkup",
+    "sendChatAction",
+}
+# Ответ на нажатие кнопки должен уйти сразу и в лимиты сообщений не входит.
+UNLIMITED_ENDPOINTS = {"answerCallbackQuery", "getMe", "deleteWebhook", "close"}
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько секунд ждать до свободного токена (0 — можно отправлять)."""
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float, now: float) -> None:
+        """Останавливает выдачу токенов (после RetryAfter)."""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+
+
+class _Request:
+    __slots__ = ("priority", "seq", "chat_id", "key", "call", "futures", "retries")
+
+    def __init__(self, priority, seq, chat_id, key, call, future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.key = key
+        self.call = call
+        self.futures = [future]
+        self.retries = 0
+
+    def __lt__(self, other: "_Request") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundRateLimiter(BaseRateLimiter[dict]):
+    """
+    Единая очередь исходящих запросов к Bot API (подключается через
+    Application.builder().rate_limiter). Запросы ждут токена в общей корзине
+    и в корзине своего чата; из готовых первым уходит запрос с высшим
+    приоритетом, так что оповещения обгоняют прогресс. Правки одного сообщения
+    объединяются, после RetryAfter чат (или весь бот) ставится на паузу,
+    а запрос повторяется. Приоритет можно задать явно:
+    bot.send_message(..., rate_limit_args={"priority": PRIORITY_CRITICAL}).
+    """
+
+    def __init__(self):
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chats = {}
+        self._queue = []
+        self._by_key = {}
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self._running = set()
+        self.stats = {
+            "sent": 0,
+            "coalesced": 0,
+            "retried": 0,
+            "max_queue": 0,
+            "waited": 0.0,
+        }
+
+    async def initialize(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for request in self._queue:
+            for future in request.futures:
+                if not future.done():
+                    future.cancel()
+        self._queue.clear()
+        self._by_key.clear()
+        logger.info(f"Очередь исходящих сообщений остановлена: {self.stats}")
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = self._chats[chat_id] = (
+                TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+                if is_group
+                else TokenBucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST)
+            )
+        return bucket
+
+    def _buckets(self, chat_id) -> list[TokenBucket]:
+        if chat_id is None:
+            return [self._global]
+        return [self._global, self._chat_bucket(chat_id)]
+
+    def _enqueue(self, request: _Request) -> None:
+        bisect.insort(self._queue, request)
+        if request.key is not None:
+            self._by_key[request.key] = request
+        self.stats["max_queue"] = max(self.stats["max_queue"], len(self._queue))
+        self._wakeup.set()
+
+    async def process_request(
+        self, callback, args, kwargs, endpoint, data, rate_limit_args
+    ):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+        if self._dispatcher is None:
+            await self.initialize()
+
+        default = (
+            PRIORITY_PROGRESS if endpoint in PROGRESS_ENDPOINTS else PRIORITY_NORMAL
+        )
+        priority = (rate_limit_args or {}).get("priority", default)
+        chat_id = data.get("chat_id")
+        key = None
+        if endpoint in PROGRESS_ENDPOINTS and priority == PRIORITY_PROGRESS:
+            key = (
+                endpoint,
+                chat_id,
+                data.get("message_id"),
+                data.get("inline_message_id"),
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        call = (callback, args, kwargs)
+        pending = self._by_key.get(key) if key is not None else None
+        if pending is not None:
+            # Более свежая правка того же сообщения заменяет ждущую в очереди.
+            pending.call = call
+            pending.futures.append(future)
+            self.stats["coalesced"] += 1
+        else:
+            self._enqueue(
+                _Request(priority, next(self._seq), chat_id, key, call, future)
+            )
+        started = time.monotonic()
+        try:
+            return await future
+        finally:
+            self.stats["waited"] += time.monotonic() - started
+
+    async def _dispatch(self) -> None:
+        while True:
+            now = time.monotonic()
+            ready = None
+            sleep = None
+            for request in self._queue:
+                wait = max(b.wait_time(now) for b in self._buckets(request.chat_id))
+                if wait == 0:
+                    ready = request
+                    break
+                sleep = wait if sleep is None else min(sleep, wait)
+
+            if ready is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=sleep)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._queue.remove(ready)
+            if self._by_key.get(ready.key) is ready:
+                del self._by_key[ready.key]
+            for bucket in self._buckets(ready.chat_id):
+                bucket.take(now)
+            task = asyncio.create_task(self._send(ready))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _send(self, request: _Request) -> None:
+        callback, args, kwargs = request.call
+        try:
+            result = await callback(*args, **kwargs)
+        except RetryAfter as e:
+            retry_after = float(e.retry_after)
+            now = time.monotonic()
+            bucket = (
+                self._global
+                if request.chat_id is None
+                else self._chat_bucket(request.chat_id)
+            )
+            bucket.pause(retry_after, now)
+            logger.warning(
+                f"Telegram просит подождать {retry_after:.0f} с (чат {request.chat_id})."
+            )
+            if request.retries < MAX_RETRIES:
+                request.retries += 1
+                self.stats["retried"] += 1
+                newer = self._by_key.get(request.key) if request.key else None
+                if newer is not None:
+                    # Пока ждали, пришла более свежая правка — повторять старую незачем.
+                    newer.futures.extend(request.futures)
+                    self.stats["coalesced"] += 1
+                else:
+                    self._enqueue(request)
+                return
+            self._resolve(request, error=e)
+            return
+        except Exception as e:
+            self._resolve(request, error=e)
+            return
+        self.stats["sent"] += 1
+        self._resolve(request, result=result)
+
+    @staticmethod
+    def _resolve(
+        request: _Request, result=None, error: Exception | None = None
+    ) -> None:
+        for future in request.futures:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,284 @@
+import bisect
+import difflib
+import logging
+import os
+import re
+import threading
+import time
+import psutil
+from telegram.ext import ContextTypes
+from utils.executor import run_blocking
+from utils.process_groups import build_columns
+
+logger = logging.getLogger(__name__)
+
+# Интервал фонового обновления таблицы процессов (в секундах).
+PROCESS_REFRESH_INTERVAL = 5
+PROCESS_JOB_NAME = "process_table_refresh"
+# Режимы поиска процесса по имени и порог похожести для нечёткого поиска.
+MATCH_MODES = ("auto", "exact", "prefix", "substring", "regex", "fuzzy")
+FUZZY_CUTOFF = 0.6
+
+
+def _build_name_index(rows: list[dict]) -> dict[str, list[dict]]:
+    """
+    Индекс имя -> процессы. Имя хранится в нижнем регистре, а также без
+    расширения ('chrome.exe' ищется и как 'chrome').
+    """
+    index = {}
+    for row in rows:
+        name = row["name"].lower()
+        keys = {name, os.path.splitext(name)[0]}
+        for key in keys:
+            if key:
+                index.setdefault(key, []).append(row)
+    return index
+
+
+class ProcessSnapshot:
+    """
+    Опубликованное состояние таблицы: строки и все индексы одного поколения.
+    Заменяется целиком одним присваиванием и после публикации не меняется.
+    """
+
+    __slots__ = ("rows", "by_pid", "by_name", "names", "columns", "updated_at")
+
+    def __init__(self, rows: list[dict], updated_at: float | None):
+        self.rows = rows
+        self.by_pid = {row["pid"]: row for row in rows}
+        self.by_name = _build_name_index(rows)
+        self.names = sorted(self.by_name)
+        self.columns = build_columns(rows)
+        self.updated_at = updated_at
+
+
+class ProcessTable:
+    """
+    Кэш таблицы процессов с инкрементальным обновлением.
+    Записи хранятся по ключу (pid, create_time), поэтому переиспользованный PID
+    считается новым процессом. Загрузка CPU считается по разнице cpu_times
+    между двумя обновлениями.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._refresh_lock = threading.Lock()
+        self._snapshot = ProcessSnapshot([], None)
+
+    @property
+    def updated_at(self) -> float | None:
+        return self._snapshot.updated_at
+
+    def refresh(self) -> bool:
+        """
+        Добавляет новые процессы, удаляет завершённые и пересчитывает CPU/RAM.
+        Если предыдущее обновление ещё идёт (медленный тик в пуле потоков),
+        ничего не делает и возвращает False: записи с cpu_time меняет только
+        один поток.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.debug("Обновление таблицы процессов ещё идёт, тик пропущен.")
+            return False
+        try:
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+        return True
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        total_memory = psutil.virtual_memory().total
+        known_by_pid = {key[0]: key for key in self._entries}
+        entries = {}
+
+        for pid in psutil.pids():
+            key = known_by_pid.get(pid)
+            entry = self._entries.get(key) if key else None
+            try:
+                if entry is not None and not self._update_entry(entry, now):
+                    # PID переиспользован другим процессом.
+                    entry = None
+                if entry is None:
+                    entry = self._new_entry(pid)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+
+            if entry["zombie"]:
+                continue
+            entry["memory_percent"] = entry["rss"] / total_memory * 100
+            entries[(entry["pid"], entry["create_time"])] = entry
+
+        self._entries = entries
+        rows = [self._public_row(entry) for entry in entries.values()]
+        self._snapshot = ProcessSnapshot(rows, time.time())
+
+    def _new_entry(self, pid: int) -> dict:
+        process = psutil.Process(pid)
+        entry = {
+            "pid": pid,
+            "process": process,
+            "create_time": 0.0,
+            "name": "",
+            "exe": "",
+            "ppid": 0,
+            "cpu_time": None,
+            "sampled_at": None,
+            "cpu_percent": 0.0,
+            "rss": 0,
+            "memory_percent": 0.0,
+            "threads": 0,
+            "handles": 0,
+            "zombie": False,
+        }
+        with process.oneshot():
+            try:
+                entry["create_time"] = process.create_time()
+            except psutil.AccessDenied:
+                pass
+            entry["name"] = process.name()
+            entry["ppid"] = process.ppid()
+            try:
+                entry["exe"] = process.exe()
+            except (psutil.AccessDenied, OSError):
+                pass
+        self._update_entry(entry, time.monotonic())
+        return entry
+
+    @staticmethod
+    def _update_entry(entry: dict, now: float) -> bool:
+        """Обновляет счётчики записи. Возвращает False, если PID уже принадлежит другому процессу."""
+        process = entry["process"]
+        with process.oneshot():
+            try:
+                if (
+                    entry["create_time"]
+                    and process.create_time() != entry["create_time"]
+                ):
+                    return False
+                entry["zombie"] = process.status() == psutil.STATUS_ZOMBIE
+                cpu_times = process.cpu_times()
+                entry["rss"] = process.memory_info().rss
+            except psutil.AccessDenied:
+                return True
+            try:
+                entry["threads"] = process.num_threads()
+                # На Windows считаются дескрипторы, на остальных системах — открытые fd.
+                entry["handles"] = (
+                    process.num_handles() if psutil.WINDOWS else process.num_fds()
+                )
+            except psutil.AccessDenied:
+                pass
+
+        cpu_time = cpu_times.user + cpu_times.system
+        if entry["cpu_time"] is not None and now > entry["sampled_at"]:
+            entry["cpu_percent"] = max(
+                0.0, (cpu_time - entry["cpu_time"]) / (now - entry["sampled_at"]) * 100
+            )
+        entry["cpu_time"] = cpu_time
+        entry["sampled_at"] = now
+        return True
+
+    @staticmethod
+    def _public_row(entry: dict) -> dict:
+        return {
+            "pid": entry["pid"],
+            "name": entry["name"],
+            "exe": entry["exe"],
+            "ppid": entry["ppid"],
+            "cpu_percent": entry["cpu_percent"],
+            "memory_percent": entry["memory_percent"],
+            "rss": entry["rss"],
+            "threads": entry["threads"],
+            "handles": entry["handles"],
+        }
+
+    def rows(self) -> list[dict]:
+        """Последний опубликованный список процессов."""
+        return self._snapshot.rows
+
+    def columns(self) -> dict:
+        """Последний опубликованный снимок таблицы в виде столбцов (см. build_columns)."""
+        return self._snapshot.columns
+
+    def get(self, pid: int) -> dict | None:
+        """Возвращает запись процесса по PID или None."""
+        return self._snapshot.by_pid.get(pid)
+
+    @staticmethod
+    def _collect(snapshot: ProcessSnapshot, names) -> list[dict]:
+        seen = set()
+        matches = []
+        for name in names:
+            for row in snapshot.by_name.get(name, ()):
+                if row["pid"] not in seen:
+                    seen.add(row["pid"])
+                    matches.append(row)
+        return matches
+
+    @staticmethod
+    def _prefix_names(snapshot: ProcessSnapshot, prefix: str) -> list[str]:
+        names = snapshot.names
+        start = bisect.bisect_left(names, prefix)
+        end = bisect.bisect_left(names, prefix + "\U0010ffff", start)
+        return names[start:end]
+
+    def find(self, query: str, mode: str = "auto") -> tuple[str, list[dict]]:
+        """
+        Ищет процессы по имени через индекс. Возвращает (применённый режим, процессы).
+        exact и prefix стоят O(log n + совпадения); regex и fuzzy проходят по
+        уникальным именам, а не по всем процессам. В режиме auto пробуются
+        по очереди точное совпадение, префикс, подстрока и нечёткий поиск,
+        в режиме strict — только точное совпадение и префикс.
+        Бросает ValueError при некорректном регулярном выражении.
+        """
+        # Весь поиск идёт по одному снимку, даже если таблицу тем временем обновили.
+        snapshot = self._snapshot
+        query = query.strip().lower()
+        if mode in ("auto", "strict"):
+            fallbacks = ("exact", "prefix")
+            if mode == "auto":
+                fallbacks += ("substring", "fuzzy")
+            for fallback in fallbacks:
+                matches = self._find(snapshot, query, fallback)
+                if matches:
+                    return fallback, matches
+            return mode, []
+        return mode, self._find(snapshot, query, mode)
+
+    def _find(self, snapshot: ProcessSnapshot, query: str, mode: str) -> list[dict]:
+        names = snapshot.names
+        if mode == "exact":
+            return self._collect(snapshot, [query])
+        if mode == "prefix":
+            return self._collect(snapshot, self._prefix_names(snapshot, query))
+        if mode == "substring":
+            return self._collect(snapshot, (n for n in names if query in n))
+        if mode == "regex":
+            try:
+                pattern = re.compile(query, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Некорректное регулярное выражение: {e}") from None
+            return self._collect(snapshot, (n for n in names if pattern.search(n)))
+        if mode == "fuzzy":
+            return self._collect(
+                snapshot,
+                difflib.get_close_matches(query, names, n=20, cutoff=FUZZY_CUTOFF),
+            )
+        raise ValueError(f"Неизвестный режим поиска: {mode}")
+
+    def age(self) -> float | None:
+        """Возраст данных в секундах или None, если таблица ещё не заполнялась."""
+        if self.updated_at is None:
+            return None
+        return max(0.0, time.time() - self.updated_at)
+
+
+process_table = ProcessTable()
+
+
+async def refresh_process_table(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: инкрементально обновляет кэш процессов."""
+    try:
+        await run_blocking(process_table.refresh)
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении таблицы процессов: {e}")
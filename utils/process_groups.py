@@ -0,0 +1,146 @@
+import os
+from array import array
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Способы группировки процессов в приложения и ключи сортировки групп.
+GROUP_MODES = ("exe", "tree")
+SORT_KEYS = {
+    "cpu": "cpu_percent",
+    "ram": "rss",
+    "threads": "threads",
+    "handles": "handles",
+    "count": "count",
+}
+# Суммируемые столбцы таблицы процессов.
+SUM_COLUMNS = ("cpu_percent", "rss", "threads", "handles")
+
+
+def _exe_key(row: dict) -> str:
+    return (row["exe"] or row["name"]).lower()
+
+
+def _label(row: dict) -> str:
+    return os.path.basename(row["exe"]) if row["exe"] else row["name"]
+
+
+def build_columns(rows: list[dict]) -> dict:
+    """
+    Столбцовое представление таблицы процессов для агрегации. Номера групп
+    считаются один раз при обновлении таблицы:
+    exe — по исполняемому файлу (или имени, если путь недоступен);
+    tree — по корню дерева: процесс поднимается к родителю, пока тот запущен
+    из того же файла, так что каждый экземпляр браузера — отдельная группа.
+    """
+    columns = {
+        "cpu_percent": array("d"),
+        "rss": array("q"),
+        "threads": array("q"),
+        "handles": array("q"),
+        "exe": {"ids": array("l"), "labels": []},
+        "tree": {"ids": array("l"), "labels": []},
+    }
+    by_pid = {row["pid"]: row for row in rows}
+    exe_ids = {}
+    root_ids = {}
+    roots = {}
+
+    def find_root(row: dict) -> dict:
+        # Итеративный подъём с запоминанием корней для всех пройденных процессов.
+        path = []
+        current = row
+        while current["pid"] not in roots:
+            path.append(current["pid"])
+            parent = by_pid.get(current["ppid"])
+            if (
+                parent is None
+                or parent["pid"] == current["pid"]
+                or parent["pid"] in path
+                or _exe_key(parent) != _exe_key(current)
+            ):
+                roots[current["pid"]] = current
+                break
+            current = parent
+        root = roots[current["pid"]]
+        for pid in path:
+            roots[pid] = root
+        return root
+
+    for row in rows:
+        for column in SUM_COLUMNS:
+            columns[column].append(row[column])
+
+        key = _exe_key(row)
+        if key not in exe_ids:
+            exe_ids[key] = len(exe_ids)
+            columns["exe"]["labels"].append(_label(row))
+        columns["exe"]["ids"].append(exe_ids[key])
+
+        root = find_root(row)
+        if root["pid"] not in root_ids:
+            root_ids[root["pid"]] = len(root_ids)
+            columns["tree"]["labels"].append(f"{_label(root)} ({root['pid']})")
+        columns["tree"]["ids"].append(root_ids[root["pid"]])
+
+    return columns
+
+
+def _sums_numpy(ids: array, columns: dict, groups: int) -> dict:
+    index = np.frombuffer(ids, dtype=np.dtype(ids.typecode))
+    sums = {"count": np.bincount(index, minlength=groups)}
+    for column in SUM_COLUMNS:
+        values = columns[column]
+        weights = np.frombuffer(values, dtype=np.dtype(values.typecode))
+        sums[column] = np.bincount(index, weights=weights, minlength=groups)
+    return {key: values.tolist() for key, values in sums.items()}
+
+
+def _sums_python(ids: array, columns: dict, groups: int) -> dict:
+    sums = {"count": [0] * groups}
+    for group in ids:
+        sums["count"][group] += 1
+    for column in SUM_COLUMNS:
+        totals = [0] * groups
+        for group, value in zip(ids, columns[column]):
+            totals[group] += value
+        sums[column] = totals
+    return sums
+
+
+def aggregate_processes(
+    columns: dict, by: str = "exe", sort: str = "cpu"
+) -> list[dict]:
+    """
+    Суммирует CPU, RSS, потоки и дескрипторы по группам. С numpy — через
+    bincount по столбцам, без него — проходом по массивам. Возвращает группы,
+    отсортированные по ключу sort (по убыванию).
+    """
+    ids = columns[by]["ids"]
+    labels = columns[by]["labels"]
+    groups = len(labels)
+    if not groups:
+        return []
+    if NUMPY_AVAILABLE:
+        sums = _sums_numpy(ids, columns, groups)
+    else:
+        sums = _sums_python(ids, columns, groups)
+
+    result = [
+        {
+            "name": labels[group],
+            "count": int(sums["count"][group]),
+            "cpu_percent": float(sums["cpu_percent"][group]),
+            "rss": int(sums["rss"][group]),
+            "threads": int(sums["threads"][group]),
+            "handles": int(sums["handles"][group]),
+        }
+        for group in range(groups)
+    ]
+    key = SORT_KEYS[sort]
+    result.sort(key=lambda group: group[key], reverse=True)
+    return result
@@ -0,0 +1,138 @@
+import logging
+import os
+import time
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Общий срок ожидания завершения всех процессов после terminate() и после kill().
+KILL_TERMINATE_TIMEOUT = 3
+KILL_FORCE_TIMEOUT = 2
+
+
+def _target(process: psutil.Process) -> tuple[int, float, str] | None:
+    try:
+        with process.oneshot():
+            return process.pid, process.create_time(), process.name()
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        return process.pid, 0.0, "?"
+
+
+def collect_targets(pids: list[int], tree: bool = False) -> tuple[list[tuple], int]:
+    """
+    Собирает цели для завершения: (pid, create_time, имя). При tree добавляются
+    все потомки каждого процесса. Сам бот в список не попадает.
+    Возвращает (цели, число PID, которых уже нет). Выполняется в пуле потоков.
+    """
+    own_pid = os.getpid()
+    targets = {}
+    missing = 0
+    for pid in pids:
+        try:
+            process = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            missing += 1
+            continue
+        processes = [process]
+        if tree:
+            try:
+                processes.extend(process.children(recursive=True))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        for item in processes:
+            if item.pid == own_pid or item.pid in targets:
+                continue
+            target = _target(item)
+            if target is not None:
+                targets[item.pid] = target
+    return list(targets.values()), missing
+
+
+def _alive(target: tuple) -> psutil.Process | None:
+    """Процесс цели, если он ещё жив и PID не переиспользован другим процессом."""
+    pid, create_time, _ = target
+    try:
+        process = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return None
+    try:
+        if create_time and process.create_time() != create_time:
+            return None
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        pass
+    return process
+
+
+def terminate_processes(
+    targets: list[tuple],
+    timeout: float = KILL_TERMINATE_TIMEOUT,
+    force_timeout: float = KILL_FORCE_TIMEOUT,
+) -> dict:
+    """
+    Завершает все цели разом: terminate() всем, общее ожидание через
+    psutil.wait_procs, затем kill() только тем, кто не успел.
+    Выполняется в пуле потоков. Возвращает счётчики и имена оставшихся процессов.
+    """
+    result = {
+        "terminated": 0,
+        "killed": 0,
+        "gone": 0,
+        "denied": 0,
+        "survived": 0,
+        "survivors": [],
+        "elapsed": 0.0,
+    }
+    started = time.monotonic()
+
+    processes = []
+    for target in targets:
+        process = _alive(target)
+        if process is None:
+            result["gone"] += 1
+            continue
+        try:
+            process.terminate()
+        except psutil.NoSuchProcess:
+            result["gone"] += 1
+            continue
+        except psutil.AccessDenied:
+            result["denied"] += 1
+            continue
+        processes.append(process)
+
+    gone, alive = psutil.wait_procs(processes, timeout=timeout)
+    result["terminated"] = len(gone)
+
+    stragglers = []
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            result["terminated"] += 1
+            continue
+        except psutil.AccessDenied:
+            result["denied"] += 1
+            continue
+        stragglers.append(process)
+
+    if stragglers:
+        gone, alive = psutil.wait_procs(stragglers, timeout=force_timeout)
+        result["killed"] = len(gone)
+        result["survived"] = len(alive)
+        for process in alive:
+            try:
+                result["survivors"].append(f"{process.name()} ({process.pid})")
+            except psutil.Error:
+                result["survivors"].append(str(process.pid))
+
+    result["elapsed"] = time.monotonic() - started
+    logger.info(
+        f"Завершение процессов: целей {len(targets)}, завершено {result['terminated']}, "
+        f"принудительно {result['killed']}, уже не было {result['gone']}, "
+        f"нет доступа {result['denied']}, осталось {result['survived']}"
+    )
+    return result
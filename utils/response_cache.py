@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import BOT_STATE_FILE
+
+logger = logging.getLogger(__name__)
+
+# Файл дискового уровня кэша лежит рядом с файлом состояния бота.
+RESPONSE_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(BOT_STATE_FILE)), "ai_response_cache.sqlite3"
+)
+# Время жизни ответа в кэше (в секундах) и ограничения размера уровней.
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MEMORY_ITEMS = 128
+RESPONSE_CACHE_DISK_ITEMS = 2000
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Приводит запрос к каноническому виду: нижний регистр, схлопнутые пробелы."""
+    return " ".join(prompt.lower().split())
+
+
+def make_cache_key(
+    prompt: str, model: str, temperature: float, context: str = ""
+) -> str:
+    """Ключ кэша из нормализованного запроса, модели, температуры и контекста диалога."""
+    raw = "\0".join((model, f"{temperature:.3f}", context, normalize_prompt(prompt)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Двухуровневый кэш ответов ИИ: LRU в памяти и SQLite-файл на диске,
+    переживающий перезапуски. У каждой записи есть срок жизни (TTL).
+    Методы синхронные — из обработчиков их следует вызывать через run_blocking.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_FILE,
+        ttl: float = RESPONSE_CACHE_TTL,
+        memory_items: int = RESPONSE_CACHE_MEMORY_ITEMS,
+        disk_items: int = RESPONSE_CACHE_DISK_ITEMS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str) -> str | None:
+        """Возвращает ответ из кэша или None при промахе/истёкшем сроке."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                response, created_at = cached
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            try:
+                db = self._db()
+                row = db.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    db.execute(
+                        "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+                if row is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка чтения кэша ответов {self.path}: {e}")
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """Сохраняет ответ в оба уровня кэша и вытесняет самые старые записи."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                db.execute(
+                    "DELETE FROM responses WHERE created_at < ? OR key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (now - self.ttl, self.disk_items),
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка записи в кэш ответов {self.path}: {e}")
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def summary(self) -> dict:
+        """Счётчики попаданий/промахов и текущие размеры уровней."""
+        with self._lock:
+            try:
+                disk_size = (
+                    self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                )
+            except sqlite3.Error:
+                disk_size = None
+            return dict(self.stats, memory_size=len(self._memory), disk_size=disk_size)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,231 @@
+import ctypes
+import io
+import platform
+import time
+from ctypes import wintypes
+
+# Модуль выполняется в пуле процессов: захват и кодирование происходят в дочернем
+# процессе, и в основной процесс возвращаются только готовые байты изображения.
+try:
+    from PIL import Image
+
+    ENCODING_AVAILABLE = True
+except ImportError:
+    ENCODING_AVAILABLE = False
+
+try:
+    import pyautogui
+
+    PYAUTOGUI_AVAILABLE = True
+except ImportError:
+    PYAUTOGUI_AVAILABLE = False
+
+# mss захватывает отдельный монитор или область напрямую, не снимая весь
+# виртуальный рабочий стол; без него используется pyautogui.
+try:
+    import mss
+
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+CAPTURE_AVAILABLE = ENCODING_AVAILABLE and (PYAUTOGUI_AVAILABLE or MSS_AVAILABLE)
+
+# Поддерживаемые форматы: имя -> (формат Pillow, расширение файла).
+IMAGE_FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+    "png": ("PNG", "png"),
+}
+
+# Отпечаток кадра для поиска изменений: уменьшенная копия в оттенках серого.
+# Ячейка считается изменившейся, если её яркость сдвинулась больше порога.
+FINGERPRINT_SIZE = (64, 36)
+FINGERPRINT_PIXEL_THRESHOLD = 12
+
+
+def encode_image(
+    image, fmt: str, quality: int | None = None, max_edge: int | None = None
+) -> bytes:
+    """
+    Кодирует изображение в байты. max_edge уменьшает длинную сторону
+    до указанного размера, quality применяется к JPEG/WebP.
+    """
+    if max_edge and max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    pil_format, _ = IMAGE_FORMATS[fmt]
+    buffer = io.BytesIO()
+    if pil_format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=quality or 80, optimize=True)
+    elif pil_format == "WEBP":
+        image.save(buffer, "WEBP", quality=quality or 80, method=4)
+    else:
+        image.save(buffer, "PNG", compress_level=6)
+    return buffer.getvalue()
+
+
+def list_monitors() -> list[dict]:
+    """
+    Мониторы в формате mss: left/top/width/height, нумерация с 1.
+    Без mss доступен только основной монитор.
+    """
+    if MSS_AVAILABLE:
+        with mss.mss() as sct:
+            return [dict(monitor) for monitor in sct.monitors[1:]]
+    width, height = pyautogui.size()
+    return [{"left": 0, "top": 0, "width": width, "height": height}]
+
+
+def foreground_window_region() -> tuple[int, int, int, int]:
+    """Прямоугольник активного окна (left, top, width, height). Только Windows."""
+    if platform.system() != "Windows":
+        raise ValueError("Снимок активного окна доступен только в Windows.")
+
+    user32 = ctypes.WinDLL("user32")
+    try:
+        # Без этого в Windows с масштабированием координаты окна будут логическими.
+        user32.SetProcessDPIAware()
+    except AttributeError:
+        pass
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd:
+        raise ValueError("Не удалось определить активное окно.")
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        raise ValueError("Не удалось получить размеры активного окна.")
+    width = rect.right - rect.left
+    height = rect.bottom - rect.top
+    if width <= 0 or height <= 0:
+        raise ValueError("Активное окно свёрнуто или имеет нулевой размер.")
+    return rect.left, rect.top, width, height
+
+
+def resolve_region(target: dict | None) -> tuple[int, int, int, int] | None:
+    """
+    Переводит цель захвата в прямоугольник экрана. None — весь рабочий стол.
+    target: {"monitor": N}, {"region": (left, top, width, height)} или {"window": True}.
+    """
+    if not target:
+        return None
+    if "window" in target:
+        return foreground_window_region()
+    if "monitor" in target:
+        monitors = list_monitors()
+        index = target["monitor"]
+        if not 1 <= index <= len(monitors):
+            raise ValueError(
+                f"Монитор {index} не найден, доступно мониторов: {len(monitors)}."
+            )
+        monitor = monitors[index - 1]
+        return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+    return tuple(target["region"])
+
+
+def capture_screen(target: dict | None = None):
+    """
+    Снимает экран и возвращает изображение Pillow. Если задана цель, захватывается
+    только её прямоугольник, а не весь виртуальный рабочий стол.
+    """
+    region = resolve_region(target)
+    if MSS_AVAILABLE:
+        with mss.mss() as sct:
+            if region is None:
+                area = sct.monitors[0]
+            else:
+                left, top, width, height = region
+                area = {"left": left, "top": top, "width": width, "height": height}
+            shot = sct.grab(area)
+            return Image.frombytes("RGB", shot.size, shot.rgb)
+    if region is None:
+        return pyautogui.screenshot()
+    return pyautogui.screenshot(region=region)
+
+
+def capture_and_encode(
+    fmt: str,
+    quality: int | None = None,
+    max_edge: int | None = None,
+    target: dict | None = None,
+) -> dict:
+    """
+    Делает скриншот и сразу кодирует его в памяти, без временных файлов.
+    Возвращает байты, итоговый размер и длительность этапов захвата и кодирования.
+    """
+    started = time.perf_counter()
+    image = capture_screen(target)
+    captured = time.perf_counter()
+    data = encode_image(image, fmt, quality, max_edge)
+    encoded = time.perf_counter()
+    return {
+        "data": data,
+        "size": image.size,
+        "capture_time": captured - started,
+        "encode_time": encoded - captured,
+    }
+
+
+def fingerprint(image) -> bytes:
+    """Отпечаток кадра: байты яркости уменьшенной серой копии изображения."""
+    return image.convert("L").resize(FINGERPRINT_SIZE, Image.BILINEAR).tobytes()
+
+
+def frame_difference(previous: bytes | None, current: bytes) -> float:
+    """Доля ячеек отпечатка, изменившихся заметнее порога (0.0–1.0)."""
+    if previous is None or len(previous) != len(current):
+        return 1.0
+    changed = sum(
+        1
+        for old, new in zip(previous, current)
+        if abs(old - new) > FINGERPRINT_PIXEL_THRESHOLD
+    )
+    return changed / len(current)
+
+
+def capture_if_changed(
+    previous_fingerprint: bytes | None,
+    min_change: float,
+    fmt: str,
+    quality: int | None = None,
+    max_edge: int | None = None,
+    target: dict | None = None,
+) -> dict:
+    """
+    Снимает экран и кодирует кадр, только если он заметно отличается от
+    предыдущего отправленного. Без изменений data равно None, и время на
+    кодирование не тратится.
+    """
+    started = time.perf_counter()
+    image = capture_screen(target)
+    current = fingerprint(image)
+    difference = frame_difference(previous_fingerprint, current)
+    result = {
+        "data": None,
+        "fingerprint": current,
+        "difference": difference,
+        "changed": difference >= min_change,
+        "size": image.size,
+    }
+    if result["changed"]:
+        result["data"] = encode_image(image, fmt, quality, max_edge)
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+def capture_video_frame(
+    quality: int,
+    max_edge: int | None = None,
+    target: dict | None = None,
+    frame_size: tuple[int, int] | None = None,
+) -> dict:
+    """
+    Кадр для записи экрана в JPEG. Все кадры видео должны быть одного размера:
+    первый кадр задаёт frame_size, следующие приводятся к нему.
+    """
+    image = capture_screen(target)
+    if frame_size is None:
+        if max_edge and max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    elif image.size != tuple(frame_size):
+        image = image.resize(tuple(frame_size), Image.BILINEAR)
+    return {"data": encode_image(image, "jpeg", quality), "size": image.size}
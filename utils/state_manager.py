@@ -1,41 +1,272 @@
 import json
 import os
 import logging
+import sqlite3
+import threading
+import time
+from telegram.ext import ContextTypes
 from config import BOT_STATE_FILE
+from utils.executor import run_blocking
 
 logger = logging.getLogger(__name__)
 
+# Состояние хранится в SQLite (режим WAL) рядом со старым JSON-файлом,
+# который используется только для однократного импорта.
+STATE_DB_FILE = os.path.splitext(BOT_STATE_FILE)[0] + ".sqlite3"
 
-def load_bot_state() -> dict:
-    """Загружает состояние бота из JSON-файла."""
-    if os.path.exists(BOT_STATE_FILE):
+# Типизированные настройки, которые сохраняются между перезапусками,
+# и их значения по умолчанию.
+DEFAULT_SETTINGS = {
+    "battery_monitoring_enabled": False,
+    "alerts_enabled": False,
+    "alert_chat_id": None,
+    # Состояния правил оповещений (utils.alert_rules): активность и время оповещения.
+    "alert_states": {},
+}
+DEFAULT_BOT_STATE = dict(DEFAULT_SETTINGS)
+PERSISTENT_KEYS = tuple(DEFAULT_BOT_STATE)
+
+# Отложенная запись: изменения копятся и сбрасываются на диск не чаще раза в N секунд.
+STATE_FLUSH_INTERVAL = 10
+STATE_FLUSH_JOB_NAME = "bot_state_flush"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+-- Флаги battery_*_notified заменены состояниями правил в alert_states.
+DROP TABLE IF EXISTS notification_flags;
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    callback TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('once', 'repeating')),
+    chat_id INTEGER,
+    user_id INTEGER,
+    interval REAL,
+    run_at REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_callback ON jobs (callback);
+"""
+
+_state_dirty = False
+_connection = None
+_db_lock = threading.RLock()
+
+
+def _db() -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(
+            STATE_DB_FILE, check_same_thread=False, isolation_level=None
+        )
+        _connection.row_factory = sqlite3.Row
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.executescript(_SCHEMA)
+        logger.info(f"База состояния бота открыта: {STATE_DB_FILE}")
+    return _connection
+
+
+class _transaction:
+    """Контекстный менеджер транзакции SQLite под общей блокировкой."""
+
+    def __enter__(self) -> sqlite3.Connection:
+        _db_lock.acquire()
+        try:
+            self.db = _db()
+            self.db.execute("BEGIN IMMEDIATE")
+        except Exception:
+            _db_lock.release()
+            raise
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
         try:
-            with open(BOT_STATE_FILE, "r", encoding="utf-8") as f:
-                state = json.load(f)
-                logger.info(f"Состояние бота загружено из {BOT_STATE_FILE}: {state}")
-                return state
-        except json.JSONDecodeError as e:
-            logger.error(f"Ошибка декодирования JSON из {BOT_STATE_FILE}: {e}")
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке состояния бота из {BOT_STATE_FILE}: {e}")
-    else:
-        logger.info(
-            f"Файл состояния бота {BOT_STATE_FILE} не найден. Создаю пустое состояние."
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            _db_lock.release()
+        return False
+
+
+def _encode_setting(value) -> tuple[str, str]:
+    if isinstance(value, bool):
+        return "bool", "1" if value else "0"
+    if isinstance(value, int):
+        return "int", str(value)
+    if isinstance(value, float):
+        return "float", repr(value)
+    if isinstance(value, str):
+        return "str", value
+    return "json", json.dumps(value, ensure_ascii=False)
+
+
+def _decode_setting(value_type: str, value: str):
+    if value_type == "bool":
+        return value == "1"
+    if value_type == "int":
+        return int(value)
+    if value_type == "float":
+        return float(value)
+    if value_type == "str":
+        return value
+    return json.loads(value)
+
+
+def _import_legacy_json() -> dict:
+    """Читает старый bot_state.json, если база ещё пуста."""
+    if not os.path.exists(BOT_STATE_FILE):
+        return {}
+    try:
+        with open(BOT_STATE_FILE, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        logger.info(f"Импортирую состояние из {BOT_STATE_FILE} в {STATE_DB_FILE}")
+        return {k: v for k, v in legacy.items() if k in PERSISTENT_KEYS}
+    except Exception as e:
+        logger.error(f"Ошибка при импорте состояния из {BOT_STATE_FILE}: {e}")
+        return {}
+
+
+def load_bot_state() -> dict:
+    """Загружает настройки из базы состояния."""
+    state = dict(DEFAULT_BOT_STATE)
+    try:
+        with _db_lock:
+            db = _db()
+            settings = db.execute("SELECT key, type, value FROM settings").fetchall()
+
+        if not settings:
+            legacy = _import_legacy_json()
+            if legacy:
+                state.update(legacy)
+                _write_state(state)
+        else:
+            for row in settings:
+                state[row["key"]] = _decode_setting(row["type"], row["value"])
+        logger.info(f"Состояние бота загружено из {STATE_DB_FILE}: {state}")
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке состояния бота из {STATE_DB_FILE}: {e}")
+    return state
+
+
+def _persistent_subset(state: dict) -> dict:
+    return {key: state[key] for key in PERSISTENT_KEYS if key in state}
+
+
+def _write_state(state: dict) -> None:
+    """Записывает объявленные настройки одной транзакцией."""
+    now = time.time()
+    settings = [
+        (key, *_encode_setting(value), now)
+        for key, value in _persistent_subset(state).items()
+    ]
+
+    with _transaction() as db:
+        db.executemany(
+            "INSERT INTO settings (key, type, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET type = excluded.type, "
+            "value = excluded.value, updated_at = excluded.updated_at",
+            settings,
         )
-    return {
-        "battery_monitoring_enabled": False,
-        "battery_low_notified": False,
-        "battery_full_notified": False,
-        "battery_unavailable_notified": False,
-        "battery_check_error_notified": False,
-    }
 
 
 def save_bot_state(state: dict):
-    """Сохраняет состояние бота в JSON-файл."""
+    """Немедленно сохраняет объявленные ключи состояния в базу."""
+    global _state_dirty
+    try:
+        _write_state(state)
+        _state_dirty = False
+        logger.info(f"Состояние бота сохранено в {STATE_DB_FILE}")
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении состояния бота в {STATE_DB_FILE}: {e}")
+
+
+def mark_state_dirty() -> None:
+    """Помечает состояние изменённым; запись выполнит фоновая задача flush_bot_state."""
+    global _state_dirty
+    _state_dirty = True
+
+
+async def flush_bot_state(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Задача JobQueue: сбрасывает накопленные изменения состояния на диск."""
+    global _state_dirty
+    if not _state_dirty:
+        return
+    _state_dirty = False
+    snapshot = _persistent_subset(context.bot_data)
     try:
-        with open(BOT_STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(state, f, indent=4, ensure_ascii=False)
-        logger.info(f"Состояние бота сохранено в {BOT_STATE_FILE}")
+        await run_blocking(_write_state, snapshot)
+        logger.info(f"Состояние бота сохранено в {STATE_DB_FILE}")
     except Exception as e:
-        logger.error(f"Ошибка при сохранении состояния бота в {BOT_STATE_FILE}: {e}")
+        _state_dirty = True
+        logger.error(f"Ошибка при сохранении состояния бота в {STATE_DB_FILE}: {e}")
+
+
+def flush_pending_state(state: dict) -> None:
+    """Принудительная запись несохранённых изменений (при остановке бота)."""
+    if _state_dirty:
+        save_bot_state(state)
+
+
+def save_job(
+    name: str,
+    callback: str,
+    kind: str,
+    *,
+    chat_id: int | None = None,
+    user_id: int | None = None,
+    interval: float | None = None,
+    run_at: float | None = None,
+    data: dict | None = None,
+) -> None:
+    """
+    Сохраняет описание задачи JobQueue для восстановления после перезапуска.
+    callback — имя из реестра восстанавливаемых задач, kind — 'once' или 'repeating',
+    run_at — момент запуска разовой задачи (Unix time).
+    """
+    with _transaction() as db:
+        db.execute(
+            "INSERT OR REPLACE INTO jobs "
+            "(name, callback, kind, chat_id, user_id, interval, run_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                name,
+                callback,
+                kind,
+                chat_id,
+                user_id,
+                interval,
+                run_at,
+                json.dumps(data or {}, ensure_ascii=False),
+            ),
+        )
+
+
+def delete_job(name: str) -> None:
+    """Удаляет сохранённую задачу."""
+    with _transaction() as db:
+        db.execute("DELETE FROM jobs WHERE name = ?", (name,))
+
+
+def load_jobs() -> list[dict]:
+    """Возвращает все сохранённые задачи одним запросом."""
+    with _db_lock:
+        rows = _db().execute("SELECT * FROM jobs").fetchall()
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job["data"] = json.loads(job["data"] or "{}")
+        jobs.append(job)
+    return jobs
+
+
+def close_state_db() -> None:
+    """Закрывает соединение с базой состояния."""
+    global _connection
+    with _db_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
@@ -0,0 +1,45 @@
+import re
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*(s|m|h|d|с|м|ч|д)?$", re.IGNORECASE)
+_UNIT_SECONDS = {
+    "s": 1,
+    "с": 1,
+    "m": 60,
+    "м": 60,
+    "h": 3600,
+    "ч": 3600,
+    "d": 86400,
+    "д": 86400,
+}
+
+
+def parse_duration(text: str, default_unit: str = "s") -> float:
+    """
+    Разбирает длительность вида '30s', '15m', '2h', '7d' (или '30с', '2ч').
+    Число без суффикса считается в default_unit. Бросает ValueError при ошибке.
+    """
+    match = _DURATION_RE.match(text.strip())
+    if not match:
+        raise ValueError(f"Некорректная длительность: {text}")
+    value = float(match.group(1))
+    unit = (match.group(2) or default_unit).lower()
+    seconds = value * _UNIT_SECONDS[unit]
+    if seconds <= 0:
+        raise ValueError("Длительность должна быть положительной.")
+    return seconds
+
+
+def format_duration(seconds: float, latin: bool = False) -> str:
+    """Короткая запись длительности: '45с', '15м', '2ч 30м', '3д 4ч' (или '2h 30m' при latin)."""
+    d, h, m, s = ("d", "h", "m", "s") if latin else ("д", "ч", "м", "с")
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}{d} {hours}{h}" if hours else f"{days}{d}"
+    if hours:
+        return f"{hours}{h} {minutes}{m}" if minutes else f"{hours}{h}"
+    if minutes:
+        return f"{minutes}{m} {seconds}{s}" if seconds else f"{minutes}{m}"
+    return f"{seconds}{s}"
@@ -0,0 +1,154 @@
+import struct
+from array import array
+
+# Флаги AVI: у файла есть индекс idx1, каждый кадр MJPEG — ключевой.
+AVIF_HASINDEX = 0x10
+AVIIF_KEYFRAME = 0x10
+
+
+class MJPEGAviWriter:
+    """
+    Потоковая запись JPEG-кадров в AVI (Motion JPEG).
+    Кадр сразу уходит на диск, в памяти остаются только смещения и размеры
+    кадров для индекса, поэтому расход памяти почти не зависит от длины записи.
+    Заголовки с итоговыми размерами и частотой кадров дописываются в close();
+    fps можно поменять до закрытия, если реальная частота оказалась ниже.
+    """
+
+    def __init__(self, path: str, width: int, height: int, fps: float):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = 0
+        self._max_frame = 0
+        self._index = array("I")  # пары (смещение от 'movi', размер)
+        self._file = open(path, "wb")
+        self._write_headers()
+
+    @property
+    def frame_size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def size(self) -> int:
+        """Текущий размер файла в байтах (без будущего индекса)."""
+        return self._file.tell()
+
+    def _write_headers(self) -> None:
+        f = self._file
+        f.write(b"RIFF" + struct.pack("<I", 0) + b"AVI ")
+
+        avih = struct.pack(
+            "<14I",
+            0,  # микросекунд на кадр (дописывается в close)
+            0,  # байт в секунду (дописывается в close)
+            0,
+            AVIF_HASINDEX,
+            0,  # всего кадров (дописывается в close)
+            0,
+            1,  # потоков
+            0,  # рекомендуемый буфер (дописывается в close)
+            self.width,
+            self.height,
+            0,
+            0,
+            0,
+            0,
+        )
+        strh = struct.pack(
+            "<4s4sIHHIIIIIIIIhhhh",
+            b"vids",
+            b"MJPG",
+            0,
+            0,
+            0,
+            0,
+            1000,  # scale
+            0,  # rate: fps = rate / scale (дописывается в close)
+            0,
+            0,  # длина в кадрах (дописывается в close)
+            0,  # рекомендуемый буфер (дописывается в close)
+            0xFFFFFFFF,
+            0,
+            0,
+            0,
+            self.width,
+            self.height,
+        )
+        strf = struct.pack(
+            "<IiiHH4sIiiII",
+            40,
+            self.width,
+            self.height,
+            1,
+            24,
+            b"MJPG",
+            self.width * self.height * 3,
+            0,
+            0,
+            0,
+            0,
+        )
+        strl = b"strl" + self._chunk(b"strh", strh) + self._chunk(b"strf", strf)
+        hdrl = b"hdrl" + self._chunk(b"avih", avih) + self._chunk(b"LIST", strl)
+        hdrl_start = f.tell()
+        f.write(self._chunk(b"LIST", hdrl))
+        # Позиции полей, которые заполняются при закрытии файла.
+        avih_data = hdrl_start + 8 + 4 + 8
+        self._avih_usec_pos = avih_data
+        self._avih_max_bytes_pos = avih_data + 4
+        self._avih_frames_pos = avih_data + 16
+        self._avih_buffer_pos = avih_data + 28
+        strh_data = avih_data + len(avih) + 8 + 4 + 8
+        self._strh_rate_pos = strh_data + 24
+        self._strh_length_pos = strh_data + 32
+        self._strh_buffer_pos = strh_data + 36
+
+        self._movi_start = f.tell()
+        f.write(b"LIST" + struct.pack("<I", 0) + b"movi")
+
+    @staticmethod
+    def _chunk(fourcc: bytes, data: bytes) -> bytes:
+        padding = b"\0" if len(data) % 2 else b""
+        return fourcc + struct.pack("<I", len(data)) + data + padding
+
+    def add_frame(self, jpeg: bytes) -> None:
+        """Дописывает кадр JPEG в конец файла."""
+        offset = self._file.tell() - (self._movi_start + 8)
+        self._file.write(self._chunk(b"00dc", jpeg))
+        self._index.extend((offset, len(jpeg)))
+        self._max_frame = max(self._max_frame, len(jpeg))
+        self.frame_count += 1
+
+    def close(self) -> None:
+        """Пишет индекс и итоговые размеры в заголовки, закрывает файл."""
+        if self._file.closed:
+            return
+        f = self._file
+        movi_end = f.tell()
+
+        index = bytearray()
+        for i in range(0, len(self._index), 2):
+            index += struct.pack(
+                "<4sIII", b"00dc", AVIIF_KEYFRAME, self._index[i], self._index[i + 1]
+            )
+        f.write(self._chunk(b"idx1", bytes(index)))
+        file_end = f.tell()
+
+        max_bytes_per_sec = round(self._max_frame * self.fps)
+        patches = (
+            (4, file_end - 8),
+            (self._avih_usec_pos, round(1_000_000 / self.fps)),
+            (self._strh_rate_pos, round(self.fps * 1000)),
+            (self._movi_start + 4, movi_end - self._movi_start - 8),
+            (self._avih_max_bytes_pos, max_bytes_per_sec),
+            (self._avih_frames_pos, self.frame_count),
+            (self._avih_buffer_pos, self._max_frame),
+            (self._strh_length_pos, self.frame_count),
+            (self._strh_buffer_pos, self._max_frame),
+        )
+        for position, value in patches:
+            f.seek(position)
+            f.write(struct.pack("<I", value))
+        f.close()